@@ -5,18 +5,26 @@ Lightweight monitoring agent that runs on each device to collect and send metric
 """
 
 import psutil
-import requests
 import time
 import json
 import logging
+import math
+import mmap
 import os
 import platform
 import socket
 import subprocess
 import shutil
-from typing import Dict, Optional
+import threading
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional
 from datetime import datetime
 import configparser
+import ctypes
+import ctypes.util
+import importlib.util
 
 # Configure logging
 logging.basicConfig(
@@ -25,15 +33,396 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# requests is imported on first use (see import_requests) so lean startup can defer it
+requests = None
+
+def import_requests():
+    """Import requests on first use and make it available module-wide."""
+    global requests
+    if requests is None:
+        import requests as requests_module
+        requests = requests_module
+    return requests
+
+DEFAULT_PROCESS_PATTERNS = ['llama-server', 'rpc-server', 'ollama', 'open-webui']
+
+class ProcessTracker:
+    """Attributes CPU, memory, threads and connections to groups of processes.
+    
+    Each pattern names a group and matches process names and command lines
+    (with '_' treated as '-', so open_webui matches open-webui). psutil.Process
+    handles are cached between ticks so cpu_percent() measures the interval
+    since the previous tick, and only PIDs that appeared since the last tick are
+    inspected. A full rescan runs every `rescan_interval` seconds to pick up
+    processes that exec'd into a match or reused a PID. Where psutil exposes
+    per-process I/O counters (Linux, Windows) each group also reports its disk
+    read throughput, which shows how fast a model is being loaded.
+    """
+    
+    def __init__(self, patterns: List[str], rescan_interval: float = 60):
+        self.patterns = [pattern.strip().lower() for pattern in patterns if pattern.strip()]
+        self.rescan_interval = rescan_interval
+        self.tracked: Dict[int, tuple] = {}  # pid -> (group, psutil.Process)
+        self.known_pids = set()
+        self.last_rescan = 0.0
+        self.read_counters: Dict[int, tuple] = {}  # pid -> (read bytes, time)
+        self.track_io = hasattr(psutil.Process, 'io_counters')
+    
+    def match(self, proc: psutil.Process) -> Optional[str]:
+        """Return the group a process belongs to, if any."""
+        try:
+            text = ' '.join([proc.name()] + proc.cmdline()).lower().replace('_', '-')
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return None
+        for pattern in self.patterns:
+            if pattern in text:
+                return pattern
+        return None
+    
+    def scan(self):
+        """Start tracking new matching processes and forget exited ones."""
+        now = time.time()
+        pids = set(psutil.pids())
+        if now - self.last_rescan >= self.rescan_interval:
+            new_pids = pids
+            self.tracked = {pid: entry for pid, entry in self.tracked.items()
+                            if pid in pids and entry[1].is_running()}
+            self.last_rescan = now
+        else:
+            new_pids = pids - self.known_pids
+            for pid in self.known_pids - pids:
+                self.tracked.pop(pid, None)
+                self.read_counters.pop(pid, None)
+        
+        for pid in new_pids:
+            if pid in self.tracked:
+                continue
+            try:
+                proc = psutil.Process(pid)
+            except psutil.NoSuchProcess:
+                continue
+            group = self.match(proc)
+            if group:
+                proc.cpu_percent(None)  # Prime the CPU counter for the next tick
+                self.tracked[pid] = (group, proc)
+                logger.debug(f"Tracking {group} process {pid}")
+        
+        self.known_pids = pids
+    
+    def read_rate(self, pid: int, proc: psutil.Process) -> float:
+        """Disk read throughput of a process in MB/s since the previous tick."""
+        try:
+            read_bytes = proc.io_counters().read_bytes
+        except (psutil.AccessDenied, AttributeError):
+            return 0.0
+        now = time.time()
+        previous = self.read_counters.get(pid)
+        self.read_counters[pid] = (read_bytes, now)
+        if previous is None or now <= previous[1]:
+            return 0.0
+        return max(0, read_bytes - previous[0]) / (now - previous[1]) / (1024**2)
+    
+    def collect(self) -> Dict[str, Dict]:
+        """Return per-group totals for every pattern with running processes."""
+        self.scan()
+        groups = {pattern: {'cpu_percent': 0.0, 'rss': 0.0, 'threads': 0, 'connections': 0, 'count': 0}
+                  for pattern in self.patterns}
+        if self.track_io:
+            for totals in groups.values():
+                totals['disk_read'] = 0.0
+        
+        for pid, (group, proc) in list(self.tracked.items()):
+            try:
+                with proc.oneshot():
+                    cpu_percent = proc.cpu_percent(None)
+                    rss = proc.memory_info().rss
+                    threads = proc.num_threads()
+                    disk_read = self.read_rate(pid, proc) if self.track_io else None
+                try:
+                    connections = len(proc.net_connections(kind='inet') if hasattr(proc, 'net_connections')
+                                      else proc.connections(kind='inet'))
+                except psutil.AccessDenied:
+                    connections = 0
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                del self.tracked[pid]
+                self.read_counters.pop(pid, None)
+                continue
+            except psutil.AccessDenied:
+                continue
+            
+            totals = groups[group]
+            totals['cpu_percent'] += cpu_percent
+            totals['rss'] += rss / (1024**3)  # GB
+            totals['threads'] += threads
+            totals['connections'] += connections
+            totals['count'] += 1
+            if disk_read is not None:
+                totals['disk_read'] += disk_read
+        
+        # Groups with nothing running are omitted rather than reported as zeros
+        running = {}
+        for group, totals in groups.items():
+            if totals['count']:
+                totals['cpu_percent'] = round(totals['cpu_percent'], 2)
+                totals['rss'] = round(totals['rss'], 4)
+                if 'disk_read' in totals:
+                    totals['disk_read'] = round(totals['disk_read'], 2)
+                running[group] = totals
+        return running
+
+class ModelCacheTracker:
+    """Page-cache residency of model files, and pre-warming them into RAM.
+    
+    Every .gguf file under the model directories is mapped read-only once and the
+    map is kept while the file's size and mtime stay the same; mapping never reads
+    the file. mincore() on the map then tells which pages sit in the page cache.
+    Files longer than `sample_pages` pages are sampled in evenly spaced windows
+    instead of being scanned whole, so a run stays cheap with hundreds of GB of
+    weights. On Linux, files the agent may not write are only reported correctly
+    when the agent runs as the user owning them. Pre-warming reads a file
+    sequentially in a background thread so the next load is served from RAM.
+    """
+    
+    SAMPLE_WINDOWS = 64
+    READ_CHUNK = 16 * 1024**2
+    
+    def __init__(self, model_dirs: List[str], sample_pages: int = 65536,
+                 on_prewarmed: Callable[[str], None] = None):
+        self.model_dirs = [os.path.expanduser(path.strip()) for path in model_dirs if path.strip()]
+        self.sample_pages = sample_pages
+        self.on_prewarmed = on_prewarmed
+        self.page_size = mmap.PAGESIZE
+        self.files: Dict[str, str] = {}  # name -> path
+        self.maps: Dict[str, tuple] = {}  # path -> (size, mtime, address)
+        self.prewarming = set()
+        self.lock = threading.Lock()
+        self.libc = self._load_libc()
+        self.vector = None
+        self.bit0 = bytes(value & 1 for value in range(256))
+    
+    @property
+    def supported(self) -> bool:
+        return self.libc is not None
+    
+    @staticmethod
+    def _load_libc():
+        """libc with mmap/mincore signatures set up, or None where mincore is missing (Windows)."""
+        name = ctypes.util.find_library('c')
+        if not name:
+            return None
+        try:
+            libc = ctypes.CDLL(name, use_errno=True)
+            mincore = libc.mincore
+        except (OSError, AttributeError):
+            return None
+        libc.mmap.restype = ctypes.c_void_p
+        libc.mmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int, ctypes.c_int,
+                              ctypes.c_int, ctypes.c_int64]
+        libc.munmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+        mincore.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.POINTER(ctypes.c_ubyte)]
+        return libc
+    
+    def scan(self):
+        """Refresh the model file list, named relative to their model directory."""
+        files = {}
+        for directory in self.model_dirs:
+            for root, _, names in os.walk(directory):
+                for name in names:
+                    if name.endswith('.gguf'):
+                        path = os.path.join(root, name)
+                        files[os.path.relpath(path, directory)] = path
+        self.files = files
+    
+    def _map(self, path: str) -> Optional[tuple]:
+        """Cached (size, address) of a file's read-only map, remapped when the file changed."""
+        stat = os.stat(path)
+        cached = self.maps.get(path)
+        if cached is not None:
+            if cached[:2] == (stat.st_size, stat.st_mtime):
+                return stat.st_size, cached[2]
+            self._unmap(path)
+        if stat.st_size == 0:
+            return None
+        
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            address = self.libc.mmap(None, stat.st_size, mmap.PROT_READ, mmap.MAP_SHARED, fd, 0)
+        finally:
+            os.close(fd)  # The map stays valid without the descriptor
+        if address in (None, ctypes.c_void_p(-1).value):
+            raise OSError(ctypes.get_errno(), f"mmap failed for {path}")
+        self.maps[path] = (stat.st_size, stat.st_mtime, address)
+        return stat.st_size, address
+    
+    def _unmap(self, path: str):
+        size, _, address = self.maps.pop(path)
+        self.libc.munmap(address, size)
+    
+    def residency(self, path: str) -> Optional[float]:
+        """Fraction of the file's pages in the page cache (sampled for large files)."""
+        mapped = self._map(path)
+        if mapped is None:
+            return None
+        size, address = mapped
+        pages = (size + self.page_size - 1) // self.page_size
+        if pages <= self.sample_pages:
+            windows = [(0, pages)]
+        else:
+            span = max(1, self.sample_pages // self.SAMPLE_WINDOWS)
+            stride = pages // self.SAMPLE_WINDOWS
+            windows = [(index * stride, span) for index in range(self.SAMPLE_WINDOWS)]
+        
+        longest = max(length for _, length in windows)
+        if self.vector is None or len(self.vector) < longest:
+            self.vector = (ctypes.c_ubyte * longest)()
+        resident = sampled = 0
+        for first, length in windows:
+            length = min(length, pages - first)
+            if self.libc.mincore(address + first * self.page_size, length * self.page_size, self.vector) != 0:
+                raise OSError(ctypes.get_errno(), f"mincore failed for {path}")
+            # Only the lowest bit means resident; macOS sets reference/modify bits as well
+            resident += bytes(self.vector)[:length].translate(self.bit0).count(1)
+            sampled += length
+        return resident / sampled
+    
+    def collect(self) -> Dict[str, Dict]:
+        """Residency, size and pre-warm state of every model file."""
+        self.scan()
+        for path in set(self.maps) - set(self.files.values()):
+            self._unmap(path)
+        
+        model_files = {}
+        for name, path in self.files.items():
+            try:
+                resident = self.residency(path)
+            except OSError as e:
+                logger.debug(f"Could not check page cache residency of {path}: {e}")
+                continue
+            if resident is None:
+                continue
+            model_files[name] = {
+                'resident': round(resident, 3),
+                'size': round(self.maps[path][0] / (1024**3), 2),  # GB
+                'prewarming': int(name in self.prewarming)
+            }
+        return model_files
+    
+    def prewarm(self, names: List[str]) -> List[str]:
+        """Start reading model files into the page cache; returns the names started."""
+        self.scan()
+        started = []
+        for name in names:
+            path = self.files.get(name)
+            if path is None:
+                logger.warning(f"Not pre-warming {name}: not a file under the model directories")
+                continue
+            with self.lock:
+                if name in self.prewarming:
+                    continue
+                self.prewarming.add(name)
+            thread = threading.Thread(target=self._read, args=(name, path), name='prewarm')
+            thread.daemon = True
+            thread.start()
+            started.append(name)
+        return started
+    
+    def _read(self, name: str, path: str):
+        started = time.time()
+        total = 0
+        try:
+            buffer = bytearray(self.READ_CHUNK)
+            with open(path, 'rb', buffering=0) as f:
+                if hasattr(os, 'posix_fadvise'):
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                while True:
+                    count = f.readinto(buffer)
+                    if not count:
+                        break
+                    total += count
+            elapsed = time.time() - started
+            logger.info(f"Pre-warmed {name}: {total / (1024**3):.1f} GB in {elapsed:.1f}s "
+                        f"({total / (1024**2) / max(elapsed, 0.001):.0f} MB/s)")
+        except OSError as e:
+            logger.warning(f"Pre-warming {name} failed: {e}")
+        finally:
+            with self.lock:
+                self.prewarming.discard(name)
+            if self.on_prewarmed is not None:
+                self.on_prewarmed(name)
+
+class Collector:
+    """A named metrics source with its own cadence, timeout and measured cost.
+    
+    `interval` is the minimum number of seconds between runs (0 runs every tick).
+    Parallel collectors run on a worker pool so slow sources never delay the cheap
+    inline ones. The last successful result is reused between runs and when a run
+    fails or overruns its timeout.
+    """
+    
+    def __init__(self, name: str, func, interval: float = 0, timeout: float = 2.0, parallel: bool = False):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.timeout = timeout
+        self.parallel = parallel
+        self.last_run = 0.0
+        self.last_result: Dict = {}
+        self.cost: Optional[float] = None  # Moving average of run time in seconds
+        self.runs = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.future = None
+    
+    def due(self, now: float) -> bool:
+        """Whether the interval has passed and no previous run is still in flight."""
+        if self.future is not None and not self.future.done():
+            return False
+        return now - self.last_run >= self.interval
+    
+    def run(self) -> Dict:
+        started = time.perf_counter()
+        try:
+            self.last_result = self.func() or {}
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Collector {self.name} failed: {e}")
+        finally:
+            elapsed = time.perf_counter() - started
+            self.cost = elapsed if self.cost is None else self.cost * 0.8 + elapsed * 0.2
+            self.runs += 1
+        return self.last_result
+    
+    def stats(self) -> Dict:
+        return {
+            'cost': round(self.cost, 4) if self.cost is not None else None,
+            'interval': self.interval,
+            'errors': self.errors,
+            'timeouts': self.timeouts
+        }
+
 class SystemMonitor:
-    """Collects system metrics from the device."""
+    """Collects system metrics from the device through a registry of collectors."""
+    
+    # Inline collectors whose average cost exceeds this many seconds move to the pool
+    INLINE_BUDGET = 0.05
     
-    def __init__(self):
+    def __init__(self, process_patterns: List[str] = None, inference_endpoints: List[str] = None,
+                 collector_settings: Dict[str, str] = None, model_dirs: List[str] = None):
         self.system = platform.system()
         self.last_network_stats = None
         self.last_network_time = None
+        self.last_disk_stats = None
+        self.last_disk_time = None
+        self.nvml_handle = None
         self.use_macmon = False
         
+        if process_patterns is None:
+            process_patterns = DEFAULT_PROCESS_PATTERNS
+        self.process_tracker = ProcessTracker(process_patterns) if process_patterns else None
+        self.inference_endpoints = [url.strip().rstrip('/') for url in inference_endpoints or [] if url.strip()]
+        self.http = None  # Created on the first inference probe
+        self.model_cache = ModelCacheTracker(model_dirs) if model_dirs else None
+        
         # Check if macmon is available on macOS
         if self.system == "Darwin":
             self.use_macmon = shutil.which("macmon") is not None
@@ -42,9 +431,67 @@ class SystemMonitor:
             else:
                 logger.info("macmon not found, falling back to psutil (consider installing: brew install macmon)")
         
+        # Prime the non-blocking CPU counter so the first tick has a baseline
+        psutil.cpu_percent(interval=None)
+        
+        self.collectors: Dict[str, Collector] = {}
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.register_default_collectors()
+        self.apply_collector_settings(collector_settings or {})
+    
+    def register_collector(self, name: str, func, interval: float = 0, timeout: float = 2.0,
+                           parallel: bool = False):
+        """Add a collector; results are merged in registration order, later ones win."""
+        self.collectors[name] = Collector(name, func, interval, timeout, parallel)
+    
+    def register_default_collectors(self):
+        """Register the built-in collectors available on this device."""
+        self.register_collector('cpu', lambda: {'cpu_usage': self.get_cpu_usage()})
+        self.register_collector('memory', self.get_memory_info)
+        # Checking for pynvml without importing it keeps startup cheap on machines without NVIDIA GPUs
+        if importlib.util.find_spec('pynvml') is not None:
+            self.register_collector('gpu', self.get_gpu_info, timeout=2.0, parallel=True)
+        self.register_collector('network', self.get_network_info)
+        self.register_collector('disk_io', self.get_disk_io_info)
+        if hasattr(psutil, 'sensors_temperatures'):
+            self.register_collector('temperatures', self.get_temperature_info, interval=30, parallel=True)
+        if self.process_tracker is not None:
+            self.register_collector('processes', lambda: {'processes': self.get_process_info()},
+                                    timeout=3.0, parallel=True)
+        if self.inference_endpoints:
+            self.register_collector('inference', self.get_inference_info, interval=10, timeout=3.0, parallel=True)
+        if self.model_cache is not None:
+            if self.model_cache.supported:
+                self.register_collector('page_cache', lambda: {'model_files': self.model_cache.collect()},
+                                        interval=15, timeout=3.0, parallel=True)
+            else:
+                logger.info("mincore not available on this system, model page cache residency disabled")
+        # macmon replaces the psutil CPU, memory and GPU figures when available
+        if self.use_macmon:
+            self.register_collector('macmon', self.get_macmon_metrics, timeout=5.0, parallel=True)
+    
+    def apply_collector_settings(self, settings: Dict[str, str]):
+        """Apply <name>_interval / <name>_timeout overrides; an interval of 'off' disables."""
+        for key, value in settings.items():
+            name, _, option = key.rpartition('_')
+            collector = self.collectors.get(name)
+            if collector is None or option not in ('interval', 'timeout'):
+                logger.warning(f"Ignoring unknown collector setting '{key}'")
+                continue
+            
+            if option == 'interval' and value.strip().lower() == 'off':
+                del self.collectors[name]
+                logger.info(f"Collector {name} disabled")
+            else:
+                setattr(collector, option, float(value))
+    
+    def get_collector_stats(self) -> Dict[str, Dict]:
+        """Get cadence, cost and failure counts for every collector."""
+        return {name: collector.stats() for name, collector in self.collectors.items()}
+    
     def get_cpu_usage(self) -> float:
-        """Get CPU usage percentage."""
-        return psutil.cpu_percent(interval=1)
+        """Get CPU usage percentage since the previous call."""
+        return psutil.cpu_percent(interval=None)
     
     def get_memory_info(self) -> Dict[str, float]:
         """Get memory information."""
@@ -65,10 +512,11 @@ class SystemMonitor:
         try:
             # Try to get NVIDIA GPU info
             import pynvml
-            pynvml.nvmlInit()
-            
-            # Get first GPU (most common case)
-            handle = pynvml.nvmlDeviceGetHandleByIndex(0)
+            if self.nvml_handle is None:
+                pynvml.nvmlInit()
+                # Get first GPU (most common case)
+                self.nvml_handle = pynvml.nvmlDeviceGetHandleByIndex(0)
+            handle = self.nvml_handle
             
             # Get GPU utilization
             utilization = pynvml.nvmlDeviceGetUtilizationRates(handle)
@@ -79,6 +527,13 @@ class SystemMonitor:
             gpu_info['vram_usage'] = memory_info.used / (1024**3)  # GB
             gpu_info['vram_total'] = memory_info.total / (1024**3)  # GB
             
+            # Board power draw in milliwatts; not supported on every GPU
+            try:
+                gpu_info['power_gpu'] = pynvml.nvmlDeviceGetPowerUsage(handle) / 1000.0  # W
+                gpu_info['power_total'] = gpu_info['power_gpu']
+            except pynvml.NVMLError:
+                pass
+            
         except ImportError:
             # pynvml not installed
             pass
@@ -134,17 +589,17 @@ class SystemMonitor:
             # GPU Usage - macmon provides gpu_usage as [freq, usage]
             if 'gpu_usage' in macmon_data and macmon_data['gpu_usage']:
                 metrics['gpu_usage'] = macmon_data['gpu_usage'][1] * 100  # Convert to percentage
-            else:
-                metrics['gpu_usage'] = None
             
-            # VRAM info (macmon doesn't provide detailed VRAM, use psutil fallback)
-            metrics['vram_usage'] = None
-            metrics['vram_total'] = None
-            
-            # Network info (use existing psutil method for network)
-            network_info = self.get_network_info()
-            metrics.update(network_info)
+            # Power in watts; sys_power covers the whole machine where macmon can read it,
+            # all_power only the CPU, GPU and ANE
+            for field, key in (('power_cpu', 'cpu_power'), ('power_gpu', 'gpu_power'), ('power_ane', 'ane_power')):
+                if macmon_data.get(key) is not None:
+                    metrics[field] = float(macmon_data[key])
+            total = macmon_data.get('sys_power') or macmon_data.get('all_power')
+            if total:
+                metrics['power_total'] = float(total)
             
+            # VRAM and network come from their own collectors
             return metrics
             
         except subprocess.TimeoutExpired:
@@ -189,70 +644,493 @@ class SystemMonitor:
             logger.debug(f"Could not get network info: {e}")
             return {'network_tx': None, 'network_rx': None}
     
+    def get_disk_io_info(self) -> Dict[str, Optional[float]]:
+        """Get disk read/write throughput in MB/s."""
+        current_stats = psutil.disk_io_counters()
+        current_time = time.time()
+        disk_info = {'disk_read': None, 'disk_write': None}
+        if current_stats is None:
+            return disk_info
+        
+        if self.last_disk_stats and self.last_disk_time:
+            time_diff = current_time - self.last_disk_time
+            if time_diff > 0:
+                disk_info['disk_read'] = (current_stats.read_bytes - self.last_disk_stats.read_bytes) / time_diff / (1024**2)
+                disk_info['disk_write'] = (current_stats.write_bytes - self.last_disk_stats.write_bytes) / time_diff / (1024**2)
+        
+        self.last_disk_stats = current_stats
+        self.last_disk_time = current_time
+        return disk_info
+    
+    def get_temperature_info(self) -> Dict[str, Dict]:
+        """Get the hottest reading of each temperature sensor in Celsius."""
+        temperatures = {}
+        for sensor, readings in psutil.sensors_temperatures().items():
+            current = [reading.current for reading in readings if reading.current is not None]
+            if current:
+                temperatures[sensor] = {'current': round(max(current), 1)}
+        return {'temperatures': temperatures}
+    
+    def get_inference_info(self) -> Dict[str, Dict]:
+        """Probe configured llama-server / Ollama endpoints."""
+        return {'inference_servers': {url: self.probe_inference_server(url) for url in self.inference_endpoints}}
+    
+    def probe_inference_server(self, url: str) -> Dict:
+        """Check health, slot usage (llama-server) and loaded models (Ollama)."""
+        status = {'up': 0, 'loading': 0, 'latency': None, 'slots_total': None,
+                  'slots_busy': None, 'models_loaded': None}
+        if self.http is None:
+            self.http = import_requests().Session()
+        started = time.perf_counter()
+        try:
+            response = self.http.get(f"{url}/health", timeout=2)
+            if response.status_code == 404:
+                # Ollama has no /health; its root answers when the server is up
+                response = self.http.get(url, timeout=2)
+        except requests.exceptions.RequestException:
+            return status
+        
+        status['latency'] = round(time.perf_counter() - started, 4)
+        status['up'] = int(response.status_code == 200)
+        status['loading'] = int(response.status_code == 503)  # llama-server while loading a model
+        
+        for path in ('/slots', '/api/ps'):
+            try:
+                response = self.http.get(f"{url}{path}", timeout=2)
+                if response.status_code != 200:
+                    continue
+                data = response.json()
+                if path == '/slots' and isinstance(data, list):
+                    status['slots_total'] = len(data)
+                    status['slots_busy'] = sum(1 for slot in data if slot.get('is_processing'))
+                elif path == '/api/ps' and isinstance(data, dict):
+                    status['models_loaded'] = len(data.get('models', []))
+            except (requests.exceptions.RequestException, ValueError):
+                continue
+        return status
+    
+    def refresh_page_cache(self, name: str = None):
+        """Re-check model file residency on the next tick (e.g. after a pre-warm finished)."""
+        collector = self.collectors.get('page_cache')
+        if collector is not None:
+            collector.last_run = 0.0
+    
+    def get_process_info(self) -> Dict[str, Dict]:
+        """Get resource usage per tracked process group."""
+        if self.process_tracker is None:
+            return {}
+        return self.process_tracker.collect()
+    
     def collect_all_metrics(self) -> Dict:
-        """Collect all available metrics."""
-        metrics = {}
+        """Run every due collector and merge the latest results of all of them."""
+        tick_started = time.perf_counter()
+        cpu_started = time.process_time()
+        now = time.time()
         
-        # Use macmon on macOS if available, otherwise fall back to individual methods
-        if self.use_macmon:
+        due = [collector for collector in self.collectors.values() if collector.due(now)]
+        for collector in due:
+            collector.last_run = now
+        
+        # Start slow collectors first so they overlap with the inline ones
+        pending = [collector for collector in due if collector.parallel]
+        if pending and self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='collector')
+        for collector in pending:
+            collector.future = self.executor.submit(collector.run)
+        
+        for collector in due:
+            if collector.parallel:
+                continue
+            collector.run()
+            if collector.cost > self.INLINE_BUDGET:
+                collector.parallel = True
+                logger.info(f"Collector {collector.name} takes {collector.cost * 1000:.0f}ms, "
+                            f"moving it to the worker pool")
+        
+        for collector in pending:
+            remaining = collector.timeout - (time.perf_counter() - tick_started)
             try:
-                macmon_metrics = self.get_macmon_metrics()
-                if macmon_metrics:
-                    metrics.update(macmon_metrics)
-                    logger.debug("Successfully collected metrics using macmon")
-                    return metrics
-                else:
-                    logger.debug("macmon returned empty metrics, falling back to psutil")
-            except Exception as e:
-                logger.warning(f"macmon failed, falling back to psutil: {e}")
+                collector.future.result(timeout=max(remaining, 0))
+            except FutureTimeoutError:
+                collector.timeouts += 1
+                logger.warning(f"Collector {collector.name} exceeded its {collector.timeout}s timeout, "
+                               f"reusing its previous result")
         
-        # Fallback to individual metric collection methods
-        # CPU usage
-        try:
-            metrics['cpu_usage'] = self.get_cpu_usage()
-        except Exception as e:
-            logger.warning(f"Failed to get CPU usage: {e}")
-            metrics['cpu_usage'] = None
+        metrics = {}
+        for collector in self.collectors.values():
+            metrics.update(collector.last_result)
         
-        # Memory info
-        try:
-            memory_info = self.get_memory_info()
-            metrics.update(memory_info)
-        except Exception as e:
-            logger.warning(f"Failed to get memory info: {e}")
-            metrics['ram_usage'] = None
-            metrics['ram_total'] = None
+        # Report the agent's own overhead alongside the device metrics
+        metrics['collection_time'] = round(time.perf_counter() - tick_started, 4)
+        metrics['collection_cpu_time'] = round(time.process_time() - cpu_started, 4)
+        metrics['collectors'] = self.get_collector_stats()
+        return metrics
+
+class StreamTransport:
+    """Persistent Socket.IO channel to the dashboard with delta-encoded frames.
+    
+    The handshake sends the device name, the field list and static fields such as
+    ram_total once. Each sample then only carries the fields that changed, keyed by
+    their index in the field list, optionally zlib-compressed with a compressor
+    shared across the session. Requires the optional python-socketio client.
+    """
+    
+    STATIC_FIELDS = ('ram_total', 'vram_total')
+    
+    def __init__(self, server_url: str, device_name: str, compression: bool = True, lazy: bool = False,
+                 on_sampling: Callable[[Dict], None] = None, on_prewarm: Callable[[Dict], None] = None):
+        self.server_url = server_url
+        self.device_name = device_name
+        self.compression = compression
+        self.on_sampling = on_sampling
+        self.on_prewarm = on_prewarm
+        self.client = None
+        if not lazy:
+            self.create_client()
         
-        # GPU info
-        try:
-            gpu_info = self.get_gpu_info()
-            metrics.update(gpu_info)
-        except Exception as e:
-            logger.warning(f"Failed to get GPU info: {e}")
-            metrics['gpu_usage'] = None
-            metrics['vram_usage'] = None
-            metrics['vram_total'] = None
+        self.fields: List[str] = []
+        self.field_index: Dict[str, int] = {}
+        self.previous: Dict = {}
+        self.seq = 0
+        self.compressor = None
+        self.needs_handshake = True
+    
+    def create_client(self):
+        """Import python-socketio and create the client (deferred in lean startup)."""
+        import socketio  # Optional dependency, checked by DashboardAgent
+        
+        self.client = socketio.Client(reconnection=False)
+        self.client.on('resync', self._on_resync, namespace='/agent')
+        self.client.on('sampling', self._on_sampling, namespace='/agent')
+        self.client.on('prewarm', self._on_prewarm, namespace='/agent')
+    
+    def _on_resync(self, data):
+        """Dashboard lost our session state; handshake again before the next frame."""
+        logger.info(f"Dashboard requested stream resync: {data.get('reason') if data else ''}")
+        self.needs_handshake = True
+    
+    def _on_sampling(self, data):
+        """Sampling directive pushed by the dashboard."""
+        if self.on_sampling is not None and isinstance(data, dict):
+            self.on_sampling(data)
+    
+    def _on_prewarm(self, data):
+        """Pre-warm request pushed by the dashboard."""
+        if self.on_prewarm is not None and isinstance(data, dict):
+            self.on_prewarm(data)
+    
+    @staticmethod
+    def _compact(value):
+        """Round floats so tiny fluctuations do not defeat delta encoding."""
+        return round(value, 3) if isinstance(value, float) else value
+    
+    def _handshake(self, metrics: Dict):
+        """Send static device info and negotiate compression."""
+        self.fields = sorted(metrics)
+        self.field_index = {field: index for index, field in enumerate(self.fields)}
+        static = {field: self._compact(metrics[field])
+                  for field in self.STATIC_FIELDS if metrics.get(field) is not None}
         
-        # Network info
+        reply = self.client.call('hello', {
+            'device_name': self.device_name,
+            'fields': self.fields,
+            'static': static,
+            'compression': ['zlib'] if self.compression else [],
+            'protocol': 1
+        }, namespace='/agent', timeout=10)
+        
+        if not reply or reply.get('status') != 'ok':
+            raise ConnectionError(f"Stream handshake rejected: {reply}")
+        
+        self.compressor = zlib.compressobj() if reply.get('compression') == 'zlib' else None
+        self.previous = dict(static)
+        self.seq = 0
+        self.needs_handshake = False
+        logger.info(f"Stream established (compression: {reply.get('compression')})")
+    
+    def send(self, metrics: Dict) -> bool:
+        """Send one sample as a delta frame, connecting and handshaking if needed."""
         try:
-            network_info = self.get_network_info()
-            metrics.update(network_info)
+            if self.client is None:
+                self.create_client()
+            if not self.client.connected:
+                self.client.connect(self.server_url, namespaces=['/agent'],
+                                    transports=['websocket'], wait_timeout=10)
+                self.needs_handshake = True
+            
+            if self.needs_handshake or any(field not in self.field_index for field in metrics):
+                self._handshake(metrics)
+            
+            frame = [self.seq + 1]
+            current = {}
+            for index, field in enumerate(self.fields):
+                value = self._compact(metrics.get(field))
+                current[field] = value
+                if value != self.previous.get(field):
+                    frame.extend((index, value))
+            
+            if self.compressor is not None:
+                data = json.dumps(frame, separators=(',', ':')).encode()
+                payload = self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+            else:
+                payload = frame
+            
+            self.client.emit('sample', payload, namespace='/agent')
+            self.seq += 1
+            self.previous = current
+            return True
+            
         except Exception as e:
-            logger.warning(f"Failed to get network info: {e}")
-            metrics['network_tx'] = None
-            metrics['network_rx'] = None
+            logger.warning(f"Stream transport error: {e}")
+            self.close()
+            return False
+    
+    def close(self):
+        """Close the channel; the next send reconnects."""
+        self.needs_handshake = True
+        if self.client is None:
+            return
+        try:
+            self.client.disconnect()
+        except Exception:
+            pass
+
+class RelayBuffer:
+    """Bounded buffer of samples received by a relay, optionally pre-aggregated.
+    
+    With `aggregate_seconds` set, samples from each device are merged into one per
+    window: numeric fields are averaged and nested fields (processes, collectors,
+    ...) keep their latest value. When the buffer is full the oldest samples are
+    dropped, so a long upstream outage costs history rather than memory.
+    """
+    
+    def __init__(self, max_samples: int = 10000, aggregate_seconds: float = 0):
+        self.aggregate_seconds = aggregate_seconds
+        self.pending = deque(maxlen=max_samples)
+        self.windows: Dict[str, Dict] = {}
+        self.received = 0
+        self.dropped = 0
+        self.lock = threading.Lock()
+    
+    def add(self, device_name: str, metrics: Dict, timestamp: float):
+        with self.lock:
+            self.received += 1
+            if not self.aggregate_seconds:
+                self._append({'device_name': device_name, 'timestamp': timestamp, 'metrics': metrics})
+                return
+            
+            window_start = timestamp - timestamp % self.aggregate_seconds
+            window = self.windows.get(device_name)
+            if window is not None and window['start'] != window_start:
+                self._append(self._close(device_name))
+                window = None
+            if window is None:
+                window = self.windows[device_name] = {'start': window_start, 'sums': {}, 'counts': {}, 'latest': {}}
+            
+            window['timestamp'] = timestamp
+            for key, value in metrics.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    window['sums'][key] = window['sums'].get(key, 0) + value
+                    window['counts'][key] = window['counts'].get(key, 0) + 1
+                else:
+                    window['latest'][key] = value
+    
+    def _append(self, sample: Dict):
+        if len(self.pending) == self.pending.maxlen:
+            self.dropped += 1
+        self.pending.append(sample)
+    
+    def _close(self, device_name: str) -> Dict:
+        window = self.windows.pop(device_name)
+        metrics = dict(window['latest'])
+        for key, total in window['sums'].items():
+            metrics[key] = total / window['counts'][key]
+        return {'device_name': device_name, 'timestamp': window['timestamp'], 'metrics': metrics}
+    
+    def drain(self, now: float) -> List[Dict]:
+        """Take every sample ready to forward, closing aggregation windows that have ended."""
+        with self.lock:
+            for device_name, window in list(self.windows.items()):
+                if now >= window['start'] + self.aggregate_seconds:
+                    self._append(self._close(device_name))
+            samples = list(self.pending)
+            self.pending.clear()
+            return samples
+    
+    def requeue(self, samples: List[Dict]):
+        """Put samples that could not be forwarded back in front of newer ones."""
+        with self.lock:
+            newer = list(self.pending)
+            self.pending.clear()
+            for sample in samples + newer:
+                self._append(sample)
+    
+    def stats(self) -> Dict:
+        with self.lock:
+            return {'received': self.received, 'pending': len(self.pending), 'dropped': self.dropped}
+
+def relay_sample(sample: Dict, now: float, stamped: bool) -> tuple:
+    """Validate one sample posted to a relay and return (device_name, metrics, timestamp).
+
+    Raises ValueError for anything that is not a sample. Batch samples keep their
+    timestamp, clamped to `now`; samples posted by agents are stamped on arrival.
+    """
+    if not isinstance(sample, dict):
+        raise ValueError('Sample must be a JSON object')
+    device_name = sample.get('device_name')
+    if not device_name or not isinstance(device_name, str):
+        raise ValueError('Device name is required')
+    metrics = sample.get('metrics') or {}
+    if not isinstance(metrics, dict):
+        raise ValueError('Metrics must be a JSON object')
+    timestamp = now
+    if stamped and sample.get('timestamp'):
+        try:
+            timestamp = float(sample['timestamp'])
+        except (TypeError, ValueError):
+            raise ValueError('Timestamp must be a number')
+        if not math.isfinite(timestamp):
+            raise ValueError('Timestamp must be a number')
+        timestamp = min(timestamp, now)
+    return device_name, metrics, timestamp
+
+class RelayServer:
+    """HTTP endpoint that accepts metrics from local agents on behalf of the dashboard.
+    
+    Agents point `server_ip`/`server_port` at the relay and use the HTTP transport;
+    samples (and batches from downstream relays) are added to a RelayBuffer.
+    Directives the dashboard sends back for a device (sampling interval, pre-warm
+    requests) are kept until the reply to that device's next sample.
+    """
+    
+    def __init__(self, listen: str, buffer: RelayBuffer):
+        # Imported here so agents that are not relays never load http.server
+        from http.server import ThreadingHTTPServer
         
-        return metrics
+        host, _, port = listen.rpartition(':')
+        self.buffer = buffer
+        self.directives: Dict[str, Dict] = {}
+        self.directives_lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host or '0.0.0.0', int(port)), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='relay-server', daemon=True)
+    
+    @property
+    def address(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"{host}:{port}"
+    
+    def start(self):
+        self.thread.start()
+        logger.info(f"Relay listening on {self.address}")
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+    
+    def store_directives(self, devices: Dict[str, Dict]):
+        """Keep directives from the dashboard's batch reply; the latest sampling interval wins
+        and pre-warm files accumulate until delivered."""
+        with self.directives_lock:
+            for device_name, directives in devices.items():
+                stored = self.directives.setdefault(device_name, {})
+                if directives.get('sampling'):
+                    stored['sampling'] = directives['sampling']
+                files = (directives.get('prewarm') or {}).get('files')
+                if files:
+                    stored['prewarm'] = {'files': sorted(set(files) | set(stored.get('prewarm', {}).get('files', [])))}
+    
+    def take_directives(self, device_name: str) -> Dict:
+        """Directives to return to a device; pre-warm requests are handed out once."""
+        with self.directives_lock:
+            stored = self.directives.get(device_name)
+            if not stored:
+                return {}
+            directives = dict(stored)
+            stored.pop('prewarm', None)
+            return directives
+    
+    def _handler_class(self):
+        from http.server import BaseHTTPRequestHandler
+        buffer = self.buffer
+        relay = self
+        
+        class RelayRequestHandler(BaseHTTPRequestHandler):
+            def _reply(self, status: int, body: Dict):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            
+            def do_GET(self):
+                # Agents' connection test hits /api/metrics/latest
+                if self.path.startswith('/api/metrics/latest'):
+                    self._reply(200, {'relay': buffer.stats()})
+                else:
+                    self._reply(404, {'error': 'Not found'})
+            
+            def do_POST(self):
+                if self.path not in ('/api/metrics', '/api/metrics/batch'):
+                    self._reply(404, {'error': 'Not found'})
+                    return
+                
+                now = time.time()
+                try:
+                    body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                    if self.headers.get('Content-Encoding') == 'deflate':
+                        body = zlib.decompress(body)
+                    data = json.loads(body)
+                    if not isinstance(data, dict):
+                        raise ValueError('Request body must be a JSON object')
+                    if self.path == '/api/metrics':
+                        samples = [relay_sample(data, now, stamped=False)]
+                    else:
+                        if not isinstance(data.get('samples', []), list):
+                            raise ValueError('Samples must be a list')
+                        # Validate the whole batch first; a rejected batch is retried in full
+                        samples = [relay_sample(sample, now, stamped=True) for sample in data.get('samples', [])]
+                except (ValueError, zlib.error) as e:
+                    self._reply(400, {'error': f"Malformed request: {e}"})
+                    return
+                
+                for device_name, metrics, timestamp in samples:
+                    buffer.add(device_name, metrics, timestamp)
+                if self.path == '/api/metrics':
+                    self._reply(200, {'status': 'success', **relay.take_directives(samples[0][0])})
+                else:
+                    devices = {device_name for device_name, _, _ in samples}
+                    # A downstream relay passes these on to its own agents
+                    directives = {name: relay.take_directives(name) for name in devices}
+                    self._reply(200, {'status': 'success',
+                                      'devices': {name: value for name, value in directives.items() if value}})
+            
+            def log_message(self, format, *args):
+                logger.debug(f"Relay request from {self.address_string()}: {format % args}")
+        
+        return RelayRequestHandler
 
 class DashboardAgent:
     """Main agent class that coordinates monitoring and communication."""
     
     def __init__(self, config_file: str = 'agent_config.ini'):
         self.config = self.load_config(config_file)
-        self.monitor = SystemMonitor()
+        self.monitor = SystemMonitor(self.config['process_patterns'], self.config['inference_endpoints'],
+                                     self.config['collectors'], self.config['model_dirs'])
         self.device_name = self.get_device_name()
-        self.session = requests.Session()
-        self.session.timeout = 10
+        self._session = None
+        self.relay_buffer = None
+        # Set to cut the current wait short when the dashboard asks for faster sampling
+        self.wake = threading.Event()
+        if self.monitor.model_cache is not None:
+            self.monitor.model_cache.on_prewarmed = self.prewarm_finished
+        self.relay = self.create_relay()
+        self.stream = None if self.relay else self.create_stream_transport()
+        
+        # Lean startup defers optional imports until they are first needed
+        if not self.config['lean_startup']:
+            import_requests()
         
         # Backoff configuration
         self.consecutive_failures = 0
@@ -265,13 +1143,58 @@ class DashboardAgent:
         logger.info(f"Agent initialized for device: {self.device_name}")
         logger.info(f"Dashboard server: {self.config['server_url']}")
         logger.info(f"Update interval: {self.config['time_period']} seconds")
+        logger.info(f"Transport: {'stream' if self.stream else 'http'}")
+        if self.relay:
+            logger.info(f"Relay mode: accepting agents on {self.config['relay_listen']}, "
+                        f"aggregate {self.config['relay_aggregate']}s, buffer {self.config['relay_buffer_size']} samples")
+    
+    @property
+    def session(self):
+        """HTTP session, created (and requests imported) on first use."""
+        if self._session is None:
+            self._session = import_requests().Session()
+            self._session.timeout = 10
+        return self._session
+    
+    def create_stream_transport(self) -> Optional[StreamTransport]:
+        """Create the persistent stream transport if configured and available."""
+        if self.config['transport'] != 'stream':
+            return None
+        
+        if importlib.util.find_spec('socketio') is None:
+            logger.warning("python-socketio not installed, falling back to HTTP transport "
+                           "(pip install \"python-socketio[client]\")")
+            return None
+        
+        return StreamTransport(self.config['server_url'], self.device_name,
+                               self.config['stream_compression'], lazy=self.config['lean_startup'],
+                               on_sampling=self.apply_sampling, on_prewarm=self.apply_prewarm)
+    
+    def create_relay(self) -> Optional[RelayServer]:
+        """Create the relay endpoint for local agents if relay_listen is configured."""
+        if not self.config['relay_listen']:
+            return None
+        
+        self.relay_buffer = RelayBuffer(self.config['relay_buffer_size'], self.config['relay_aggregate'])
+        return RelayServer(self.config['relay_listen'], self.relay_buffer)
     
     def load_config(self, config_file: str) -> Dict:
         """Load configuration from file or environment variables."""
         config = {
             'server_ip': '192.168.50.210',  # Default to Debian machine
             'server_port': 3030,
-            'time_period': 5
+            'time_period': 5,
+            'transport': 'http',
+            'stream_compression': True,
+            'process_patterns': list(DEFAULT_PROCESS_PATTERNS),
+            'inference_endpoints': [],
+            'lean_startup': False,
+            'relay_listen': '',
+            'relay_aggregate': 0,
+            'relay_buffer_size': 10000,
+            'adaptive_sampling': False,
+            'model_dirs': [],
+            'collectors': {}
         }
         
         # Try to load from config file
@@ -284,8 +1207,24 @@ class DashboardAgent:
                     config.update({
                         'server_ip': parser['agent'].get('server_ip', config['server_ip']),
                         'server_port': parser['agent'].getint('server_port', config['server_port']),
-                        'time_period': parser['agent'].getint('time_period', config['time_period'])
+                        'time_period': parser['agent'].getint('time_period', config['time_period']),
+                        'transport': parser['agent'].get('transport', config['transport']),
+                        'stream_compression': parser['agent'].getboolean('stream_compression', config['stream_compression']),
+                        'lean_startup': parser['agent'].getboolean('lean_startup', config['lean_startup']),
+                        'relay_listen': parser['agent'].get('relay_listen', config['relay_listen']),
+                        'relay_aggregate': parser['agent'].getfloat('relay_aggregate', config['relay_aggregate']),
+                        'relay_buffer_size': parser['agent'].getint('relay_buffer_size', config['relay_buffer_size']),
+                        'adaptive_sampling': parser['agent'].getboolean('adaptive_sampling', config['adaptive_sampling'])
                     })
+                    if 'process_patterns' in parser['agent']:
+                        config['process_patterns'] = parser['agent']['process_patterns'].split(',')
+                    if 'inference_endpoints' in parser['agent']:
+                        config['inference_endpoints'] = parser['agent']['inference_endpoints'].split(',')
+                    if 'model_dirs' in parser['agent']:
+                        config['model_dirs'] = parser['agent']['model_dirs'].split(',')
+                
+                if 'collectors' in parser:
+                    config['collectors'] = dict(parser['collectors'])
                     
                 logger.info(f"Loaded configuration from {config_file}")
             except Exception as e:
@@ -295,6 +1234,16 @@ class DashboardAgent:
         config['server_ip'] = os.getenv('SERVER_IP_ADDRESS', config['server_ip'])
         config['server_port'] = int(os.getenv('SERVER_PORT', config['server_port']))
         config['time_period'] = int(os.getenv('TIME_PERIOD', config['time_period']))
+        config['transport'] = os.getenv('AGENT_TRANSPORT', config['transport'])
+        if os.getenv('AGENT_LEAN_STARTUP') is not None:
+            config['lean_startup'] = os.getenv('AGENT_LEAN_STARTUP').lower() in ('1', 'true', 'yes', 'on')
+        config['relay_listen'] = os.getenv('AGENT_RELAY_LISTEN', config['relay_listen'])
+        if os.getenv('AGENT_ADAPTIVE_SAMPLING') is not None:
+            config['adaptive_sampling'] = os.getenv('AGENT_ADAPTIVE_SAMPLING').lower() in ('1', 'true', 'yes', 'on')
+        if os.getenv('AGENT_PROCESS_PATTERNS') is not None:
+            config['process_patterns'] = os.getenv('AGENT_PROCESS_PATTERNS').split(',')
+        if os.getenv('AGENT_MODEL_DIRS') is not None:
+            config['model_dirs'] = os.getenv('AGENT_MODEL_DIRS').split(',')
         
         # Build server URL
         config['server_url'] = f"http://{config['server_ip']}:{config['server_port']}"
@@ -338,6 +1287,8 @@ class DashboardAgent:
             self.current_wait_time = self.original_wait_time
             logger.debug("Connection successful, reset to original wait time")
         else:
+            # Sampling directives only hold while the dashboard answers
+            self.original_wait_time = self.config['time_period']
             # Increment failures and calculate new wait time
             self.consecutive_failures += 1
             old_wait_time = self.current_wait_time
@@ -347,8 +1298,54 @@ class DashboardAgent:
                 logger.warning(f"Connection failed {self.consecutive_failures} times, "
                              f"increasing wait time from {old_wait_time}s to {self.current_wait_time}s")
     
+    def apply_sampling(self, directive: Dict):
+        """Adopt the sampling interval the dashboard asked for."""
+        if not self.config['adaptive_sampling']:
+            return
+        try:
+            interval = max(1.0, float(directive['interval']))
+        except (KeyError, TypeError, ValueError):
+            return
+        if interval == self.original_wait_time:
+            return
+        
+        logger.info(f"Dashboard set sampling interval to {interval:g}s ({directive.get('reason')})")
+        speeding_up = interval < self.current_wait_time
+        self.original_wait_time = interval
+        if self.consecutive_failures == 0:
+            self.current_wait_time = interval
+            if speeding_up:
+                self.wake.set()
+    
+    def apply_prewarm(self, request: Dict):
+        """Read the model files the dashboard named into the page cache."""
+        if self.monitor.model_cache is None:
+            logger.warning("Pre-warm requested but no model_dirs are configured")
+            return
+        started = self.monitor.model_cache.prewarm(list(request.get('files') or []))
+        if started:
+            logger.info(f"Pre-warming {', '.join(started)}")
+            # Report the pre-warm state right away
+            self.monitor.refresh_page_cache()
+            self.wake.set()
+    
+    def prewarm_finished(self, name: str):
+        """Report the new residency of a pre-warmed file without waiting for the next tick."""
+        self.monitor.refresh_page_cache(name)
+        self.wake.set()
+    
     def send_metrics(self, metrics: Dict) -> bool:
         """Send metrics to the dashboard server."""
+        # A relay queues its own sample with the ones from local agents and forwards them together
+        if self.relay is not None:
+            self.relay_buffer.add(self.device_name, metrics, time.time())
+            return self.forward_relay_batch()
+        
+        # Prefer the persistent stream; fall back to a plain POST for this sample
+        if self.stream is not None and self.stream.send(metrics):
+            logger.debug("Metrics streamed successfully")
+            return True
+        
         try:
             payload = {
                 'device_name': self.device_name,
@@ -363,6 +1360,14 @@ class DashboardAgent:
             
             if response.status_code == 200:
                 logger.debug("Metrics sent successfully")
+                try:
+                    body = response.json()
+                except ValueError:
+                    body = {}
+                if body.get('sampling'):
+                    self.apply_sampling(body['sampling'])
+                if body.get('prewarm'):
+                    self.apply_prewarm(body['prewarm'])
                 return True
             else:
                 logger.warning(f"Failed to send metrics: HTTP {response.status_code}")
@@ -375,6 +1380,43 @@ class DashboardAgent:
             logger.error(f"Unexpected error sending metrics: {e}")
             return False
     
+    def forward_relay_batch(self) -> bool:
+        """Forward everything buffered by the relay upstream in one compressed request."""
+        samples = self.relay_buffer.drain(time.time())
+        if not samples:
+            return True
+        
+        try:
+            payload = zlib.compress(json.dumps({'relay': self.device_name, 'samples': samples}).encode())
+            response = self.session.post(
+                f"{self.config['server_url']}/api/metrics/batch",
+                data=payload,
+                headers={'Content-Type': 'application/json', 'Content-Encoding': 'deflate'}
+            )
+            
+            if response.status_code == 200:
+                logger.debug(f"Forwarded {len(samples)} samples upstream")
+                try:
+                    devices = response.json().get('devices') or {}
+                except (ValueError, AttributeError):
+                    devices = {}
+                own = devices.pop(self.device_name, {})
+                if own.get('sampling'):
+                    self.apply_sampling(own['sampling'])
+                if own.get('prewarm'):
+                    self.apply_prewarm(own['prewarm'])
+                self.relay.store_directives(devices)
+                return True
+            logger.warning(f"Failed to forward relay batch: HTTP {response.status_code}")
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Network error forwarding relay batch: {e}")
+        except Exception as e:
+            logger.error(f"Unexpected error forwarding relay batch: {e}")
+        
+        # Keep the samples for the next attempt
+        self.relay_buffer.requeue(samples)
+        return False
+    
     def test_connection(self) -> bool:
         """Test connection to the dashboard server."""
         try:
@@ -387,9 +1429,11 @@ class DashboardAgent:
     def run(self):
         """Main monitoring loop with exponential backoff."""
         logger.info("Starting monitoring loop...")
+        if self.relay is not None:
+            self.relay.start()
         
-        # Test initial connection (but don't exit if it fails)
-        if not self.test_connection():
+        # Test initial connection (but don't exit if it fails); lean startup lets the first send do it
+        if not self.config['lean_startup'] and not self.test_connection():
             logger.warning("Initial connection test failed, will retry with backoff")
             self.update_wait_time(False)
         
@@ -406,6 +1450,10 @@ class DashboardAgent:
                           f"RAM={format_metric(metrics.get('ram_usage'))}GB "
                           f"GPU={format_metric(metrics.get('gpu_usage'))}% "
                           f"Net TX={format_metric(metrics.get('network_tx'))}Mbps")
+                if self.relay is not None:
+                    stats = self.relay_buffer.stats()
+                    logger.info(f"Relay: received={stats['received']} pending={stats['pending']} "
+                                f"dropped={stats['dropped']}")
                 
                 # Send metrics and update wait time based on success
                 success = self.send_metrics(metrics)
@@ -416,8 +1464,9 @@ class DashboardAgent:
                     logger.info(f"Using backoff wait time: {self.current_wait_time}s "
                               f"(failures: {self.consecutive_failures})")
                 
-                # Wait for next iteration using current wait time
-                time.sleep(self.current_wait_time)
+                # Wait for next iteration using current wait time, or until told to sample sooner
+                self.wake.wait(self.current_wait_time)
+                self.wake.clear()
                 
             except KeyboardInterrupt:
                 logger.info("Agent stopped by user")
@@ -438,11 +1487,57 @@ server_port = 3030
 # Update interval in seconds
 time_period = 5
 
+# Transport: http (one POST per sample) or stream (persistent delta-encoded
+# channel, requires: pip install "python-socketio[client]")
+# transport = stream
+# stream_compression = true
+
+# Comma-separated process name/command line patterns to report resource usage for
+# (leave empty to disable per-process attribution)
+process_patterns = llama-server, rpc-server, ollama, open-webui
+
+# Comma-separated llama-server / Ollama base URLs to probe for health and slot usage
+# inference_endpoints = http://localhost:8080, http://localhost:11434
+
+# Lean startup: defer importing requests / python-socketio until first used and
+# skip the initial connection test, to minimise start-up time and memory
+# lean_startup = true
+
+# Relay mode: accept metrics from local agents on this address (point their
+# server_ip/server_port here) and forward them upstream in batches.
+# relay_aggregate averages each device's samples over that many seconds (0 = off);
+# relay_buffer_size caps samples held while the dashboard is unreachable.
+# relay_listen = 0.0.0.0:3031
+# relay_aggregate = 0
+# relay_buffer_size = 10000
+
+# Follow sampling intervals sent by the dashboard (fast while a model loads or a chart
+# is open, slow while idle); time_period is used until the first one arrives.
+# The dashboard needs ADAPTIVE_SAMPLING = true as well
+# adaptive_sampling = false
+
+# Comma-separated directories holding GGUF models; the agent reports how much of each
+# file is in the page cache and can pre-warm files when the dashboard asks
+# model_dirs = ~/ai-inference/models
+
+[collectors]
+# Per-collector overrides: <name>_interval (seconds, 0 = every tick, off = disabled)
+# and <name>_timeout (seconds). Collectors: cpu, memory, gpu, network, disk_io,
+# temperatures, processes, inference, page_cache, macmon
+# temperatures_interval = 30
+# gpu_timeout = 2
+
 # Example usage:
 # You can also set these via environment variables:
 # export SERVER_IP_ADDRESS=192.168.50.210
 # export SERVER_PORT=3030
 # export TIME_PERIOD=5
+# export AGENT_TRANSPORT=stream
+# export AGENT_PROCESS_PATTERNS=llama-server,ollama
+# export AGENT_LEAN_STARTUP=1
+# export AGENT_RELAY_LISTEN=0.0.0.0:3031
+# export AGENT_ADAPTIVE_SAMPLING=1
+# export AGENT_MODEL_DIRS=~/ai-inference/models
 """
     
     with open('agent_config.ini', 'w') as f:
@@ -461,9 +1556,18 @@ if __name__ == "__main__":
                        help='Configuration file path')
     parser.add_argument('--test-connection', action='store_true',
                        help='Test connection to dashboard server')
+    parser.add_argument('--lean', action='store_true',
+                       help='Defer optional imports until first use (same as lean_startup = true)')
+    parser.add_argument('--relay', metavar='HOST:PORT',
+                       help='Run as a relay accepting metrics from local agents (same as relay_listen)')
     
     args = parser.parse_args()
     
+    if args.lean:
+        os.environ['AGENT_LEAN_STARTUP'] = '1'
+    if args.relay:
+        os.environ['AGENT_RELAY_LISTEN'] = args.relay
+    
     if args.create_config:
         create_sample_config()
     elif args.test_connection:
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Home LLM Dashboard - Agent Benchmarks
+Measures the agent's own footprint: cold-start import cost, CPU per tick,
+memory growth over many ticks and per-collector latency. Collectors can run
+against simulated psutil/NVML/macmon back-ends so results are comparable on
+any Linux box. Each run is appended to a JSON lines history file and compared
+with the previous run.
+"""
+
+import argparse
+import importlib.machinery
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import types
+from collections import namedtuple
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+AGENT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_HISTORY = os.path.join(AGENT_DIR, 'benchmark_history.jsonl')
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def latency_summary(values: List[float]) -> Dict[str, float]:
+    """Summarise seconds as milliseconds."""
+    return {
+        'p50_ms': round(percentile(values, 50) * 1000, 4),
+        'p95_ms': round(percentile(values, 95) * 1000, 4),
+        'max_ms': round(max(values) * 1000, 4),
+        'mean_ms': round(sum(values) / len(values) * 1000, 4)
+    }
+
+
+# Simulated back-ends
+
+svmem = namedtuple('svmem', ['total', 'available', 'percent', 'used', 'free'])
+snetio = namedtuple('snetio', ['bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv'])
+sdiskio = namedtuple('sdiskio', ['read_count', 'write_count', 'read_bytes', 'write_bytes'])
+shwtemp = namedtuple('shwtemp', ['label', 'current', 'high', 'critical'])
+pmem = namedtuple('pmem', ['rss', 'vms'])
+
+
+class SimulatedPsutil(types.ModuleType):
+    """Stand-in for the parts of psutil the agent uses, with a churning process table."""
+
+    class NoSuchProcess(Exception):
+        pass
+
+    class AccessDenied(Exception):
+        pass
+
+    class ZombieProcess(NoSuchProcess):
+        pass
+
+    def __init__(self, process_count: int = 400, churn: int = 3, seed: int = 1):
+        super().__init__('psutil')
+        self.random = random.Random(seed)
+        self.churn = churn
+        self.next_pid = 1000
+        self.processes: Dict[int, Dict] = {}
+        self.bytes_sent = 0
+        self.bytes_read = 0
+        for index in range(process_count):
+            self._spawn(['llama-server', 'rpc-server', 'ollama'][index] if index < 3 else None)
+        self.Process = self._make_process_class()
+
+    def _spawn(self, name: Optional[str] = None):
+        pid = self.next_pid
+        self.next_pid += 1
+        name = name or self.random.choice(['bash', 'python3', 'sshd', 'systemd', 'node', 'chrome'])
+        self.processes[pid] = {
+            'name': name,
+            'cmdline': [name, '--flag', str(pid)],
+            'rss': self.random.randint(10, 4000) * 1024 ** 2,
+            'threads': self.random.randint(1, 64)
+        }
+
+    def _make_process_class(self):
+        table = self.processes
+        module = self
+
+        class Process:
+            def __init__(self, pid: int):
+                if pid not in table:
+                    raise module.NoSuchProcess(pid)
+                self.pid = pid
+
+            def _info(self) -> Dict:
+                info = table.get(self.pid)
+                if info is None:
+                    raise module.NoSuchProcess(self.pid)
+                return info
+
+            def name(self):
+                return self._info()['name']
+
+            def cmdline(self):
+                return self._info()['cmdline']
+
+            def cpu_percent(self, interval=None):
+                self._info()
+                return module.random.uniform(0, 400)
+
+            def memory_info(self):
+                return pmem(self._info()['rss'], self._info()['rss'] * 2)
+
+            def num_threads(self):
+                return self._info()['threads']
+
+            def net_connections(self, kind='inet'):
+                self._info()
+                return [None] * (self.pid % 4)
+
+            def is_running(self):
+                return self.pid in table
+
+            def oneshot(self):
+                return _NullContext()
+
+        return Process
+
+    def tick(self):
+        """Advance the simulation: some processes exit and new ones start."""
+        for pid in self.random.sample(sorted(self.processes)[3:], min(self.churn, len(self.processes) - 3)):
+            del self.processes[pid]
+        for _ in range(self.churn):
+            self._spawn()
+        self.bytes_sent += self.random.randint(0, 10 ** 6)
+        self.bytes_read += self.random.randint(0, 10 ** 7)
+
+    def pids(self):
+        return list(self.processes)
+
+    def cpu_percent(self, interval=None):
+        return self.random.uniform(0, 100)
+
+    def virtual_memory(self):
+        total = 24 * 1024 ** 3
+        used = self.random.randint(4, 20) * 1024 ** 3
+        return svmem(total, total - used, used / total * 100, used, total - used)
+
+    def net_io_counters(self):
+        return snetio(self.bytes_sent, self.bytes_sent * 3, 0, 0)
+
+    def disk_io_counters(self):
+        return sdiskio(0, 0, self.bytes_read, self.bytes_read // 4)
+
+    def sensors_temperatures(self):
+        return {'coretemp': [shwtemp('Core 0', self.random.uniform(40, 80), 90, 100)]}
+
+
+class _NullContext:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def simulated_pynvml() -> types.ModuleType:
+    """Fake pynvml module returning plausible RTX 3070 readings."""
+    module = types.ModuleType('pynvml')
+    module.__spec__ = importlib.machinery.ModuleSpec('pynvml', None)  # Lets find_spec see it
+    utilization = namedtuple('utilization', ['gpu', 'memory'])
+    memory = namedtuple('memory', ['total', 'used', 'free'])
+    module.nvmlInit = lambda: None
+    module.nvmlDeviceGetHandleByIndex = lambda index: object()
+    module.nvmlDeviceGetUtilizationRates = lambda handle: utilization(random.randint(0, 100), 0)
+    module.nvmlDeviceGetMemoryInfo = lambda handle: memory(8 * 1024 ** 3, 6 * 1024 ** 3, 2 * 1024 ** 3)
+    return module
+
+
+def simulated_subprocess(latency: float) -> types.ModuleType:
+    """Fake subprocess module answering `macmon pipe -s 1` after `latency` seconds."""
+    sample = json.dumps({
+        'ecpu_usage': [1000, 0.1], 'pcpu_usage': [3000, 0.3], 'gpu_usage': [1400, 0.5],
+        'memory': {'ram_usage': 14 * 1024 ** 3, 'ram_total': 24 * 1024 ** 3}
+    })
+    module = types.ModuleType('subprocess')
+    module.TimeoutExpired = subprocess.TimeoutExpired
+
+    def run(args, **kwargs):
+        time.sleep(latency)
+        return subprocess.CompletedProcess(args, 0, stdout=sample, stderr='')
+
+    module.run = run
+    return module
+
+
+def load_agent(backend: str, macmon_latency: float = 0.0):
+    """Import agent.py, optionally wired to simulated back-ends."""
+    sys.path.insert(0, AGENT_DIR)
+    if backend == 'simulated':
+        sys.modules['pynvml'] = simulated_pynvml()
+    import agent
+    agent.logger.setLevel('WARNING')
+    if backend == 'simulated':
+        fake_psutil = SimulatedPsutil()
+        agent.psutil = fake_psutil
+        agent.subprocess = simulated_subprocess(macmon_latency)
+    return agent
+
+
+def create_monitor(agent, backend: str):
+    monitor = agent.SystemMonitor()
+    if backend == 'simulated' and 'macmon' not in monitor.collectors:
+        # Exercise the macmon path on Linux as well
+        monitor.use_macmon = True
+        monitor.register_collector('macmon', monitor.get_macmon_metrics, timeout=5.0, parallel=True)
+    return monitor
+
+
+def advance(agent):
+    if isinstance(agent.psutil, SimulatedPsutil):
+        agent.psutil.tick()
+
+
+# Benchmarks
+
+STARTUP_SCRIPT = '''
+import sys, time, os, logging
+started = time.perf_counter()
+sys.path.insert(0, {agent_dir!r})
+import agent
+agent.logger.setLevel(logging.WARNING)
+instance = agent.DashboardAgent('/nonexistent/agent_config.ini')
+elapsed = time.perf_counter() - started
+import resource
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(elapsed, len(sys.modules), rss * (1 if sys.platform == 'darwin' else 1024))
+'''
+
+
+def run_python(code: str, env: Dict[str, str] = None) -> str:
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            env={**os.environ, **(env or {})}, timeout=60)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else 'failed')
+    return result.stdout.strip().splitlines()[-1]
+
+
+def bench_startup(repeat: int) -> Dict:
+    """Cold-start cost in fresh interpreters: dependency imports and agent construction."""
+    results = {}
+    for module in ('psutil', 'requests', 'pynvml', 'socketio'):
+        timings = []
+        for _ in range(repeat):
+            try:
+                timings.append(float(run_python(
+                    f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)")))
+            except RuntimeError:
+                break
+        results[f"import_{module}"] = latency_summary(timings) if timings else None
+
+    for mode, lean in (('agent_startup', '0'), ('agent_startup_lean', '1')):
+        timings, module_counts, peak_rss = [], [], []
+        for _ in range(repeat):
+            elapsed, modules, rss = run_python(STARTUP_SCRIPT.format(agent_dir=AGENT_DIR),
+                                               {'AGENT_LEAN_STARTUP': lean}).split()
+            timings.append(float(elapsed))
+            module_counts.append(int(modules))
+            peak_rss.append(int(rss))
+        results[mode] = {**latency_summary(timings), 'modules': max(module_counts),
+                         'peak_rss_mb': round(max(peak_rss) / 1024 ** 2, 2)}
+    return results
+
+
+def bench_tick(agent, backend: str, ticks: int) -> Dict:
+    """Wall and CPU time of collect_all_metrics per tick."""
+    monitor = create_monitor(agent, backend)
+    monitor.collect_all_metrics()  # Warm-up: first full process scan, NVML init
+
+    wall, cpu = [], []
+    for _ in range(ticks):
+        advance(agent)
+        for collector in monitor.collectors.values():
+            collector.last_run = 0  # Every collector is due every tick
+        started_wall, started_cpu = time.perf_counter(), time.process_time()
+        monitor.collect_all_metrics()
+        wall.append(time.perf_counter() - started_wall)
+        cpu.append(time.process_time() - started_cpu)
+
+    return {'wall': latency_summary(wall), 'cpu': latency_summary(cpu), 'ticks': ticks}
+
+
+def bench_collectors(agent, backend: str, runs: int) -> Dict:
+    """Latency of each collector run on its own."""
+    monitor = create_monitor(agent, backend)
+    results = {}
+    for name, collector in monitor.collectors.items():
+        collector.run()  # Warm-up
+        timings = []
+        for _ in range(runs):
+            advance(agent)
+            started = time.perf_counter()
+            collector.run()
+            timings.append(time.perf_counter() - started)
+        results[name] = latency_summary(timings)
+    return results
+
+
+def bench_memory(agent, backend: str, ticks: int, time_period: float) -> Dict:
+    """RSS and traced allocations before and after many ticks."""
+    import psutil as real_psutil
+    import tracemalloc
+
+    process = real_psutil.Process()
+    monitor = create_monitor(agent, backend)
+    for _ in range(50):
+        advance(agent)
+        monitor.collect_all_metrics()
+
+    tracemalloc.start()
+    rss_before = process.memory_info().rss
+    traced_before = tracemalloc.get_traced_memory()[0]
+    for _ in range(ticks):
+        advance(agent)
+        for collector in monitor.collectors.values():
+            collector.last_run = 0
+        monitor.collect_all_metrics()
+    traced_after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    rss_after = process.memory_info().rss
+
+    return {
+        'ticks': ticks,
+        'simulated_hours': round(ticks * time_period / 3600, 1),
+        'rss_before_mb': round(rss_before / 1024 ** 2, 2),
+        'rss_growth_kb': round((rss_after - rss_before) / 1024, 1),
+        'traced_growth_kb': round((traced_after - traced_before) / 1024, 1)
+    }
+
+
+# History
+
+def git_revision() -> str:
+    try:
+        result = subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True,
+                                text=True, cwd=AGENT_DIR, timeout=5)
+        return result.stdout.strip() or 'unknown'
+    except (OSError, subprocess.SubprocessError):
+        return 'unknown'
+
+
+def flatten(results: Dict, prefix: str = '') -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def load_previous(history_path: str, backend: str) -> Optional[Dict]:
+    if not os.path.exists(history_path):
+        return None
+    previous = None
+    with open(history_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get('backend') == backend:
+                previous = record
+    return previous
+
+
+def print_comparison(current: Dict, previous: Optional[Dict]):
+    current_flat = flatten(current['results'])
+    previous_flat = flatten(previous['results']) if previous else {}
+    header = f"vs {previous['revision']}" if previous else 'no previous run'
+    print(f"\n{'metric':<55} {'value':>12}  {header}")
+    for name, value in current_flat.items():
+        line = f"{name:<55} {value:>12}"
+        old = previous_flat.get(name)
+        if old:
+            change = (value - old) / old * 100
+            line += f"  {change:+.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Home LLM Dashboard agent benchmarks')
+    parser.add_argument('--suite', choices=['all', 'startup', 'tick', 'collectors', 'memory'], default='all')
+    parser.add_argument('--backend', choices=['simulated', 'real'], default='simulated',
+                        help='Run collectors against simulated psutil/NVML/macmon or the real system')
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreters per startup measurement')
+    parser.add_argument('--ticks', type=int, default=500, help='Ticks for the per-tick benchmark')
+    parser.add_argument('--memory-ticks', type=int, default=5000,
+                        help='Ticks for the memory growth benchmark (5000 ticks = ~7h at 5s)')
+    parser.add_argument('--macmon-latency', type=float, default=0.0,
+                        help='Simulated macmon sampling delay in seconds')
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='JSON lines file of previous runs')
+    parser.add_argument('--no-save', action='store_true', help='Do not append this run to the history')
+    args = parser.parse_args()
+
+    results = {}
+    suites = ['startup', 'tick', 'collectors', 'memory'] if args.suite == 'all' else [args.suite]
+    if 'startup' in suites:
+        results['startup'] = bench_startup(args.repeat)
+
+    if set(suites) - {'startup'}:
+        agent = load_agent(args.backend, args.macmon_latency)
+        if 'tick' in suites:
+            results['tick'] = bench_tick(agent, args.backend, args.ticks)
+        if 'collectors' in suites:
+            results['collectors'] = bench_collectors(agent, args.backend, args.ticks)
+        if 'memory' in suites:
+            results['memory'] = bench_memory(agent, args.backend, args.memory_ticks, 5)
+
+    record = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'revision': git_revision(),
+        'backend': args.backend,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results
+    }
+
+    print_comparison(record, load_previous(args.history, args.backend))
+    if not args.no_save:
+        with open(args.history, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+        print(f"\nResults appended to {args.history}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Home LLM Dashboard - Agent Stream Protocol
+Decoder for the persistent agent channel: a handshake carrying static device
+info, followed by delta-encoded and optionally compressed sample frames.
+"""
+
+import json
+import zlib
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = 1
+SUPPORTED_COMPRESSION = ['zlib']
+
+
+def negotiate_compression(offered: List[str]) -> str:
+    """Pick the first compression method offered by the agent that we support."""
+    for method in offered or []:
+        if method in SUPPORTED_COMPRESSION:
+            return method
+    return 'none'
+
+
+class AgentStreamSession:
+    """Decoding state for one connected agent.
+
+    Frames are JSON arrays `[seq, index, value, index, value, ...]` where each
+    index refers to the field list sent in the handshake. Only fields that
+    changed since the previous frame are included; the handshake's static
+    fields form the starting state. With zlib compression the agent keeps one
+    compressor for the whole session and sync-flushes each frame, so frames
+    must be decoded in order. Any inconsistency is resolved by a new handshake.
+    """
+
+    def __init__(self, hello: Dict):
+        self.device_name = hello['device_name']
+        self.fields: List[str] = list(hello.get('fields', []))
+        self.state: Dict = dict(hello.get('static', {}))
+        self.compression = negotiate_compression(hello.get('compression', []))
+        self.decompressor = zlib.decompressobj() if self.compression == 'zlib' else None
+        self.last_seq = 0
+        self.frames = 0
+        self.bytes_received = 0
+
+    def handshake_reply(self) -> Dict:
+        return {
+            'status': 'ok',
+            'protocol': PROTOCOL_VERSION,
+            'compression': self.compression
+        }
+
+    def decode(self, payload) -> Optional[Dict]:
+        """Apply one frame and return the full metrics, or None if a new handshake is needed."""
+        if isinstance(payload, (bytes, bytearray)):
+            self.bytes_received += len(payload)
+            if self.decompressor is not None:
+                payload = self.decompressor.decompress(payload)
+            frame = json.loads(payload)
+        else:
+            frame = payload
+
+        seq = frame[0]
+        if seq != self.last_seq + 1:
+            logger.warning(f"Stream from {self.device_name} jumped from frame {self.last_seq} to {seq}, "
+                           f"requesting a new handshake")
+            return None
+
+        for index, value in zip(frame[1::2], frame[2::2]):
+            self.state[self.fields[index]] = value
+
+        self.last_seq = seq
+        self.frames += 1
+        return dict(self.state)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Home LLM Dashboard - Metrics Aggregation
+Vectorized downsampling and summary statistics over metric column arrays.
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from storage import METRIC_COLUMNS, column_values, empty_columns
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PERCENTILES = [50, 95, 99]
+
+# Columns of the combined series for a group of devices
+CLUSTER_COLUMNS = ['vram_used', 'vram_free', 'network_tx', 'network_rx', 'gpu_usage_max', 'devices']
+
+
+def resolution_for_points(hours: float, points: int) -> int:
+    """Pick a whole-second bucket size that yields at most `points` buckets."""
+    if points <= 0:
+        return 0
+    return max(1, int(np.ceil(hours * 3600 / points)))
+
+
+def downsample(columns: Dict[str, np.ndarray], resolution: int,
+               column_names: List[str] = METRIC_COLUMNS) -> Dict[str, np.ndarray]:
+    """Average samples into epoch-aligned buckets of `resolution` seconds.
+
+    Missing values are ignored; a bucket with no values for a column yields NaN.
+    Bucket timestamps are the bucket start times.
+    """
+    timestamps = columns['timestamp']
+    if resolution <= 0 or len(timestamps) == 0:
+        return columns
+
+    buckets = np.floor(timestamps / resolution).astype(np.int64)
+    unique_buckets, inverse = np.unique(buckets, return_inverse=True)
+    bucket_count = len(unique_buckets)
+
+    result = {'timestamp': unique_buckets.astype(np.float64) * resolution}
+    for column in column_names:
+        values = columns[column].astype(np.float64)
+        valid = ~np.isnan(values)
+        sums = np.bincount(inverse[valid], weights=values[valid], minlength=bucket_count)
+        counts = np.bincount(inverse[valid], minlength=bucket_count)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result[column] = sums / counts
+    return result
+
+
+def carry_forward(matrix: np.ndarray, times: np.ndarray, max_gap: float) -> np.ndarray:
+    """Fill NaNs in each column with the last value seen at most `max_gap` seconds earlier."""
+    rows = np.arange(len(times))[:, None]
+    last = np.where(np.isnan(matrix), -1, rows)
+    np.maximum.accumulate(last, axis=0, out=last)
+    source = np.maximum(last, 0)
+    filled = matrix[source, np.arange(matrix.shape[1])]
+    filled[(last < 0) | (times[:, None] - times[source] > max_gap)] = np.nan
+    return filled
+
+
+def cluster_aggregate(groups: Dict[str, Dict[str, np.ndarray]], resolution: int,
+                      max_gap: float) -> Dict[str, np.ndarray]:
+    """Combine the series of several devices into one time-aligned series.
+
+    Samples of all devices are bucketed together, keyed by (bucket, device), so
+    one bincount per column yields a bucket x device matrix of means. A device
+    without a sample in a bucket carries its previous value forward for up to
+    `max_gap` seconds; otherwise agents sampling slower than the resolution would
+    make the sums dip. GPU memory is VRAM, or RAM for devices that never report
+    VRAM (Apple Silicon unified memory). Memory and network are summed over the
+    devices, GPU usage is the maximum, and `devices` counts those contributing.
+    """
+    names = [name for name, columns in groups.items() if len(columns['timestamp'])]
+    if resolution <= 0 or not names:
+        return empty_columns(CLUSTER_COLUMNS)
+
+    device_count = len(names)
+    timestamps = np.concatenate([groups[name]['timestamp'] for name in names])
+    device_index = np.repeat(np.arange(device_count), [len(groups[name]['timestamp']) for name in names])
+    unique_buckets, row = np.unique(np.floor(timestamps / resolution).astype(np.int64), return_inverse=True)
+    bucket_times = unique_buckets.astype(np.float64) * resolution
+    cells = row * device_count + device_index
+    size = len(unique_buckets) * device_count
+
+    def device_matrix(columns: List[np.ndarray]) -> np.ndarray:
+        values = np.concatenate(columns).astype(np.float64)
+        valid = ~np.isnan(values)
+        sums = np.bincount(cells[valid], weights=values[valid], minlength=size)
+        counts = np.bincount(cells[valid], minlength=size)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = (sums / counts).reshape(-1, device_count)
+        return carry_forward(means, bucket_times, max_gap)
+
+    def memory_columns(used: bool) -> List[np.ndarray]:
+        columns = []
+        for name in names:
+            device = groups[name]
+            unified = np.isnan(device['vram_total']).all()
+            columns.append(device[('ram_' if unified else 'vram_') + ('usage' if used else 'total')])
+        return columns
+
+    def total(matrix: np.ndarray) -> np.ndarray:
+        sums = np.nansum(matrix, axis=1)
+        sums[np.isnan(matrix).all(axis=1)] = np.nan
+        return sums
+
+    used = device_matrix(memory_columns(True))
+    reporting = device_matrix([np.ones(len(groups[name]['timestamp'])) for name in names])
+    return {
+        'timestamp': bucket_times,
+        'vram_used': total(used),
+        'vram_free': total(device_matrix(memory_columns(False)) - used),
+        'network_tx': total(device_matrix([groups[name]['network_tx'] for name in names])),
+        'network_rx': total(device_matrix([groups[name]['network_rx'] for name in names])),
+        # fmax ignores NaN and gives NaN only when no device reported
+        'gpu_usage_max': np.fmax.reduce(device_matrix([groups[name]['gpu_usage'] for name in names]), axis=1),
+        'devices': np.nansum(reporting, axis=1)
+    }
+
+
+def summarize(columns: Dict[str, np.ndarray]) -> Dict[str, Optional[Dict[str, float]]]:
+    """Compute mean, p50, p95, p99 and max for every metric column."""
+    summary = {}
+    for column in METRIC_COLUMNS:
+        values = columns[column]
+        values = values[~np.isnan(values)].astype(np.float64)
+        if values.size == 0:
+            summary[column] = None
+            continue
+
+        p50, p95, p99 = np.percentile(values, SUMMARY_PERCENTILES)
+        summary[column] = {
+            'mean': round(float(values.mean()), 4),
+            'p50': round(float(p50), 4),
+            'p95': round(float(p95), 4),
+            'p99': round(float(p99), 4),
+            'max': round(float(values.max()), 4),
+            'count': int(values.size)
+        }
+    return summary
+
+
+def columns_to_json(columns: Dict[str, np.ndarray], column_names: List[str] = METRIC_COLUMNS) -> Dict[str, List]:
+    """Convert column arrays to a chronological columnar JSON payload.
+
+    Timestamps are epoch milliseconds, which the browser can use directly.
+    """
+    payload = {'timestamp': np.round(columns['timestamp'] * 1000).astype(np.int64).tolist()}
+    for column in column_names:
+        payload[column] = column_values(columns[column])
+    return payload
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Home LLM Dashboard - Alerting
+Rule engine that evaluates incoming metrics incrementally and dispatches alerts.
+"""
+
+import json
+import math
+import os
+import queue
+import threading
+import time
+import logging
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+from storage import format_timestamp, parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+COMPARATORS = {
+    '>': lambda value, limit: value > limit,
+    '>=': lambda value, limit: value >= limit,
+    '<': lambda value, limit: value < limit,
+    '<=': lambda value, limit: value <= limit
+}
+
+
+class AlertRule(ABC):
+    """Base class for alert rules.
+
+    Rules keep their rolling state in a per-device dict owned by the engine, so
+    evaluating a sample never looks further back than that state.
+    """
+
+    def __init__(self, rule: Dict):
+        self.id = rule['id']
+        self.metric = rule.get('metric')
+        self.severity = rule.get('severity', 'warning')
+        self.devices = rule.get('devices', ['*'])
+        self.for_samples = int(rule.get('for_samples', 1))
+        self.message = rule.get('message', '')
+
+    def applies_to(self, device_name: str) -> bool:
+        return '*' in self.devices or device_name in self.devices
+
+    def new_state(self) -> Dict:
+        return {}
+
+    @abstractmethod
+    def evaluate(self, state: Dict, timestamp: float, metrics: Dict) -> Optional[tuple]:
+        """Update state with one sample and return (breached, value), or None without data."""
+
+    def describe(self, device_name: str, value: Optional[float]) -> str:
+        if self.message:
+            return self.message.format(device=device_name, value=value)
+        return f"{self.id} on {device_name}" + (f" (value: {value:.2f})" if value is not None else '')
+
+
+class ThresholdRule(AlertRule):
+    """Fires when a metric, optionally as a fraction of another, crosses a limit."""
+
+    def __init__(self, rule: Dict):
+        super().__init__(rule)
+        self.ratio_of = rule.get('ratio_of')
+        self.compare = COMPARATORS[rule.get('op', '>')]
+        self.limit = float(rule['value'])
+
+    def evaluate(self, state: Dict, timestamp: float, metrics: Dict) -> Optional[tuple]:
+        value = metrics.get(self.metric)
+        if value is None:
+            return None
+        if self.ratio_of:
+            total = metrics.get(self.ratio_of)
+            if not total:
+                return None
+            value = value / total
+        return self.compare(value, self.limit), value
+
+
+class RateOfChangeRule(AlertRule):
+    """Fires when a metric changes faster than `value` units per second over a window."""
+
+    def __init__(self, rule: Dict):
+        super().__init__(rule)
+        self.limit = float(rule['value'])
+        self.window_seconds = float(rule.get('window_seconds', 30))
+
+    def new_state(self) -> Dict:
+        return {'samples': deque()}
+
+    def evaluate(self, state: Dict, timestamp: float, metrics: Dict) -> Optional[tuple]:
+        value = metrics.get(self.metric)
+        if value is None:
+            return None
+
+        samples = state['samples']
+        samples.append((timestamp, value))
+        # Each sample is appended and popped once, so this is amortised O(1)
+        while len(samples) > 2 and timestamp - samples[1][0] >= self.window_seconds:
+            samples.popleft()
+
+        oldest_time, oldest_value = samples[0]
+        elapsed = timestamp - oldest_time
+        if elapsed <= 0:
+            return None
+        rate = (value - oldest_value) / elapsed
+        return abs(rate) > self.limit, rate
+
+
+class ZScoreRule(AlertRule):
+    """Fires when a sample deviates more than `value` standard deviations from a rolling window."""
+
+    def __init__(self, rule: Dict):
+        super().__init__(rule)
+        self.limit = float(rule.get('value', 3.0))
+        self.window = int(rule.get('window', 120))
+        self.min_samples = int(rule.get('min_samples', 30))
+
+    def new_state(self) -> Dict:
+        return {'values': deque(), 'sum': 0.0, 'sum_sq': 0.0}
+
+    def evaluate(self, state: Dict, timestamp: float, metrics: Dict) -> Optional[tuple]:
+        value = metrics.get(self.metric)
+        if value is None:
+            return None
+
+        values = state['values']
+        result = None
+        count = len(values)
+        if count >= self.min_samples:
+            mean = state['sum'] / count
+            variance = max(state['sum_sq'] / count - mean * mean, 0.0)
+            std = math.sqrt(variance)
+            z_score = (value - mean) / std if std > 1e-9 else 0.0
+            result = (abs(z_score) > self.limit, z_score)
+
+        # Update running sums after scoring so a spike does not mask itself
+        values.append(value)
+        state['sum'] += value
+        state['sum_sq'] += value * value
+        if len(values) > self.window:
+            removed = values.popleft()
+            state['sum'] -= removed
+            state['sum_sq'] -= removed * removed
+
+        return result
+
+
+class AbsenceRule(AlertRule):
+    """Fires when a device has not reported for longer than the offline threshold."""
+
+    def __init__(self, rule: Dict, offline_threshold: int):
+        super().__init__(rule)
+        self.threshold = float(rule.get('value', offline_threshold))
+
+    def evaluate(self, state: Dict, timestamp: float, metrics: Dict) -> Optional[tuple]:
+        # Receiving a sample always means the device is present
+        return False, 0.0
+
+    def describe(self, device_name: str, value: Optional[float]) -> str:
+        if self.message:
+            return self.message.format(device=device_name, value=value)
+        return f"{device_name} has not reported for {value:.0f}s"
+
+
+RULE_TYPES = {
+    'threshold': ThresholdRule,
+    'rate_of_change': RateOfChangeRule,
+    'zscore': ZScoreRule
+}
+
+
+class WebhookSink:
+    """Posts alerts to a local webhook from a background thread."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.queue = queue.Queue(maxsize=1000)
+        self.session = requests.Session()
+        thread = threading.Thread(target=self._worker)
+        thread.daemon = True
+        thread.start()
+
+    def __call__(self, alert: Dict):
+        try:
+            self.queue.put_nowait(alert)
+        except queue.Full:
+            logger.warning("Alert webhook queue is full, dropping alert")
+
+    def _worker(self):
+        while True:
+            alert = self.queue.get()
+            try:
+                response = self.session.post(self.url, json=alert, timeout=5)
+                if response.status_code >= 400:
+                    logger.warning(f"Alert webhook returned HTTP {response.status_code}")
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Failed to deliver alert webhook: {e}")
+
+
+class LogSink:
+    """Writes alerts to the dashboard log and optionally a JSON lines file."""
+
+    def __init__(self, log_path: str = ''):
+        self.log_path = log_path
+        self.lock = threading.Lock()
+
+    def __call__(self, alert: Dict):
+        log = logger.warning if alert['state'] == 'firing' else logger.info
+        log(f"Alert {alert['state']}: [{alert['severity']}] {alert['message']}")
+
+        if self.log_path:
+            with self.lock:
+                with open(self.log_path, 'a') as f:
+                    f.write(json.dumps(alert) + '\n')
+
+
+class AlertEngine:
+    """Evaluates alert rules on each incoming sample and dispatches state changes."""
+
+    def __init__(self, rules_file: str, offline_threshold: int, sinks: List[Callable[[Dict], None]]):
+        self.rules_file = rules_file
+        self.offline_threshold = offline_threshold
+        self.sinks = sinks
+        self.lock = threading.Lock()
+        self.states: Dict[tuple, Dict] = {}
+        self.last_seen: Dict[str, float] = {}
+        self.active: Dict[tuple, Dict] = {}
+        self.history = deque(maxlen=200)
+        self.rules, self.absence_rules = self.load_rules()
+
+    def load_rules(self) -> tuple:
+        """Load alert rules from the JSON rules file."""
+        rules = []
+        absence_rules = []
+        try:
+            if not os.path.exists(self.rules_file):
+                logger.warning(f"Alert rules file {self.rules_file} not found, alerting disabled")
+                return rules, absence_rules
+
+            with open(self.rules_file, 'r') as f:
+                definitions = json.load(f).get('rules', [])
+
+            for definition in definitions:
+                rule_type = definition.get('type')
+                if rule_type == 'absence':
+                    absence_rules.append(AbsenceRule(definition, self.offline_threshold))
+                elif rule_type in RULE_TYPES:
+                    rules.append(RULE_TYPES[rule_type](definition))
+                else:
+                    logger.warning(f"Unknown alert rule type '{rule_type}' in {definition.get('id')}")
+
+            logger.info(f"Loaded {len(rules) + len(absence_rules)} alert rules from {self.rules_file}")
+        except (json.JSONDecodeError, KeyError, ValueError) as e:
+            logger.error(f"Invalid alert rules in {self.rules_file}: {e}")
+        return rules, absence_rules
+
+    def seed_last_seen(self, latest_metrics: Dict[str, Dict]):
+        """Seed last-seen times from stored data so absence survives restarts."""
+        for device_name, metrics in latest_metrics.items():
+            timestamp = parse_timestamp(metrics.get('timestamp'))
+            if timestamp is not None:
+                self.last_seen.setdefault(device_name, timestamp)
+
+    def observe(self, device_name: str, metrics: Dict, timestamp: float):
+        """Evaluate every rule against one incoming sample."""
+        changes = []
+        with self.lock:
+            self.last_seen[device_name] = timestamp
+            for rule in self.rules + self.absence_rules:
+                if not rule.applies_to(device_name):
+                    continue
+                key = (rule.id, device_name)
+                state = self.states.get(key)
+                if state is None:
+                    state = self.states[key] = rule.new_state()
+                    state['breaches'] = 0
+
+                try:
+                    result = rule.evaluate(state, timestamp, metrics)
+                except (TypeError, ValueError, ZeroDivisionError) as e:
+                    logger.debug(f"Alert rule {rule.id} failed for {device_name}: {e}")
+                    continue
+                if result is None:
+                    continue
+
+                change = self._transition(rule, device_name, state, result, timestamp)
+                if change:
+                    changes.append(change)
+
+        self._dispatch(changes)
+
+    def check_absence(self, now: float = None):
+        """Fire absence rules for devices that stopped reporting."""
+        now = now or time.time()
+        changes = []
+        with self.lock:
+            for rule in self.absence_rules:
+                for device_name, last_seen in self.last_seen.items():
+                    if not rule.applies_to(device_name):
+                        continue
+                    key = (rule.id, device_name)
+                    state = self.states.setdefault(key, {'breaches': 0})
+                    silence = now - last_seen
+                    change = self._transition(rule, device_name, state,
+                                              (silence > rule.threshold, silence), now)
+                    if change:
+                        changes.append(change)
+
+        self._dispatch(changes)
+
+    def _transition(self, rule: AlertRule, device_name: str, state: Dict,
+                    result: tuple, timestamp: float) -> Optional[Dict]:
+        """Track consecutive breaches and return an alert on firing/resolving."""
+        breached, value = result
+        key = (rule.id, device_name)
+
+        if breached:
+            state['breaches'] += 1
+            if state['breaches'] >= rule.for_samples and key not in self.active:
+                alert = self._make_alert(rule, device_name, 'firing', value, timestamp)
+                self.active[key] = alert
+                return alert
+        else:
+            state['breaches'] = 0
+            if key in self.active:
+                del self.active[key]
+                return self._make_alert(rule, device_name, 'resolved', value, timestamp)
+        return None
+
+    @staticmethod
+    def _make_alert(rule: AlertRule, device_name: str, state: str,
+                    value: Optional[float], timestamp: float) -> Dict:
+        return {
+            'rule': rule.id,
+            'device_name': device_name,
+            'state': state,
+            'severity': rule.severity,
+            'metric': rule.metric,
+            'value': round(value, 4) if value is not None else None,
+            'message': rule.describe(device_name, value),
+            'timestamp': format_timestamp(datetime.fromtimestamp(timestamp, timezone.utc))
+        }
+
+    def _dispatch(self, alerts: List[Dict]):
+        if not alerts:
+            return
+        with self.lock:
+            self.history.extend(alerts)
+        # Sinks run outside the lock, so a slow sink never holds up ingest
+        for alert in alerts:
+            for sink in self.sinks:
+                try:
+                    sink(alert)
+                except Exception as e:
+                    logger.error(f"Alert sink failed: {e}")
+
+    def get_alerts(self) -> Dict:
+        """Get active alerts and recent alert history."""
+        with self.lock:
+            return {
+                'active': list(self.active.values()),
+                'history': list(self.history)[::-1]
+            }
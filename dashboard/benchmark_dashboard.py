@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Home LLM Dashboard - Query Benchmarks
+Runs every history endpoint and store operation against a store filled by
+generate_fleet_data.py and reports latency percentiles, rows scanned and
+payload size per time range. Each run is appended to a JSON lines history
+file and compared with the previous run on the same dataset.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from generate_fleet_data import configure_environment
+
+DASHBOARD_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_HISTORY = os.path.join(DASHBOARD_DIR, 'benchmark_history.jsonl')
+RANGES_HOURS = [1, 6, 24, 72, 168]
+
+
+class RowCounter:
+    """Counts rows returned by the store's column queries during a request."""
+
+    def __init__(self, store):
+        self.rows = 0
+        for name in ('get_metric_columns', 'get_process_columns'):
+            setattr(store, name, self._wrap(getattr(store, name)))
+
+    def _wrap(self, method: Callable) -> Callable:
+        def counted(*args, **kwargs):
+            result = method(*args, **kwargs)
+            self.rows += sum(len(columns['timestamp']) for columns in result.values())
+            return result
+        return counted
+
+
+def measure(run: Callable[[], int], counter: RowCounter, repeat: int,
+            reset: Optional[Callable[[], None]] = None) -> Dict:
+    """Time `run` (which returns a payload size) and summarise the timings.
+
+    `reset` is called untimed before every run, e.g. to empty the history cache.
+    """
+    timings = []
+    payload = rows = 0
+    for _ in range(repeat):
+        if reset:
+            reset()
+        counter.rows = 0
+        started = time.perf_counter()
+        payload = run()
+        timings.append(time.perf_counter() - started)
+        rows = counter.rows
+
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99]) * 1000
+    return {
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'max_ms': round(max(timings) * 1000, 3),
+        'rows_scanned': rows,
+        'payload_bytes': payload
+    }
+
+
+def endpoint_cases(device_name: str) -> Dict[str, Callable[[int], str]]:
+    """URL builders per endpoint, taking a time range in hours."""
+    return {
+        'history_rows': lambda hours: f"/api/metrics/{device_name}?hours={hours}",
+        'history_500_points': lambda hours: f"/api/metrics/{device_name}?hours={hours}&points=500",
+        'history_columns': lambda hours: f"/api/metrics/{device_name}?hours={hours}&format=columns&points=500",
+        'processes': lambda hours: f"/api/metrics/{device_name}/processes?hours={hours}&points=300",
+        'summary_all_devices': lambda hours: f"/api/metrics/summary?hours={hours}"
+    }
+
+
+def run_benchmarks(manifest: Dict, repeat: int, ranges: List[int]) -> Dict:
+    configure_environment(manifest['backend'], manifest['db'], manifest['ring_path'],
+                          manifest['slots'], manifest['days'])
+    import dashboard
+
+    store = dashboard.db_manager
+    counter = RowCounter(store)
+    client = dashboard.app.test_client()
+    with client.session_transaction() as session:
+        session['authenticated'] = True
+
+    devices = sorted(store.get_latest_metrics())
+    if not devices:
+        raise SystemExit('The store is empty, run generate_fleet_data.py first')
+    device_name = devices[0]
+
+    def get(url: str) -> Callable[[], int]:
+        def run() -> int:
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} returned HTTP {response.status_code}")
+            return len(response.get_data())
+        return run
+
+    # Uncached cases start every run from an empty history cache, cached cases reuse the warm one
+    cache = dashboard.history_cache
+    results = {'endpoints': {}, 'store': {}}
+    for name, url in endpoint_cases(device_name).items():
+        for hours in ranges:
+            results['endpoints'][f"{name}.{hours}h"] = measure(get(url(hours)), counter, repeat, cache.clear)
+            if cache.enabled:
+                results['endpoints'][f"{name}.{hours}h.cached"] = measure(get(url(hours)), counter, repeat)
+    results['endpoints']['latest'] = measure(get('/api/metrics/latest'), counter, repeat, cache.clear)
+    results['endpoints']['openmetrics'] = measure(get('/metrics'), counter, repeat, cache.clear)
+
+    for hours in ranges:
+        results['store'][f"get_metrics.{hours}h"] = measure(
+            lambda: len(store.get_metrics(device_name, hours)), counter, repeat)
+    results['store']['get_latest_metrics'] = measure(
+        lambda: len(store.get_latest_metrics()), counter, repeat)
+    results['store']['cleanup_old_data'] = bench_cleanup(manifest, repeat)
+    return results
+
+
+def bench_cleanup(manifest: Dict, repeat: int) -> Dict:
+    """Time cleanup on a copy of the store with retention set to drop the oldest day."""
+    from storage import RingBufferStore
+    import dashboard
+
+    timings, deleted = [], 0
+    retention_days = max(1, int(manifest['days']) - 1)
+    for _ in range(max(1, min(repeat, 3))):
+        with tempfile.TemporaryDirectory() as scratch:
+            if manifest['backend'] == 'sqlite':
+                path = os.path.join(scratch, 'copy.db')
+                shutil.copyfile(manifest['db'], path)
+                store = dashboard.DatabaseManager(path)
+                before = count_rows(path)
+                dashboard.DATA_RETENTION_DAYS, saved = retention_days, dashboard.DATA_RETENTION_DAYS
+                try:
+                    started = time.perf_counter()
+                    store.cleanup_old_data()
+                    timings.append(time.perf_counter() - started)
+                finally:
+                    dashboard.DATA_RETENTION_DAYS = saved
+                deleted = before - count_rows(path)
+            else:
+                path = os.path.join(scratch, 'rings')
+                shutil.copytree(manifest['ring_path'], path)
+                store = RingBufferStore(path, manifest['slots'], retention_days)
+                started = time.perf_counter()
+                store.cleanup_old_data()
+                timings.append(time.perf_counter() - started)
+
+    return {
+        'p50_ms': round(float(np.percentile(timings, 50)) * 1000, 3),
+        'max_ms': round(max(timings) * 1000, 3),
+        'retention_days': retention_days,
+        'rows_deleted': deleted
+    }
+
+
+def count_rows(db_path: str) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM device_metrics').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def git_revision() -> str:
+    try:
+        result = subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True,
+                                text=True, cwd=DASHBOARD_DIR, timeout=5)
+        return result.stdout.strip() or 'unknown'
+    except (OSError, subprocess.SubprocessError):
+        return 'unknown'
+
+
+def dataset_key(manifest: Dict) -> str:
+    return f"{manifest['backend']}:{manifest['devices']}x{manifest['days']}d@{manifest['interval']}s"
+
+
+def load_previous(history_path: str, dataset: str) -> Optional[Dict]:
+    if not os.path.exists(history_path):
+        return None
+    previous = None
+    with open(history_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get('dataset') == dataset:
+                previous = record
+    return previous
+
+
+def print_report(record: Dict, previous: Optional[Dict]):
+    header = f"vs {previous['revision']}" if previous else 'no previous run'
+    print(f"\nDataset {record['dataset']} ({header})")
+    print(f"{'case':<40} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'rows':>10} {'bytes':>12}  p50 change")
+    for section in ('endpoints', 'store'):
+        for case, stats in record['results'][section].items():
+            change = ''
+            old = (previous or {}).get('results', {}).get(section, {}).get(case)
+            if old and old.get('p50_ms'):
+                change = f"{(stats['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100:+.1f}%"
+            print(f"{section[0]}:{case:<38} {stats.get('p50_ms', ''):>10} {stats.get('p95_ms', ''):>10} "
+                  f"{stats.get('p99_ms', ''):>10} {stats.get('rows_scanned', ''):>10} "
+                  f"{stats.get('payload_bytes', stats.get('rows_deleted', '')):>12}  {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dashboard queries on generated fleet data')
+    parser.add_argument('--manifest', default='bench_dashboard.db.fleet.json',
+                        help='Manifest written by generate_fleet_data.py')
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per case')
+    parser.add_argument('--ranges', default=','.join(str(hours) for hours in RANGES_HOURS),
+                        help='Comma-separated time ranges in hours')
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='JSON lines file of previous runs')
+    parser.add_argument('--no-save', action='store_true', help='Do not append this run to the history')
+    args = parser.parse_args()
+
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+
+    ranges = [int(hours) for hours in args.ranges.split(',')]
+    record = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'revision': git_revision(),
+        'dataset': dataset_key(manifest),
+        'results': run_benchmarks(manifest, args.repeat, ranges)
+    }
+
+    print_report(record, load_previous(args.history, record['dataset']))
+    if not args.no_save:
+        with open(args.history, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+        print(f"\nResults appended to {args.history}")
+
+
+if __name__ == '__main__':
+    main()
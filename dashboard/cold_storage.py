@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Home LLM Dashboard - Cold Storage Codec
+Packs a block of samples into a compact BLOB: delta-of-delta encoded timestamps and
+Gorilla-style XOR compressed float columns, both encoded and decoded with NumPy.
+"""
+
+import logging
+import struct
+import zlib
+from typing import Dict, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SECONDS = 3600
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<BIqH')  # version, sample count, first timestamp (ms), column count
+SEGMENT = struct.Struct('<I')
+TIMESTAMP_DTYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+def _segments(*parts: bytes) -> bytes:
+    return b''.join(SEGMENT.pack(len(part)) + part for part in parts)
+
+
+def _read_segments(blob: bytes, offset: int, count: int) -> List[bytes]:
+    parts = []
+    for _ in range(count):
+        (length,) = SEGMENT.unpack_from(blob, offset)
+        offset += SEGMENT.size
+        parts.append(blob[offset:offset + length])
+        offset += length
+    return parts
+
+
+def _zigzag(values: np.ndarray) -> np.ndarray:
+    return (values << 1) ^ (values >> 63)
+
+
+def _unzigzag(values: np.ndarray) -> np.ndarray:
+    return (values >> 1) ^ -(values & 1)
+
+
+def encode_timestamps(timestamps_ms: np.ndarray) -> bytes:
+    """Delta-of-delta encode millisecond timestamps after the first.
+
+    Regular sampling makes nearly every delta-of-delta zero or tiny, so they are
+    stored in the narrowest integer type that fits and deflated.
+    """
+    deltas = np.diff(timestamps_ms)
+    dods = _zigzag(np.diff(deltas, prepend=0))
+    limit = int(dods.max()) if len(dods) else 0
+    code = next(index for index, dtype in enumerate(TIMESTAMP_DTYPES) if limit <= np.iinfo(dtype).max)
+    return bytes([code]) + zlib.compress(dods.astype(TIMESTAMP_DTYPES[code]).tobytes())
+
+
+def decode_timestamps(data: bytes, first_ms: int, count: int) -> np.ndarray:
+    dods = np.frombuffer(zlib.decompress(data[1:]), dtype=TIMESTAMP_DTYPES[data[0]]).astype(np.int64)
+    timestamps = np.empty(count, dtype=np.int64)
+    timestamps[0] = first_ms
+    timestamps[1:] = first_ms + np.cumsum(np.cumsum(_unzigzag(dods)))
+    return timestamps
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Bit length of values below 2**32, which float64 and frexp represent exactly."""
+    return np.frexp(values.astype(np.float64))[1].astype(np.int64)
+
+
+def _leading_zeros(values: np.ndarray) -> np.ndarray:
+    """Count leading zero bits of uint64 values (64 for zero)."""
+    high = values >> np.uint64(32)
+    low = values & np.uint64(0xFFFFFFFF)
+    return np.where(high != 0, 32 - _bit_length(high), 64 - _bit_length(low))
+
+
+def _trailing_zeros(values: np.ndarray) -> np.ndarray:
+    """Count trailing zero bits of uint64 values (64 for zero)."""
+    lowest = values & (~values + np.uint64(1))
+    return np.where(values != 0, 63 - _leading_zeros(lowest), 64)
+
+
+def encode_floats(values: np.ndarray) -> bytes:
+    """Gorilla-style XOR compression of a float64 column.
+
+    Each value is XORed with its predecessor. A zero XOR (a repeated value, the
+    common case for totals and idle metrics) costs nothing beyond its header;
+    otherwise only the meaningful bits between the leading and trailing zeros are
+    kept. Per-value headers (leading zeros, meaningful length) are stored as byte
+    streams and deflated, and the meaningful bits are packed into one bitstream,
+    which keeps both directions vectorised.
+    """
+    bits = np.ascontiguousarray(values, dtype=np.float64).view(np.uint64)
+    xors = bits ^ np.concatenate([[np.uint64(0)], bits[:-1]])
+    leading = _leading_zeros(xors)
+    trailing = _trailing_zeros(xors)
+    lengths = np.where(xors != 0, 64 - leading - trailing, 0)
+    leading = np.where(xors != 0, leading, 0)
+
+    meaningful = xors >> np.minimum(trailing, 63).astype(np.uint64)
+    total = int(lengths.sum())
+    owners = np.repeat(np.arange(len(xors)), lengths)
+    offsets = np.cumsum(lengths) - lengths
+    shifts = (lengths[owners] - 1 - (np.arange(total) - offsets[owners])).astype(np.uint64)
+    stream = ((meaningful[owners] >> shifts) & np.uint64(1)).astype(np.uint8)
+
+    headers = np.concatenate([leading, lengths]).astype(np.uint8)
+    return _segments(zlib.compress(headers.tobytes()), np.packbits(stream).tobytes())
+
+
+def decode_floats(data: bytes, count: int) -> np.ndarray:
+    header_data, stream_data = _read_segments(data, 0, 2)
+    headers = np.frombuffer(zlib.decompress(header_data), dtype=np.uint8).astype(np.int64)
+    leading, lengths = headers[:count], headers[count:]
+    stream = np.unpackbits(np.frombuffer(stream_data, dtype=np.uint8))
+
+    xors = np.zeros(count, dtype=np.uint64)
+    present = lengths > 0
+    if present.any():
+        total = int(lengths.sum())
+        owners = np.repeat(np.arange(count), lengths)
+        offsets = np.cumsum(lengths) - lengths
+        shifts = (lengths[owners] - 1 - (np.arange(total) - offsets[owners])).astype(np.uint64)
+        weighted = stream[:total].astype(np.uint64) << shifts
+        # Distinct powers of two, so the sum of each value's bits cannot carry
+        meaningful = np.add.reduceat(weighted, offsets[present])
+        trailing = (64 - leading[present] - lengths[present]).astype(np.uint64)
+        xors[present] = meaningful << trailing
+    return np.bitwise_xor.accumulate(xors).view(np.float64)
+
+
+def encode_block(columns: Dict[str, np.ndarray], column_names: List[str]) -> bytes:
+    """Encode chronological column arrays (epoch-second timestamps) into one BLOB."""
+    timestamps_ms = np.round(columns['timestamp'] * 1000).astype(np.int64)
+    count = len(timestamps_ms)
+    header = HEADER.pack(FORMAT_VERSION, count, int(timestamps_ms[0]), len(column_names))
+    parts = [encode_timestamps(timestamps_ms)]
+    parts.extend(encode_floats(columns[column]) for column in column_names)
+    return header + _segments(*parts)
+
+
+def decode_block(blob: bytes, column_names: List[str]) -> Dict[str, np.ndarray]:
+    """Decode a BLOB written by encode_block back into column arrays."""
+    version, count, first_ms, column_count = HEADER.unpack_from(blob, 0)
+    if version != FORMAT_VERSION or column_count != len(column_names):
+        raise ValueError(f"Unsupported cold block (version {version}, {column_count} columns)")
+
+    parts = _read_segments(blob, HEADER.size, column_count + 1)
+    columns = {'timestamp': decode_timestamps(parts[0], first_ms, count) / 1000.0}
+    for column, data in zip(column_names, parts[1:]):
+        columns[column] = decode_floats(data, count)
+    return columns
+
+
+def split_blocks(columns: Dict[str, np.ndarray]) -> Dict[int, Dict[str, np.ndarray]]:
+    """Split chronological columns into hour-aligned blocks keyed by block start (epoch seconds)."""
+    hours = (np.floor(columns['timestamp'] / BLOCK_SECONDS) * BLOCK_SECONDS).astype(np.int64)
+    boundaries = np.flatnonzero(hours[1:] != hours[:-1]) + 1
+    blocks = {}
+    for start, end in zip(np.r_[0, boundaries], np.r_[boundaries, len(hours)]):
+        blocks[int(hours[start])] = {name: values[start:end] for name, values in columns.items()}
+    return blocks
+
+
+def concat_columns(parts: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Join column sets into one, re-sorting by timestamp only if the parts overlap."""
+    parts = [part for part in parts if len(part['timestamp'])]
+    if len(parts) == 1:
+        return parts[0]
+    columns = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+    if np.any(np.diff(columns['timestamp']) < 0):
+        order = np.argsort(columns['timestamp'], kind='stable')
+        columns = {name: values[order] for name, values in columns.items()}
+    return columns
@@ -12,15 +12,33 @@ import threading
 import time
 import hashlib
 import shutil
+import zlib
 from datetime import datetime, timedelta, timezone
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, Response, g, render_template, request, jsonify, session, redirect, url_for
+from flask.json.provider import DefaultJSONProvider
 from flask_socketio import SocketIO, emit
 import logging
 import os
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 import asyncio
 import configparser
 from dotenv import load_dotenv
+import numpy as np
+from storage import METRIC_COLUMNS, PROCESS_COLUMNS, MetricsStore, RingBufferStore, columns_to_rows, empty_columns
+from aggregation import CLUSTER_COLUMNS, cluster_aggregate, columns_to_json, resolution_for_points, summarize
+from alerting import AlertEngine, LogSink, WebhookSink
+from telemetry import (OPENMETRICS_CONTENT_TYPE, Counter, FleetState, Histogram, RateMeter,
+                       instrument_methods, render_gauge, render_openmetrics, timed)
+from profiler import StackSampler
+from agent_stream import AgentStreamSession
+from history_cache import HistoryCache, HistoryEntry
+from cold_storage import BLOCK_SECONDS, concat_columns, decode_block, encode_block, split_blocks
+from placement import PlacementAdvisor
+from gateway import GatewayError, InferenceGateway
+from swap_scheduler import SwapScheduler
+from preloader import ModelPreloader
+from sampling import SamplingController
+from energy import EnergyTracker
 
 # Load environment variables from .env file if it exists
 load_dotenv()
@@ -48,8 +66,35 @@ class DashboardConfig:
             'HOST': '0.0.0.0',
             'PORT': 3030,
             'DEVICE_OFFLINE_THRESHOLD': 60,  # seconds
-            'DEBUG': False
+            'DEBUG': False,
+            'STORAGE_BACKEND': 'sqlite',  # sqlite or ringbuffer
+            'RING_BUFFER_PATH': 'ringbuffer',
+            'RING_BUFFER_SLOTS': 120960,  # 7 days at 5 second intervals
+            'ALERT_RULES_PATH': 'alert_rules.json',
+            'ALERT_WEBHOOK_URL': '',
+            'ALERT_LOG_PATH': '',
+            'HISTORY_CACHE_MB': 64,  # 0 disables the history query cache
+            'HISTORY_CACHE_TTL': 300,  # seconds before a cached window is rebuilt from scratch
+            'COLD_STORAGE_AFTER_HOURS': 0,  # 0 disables the compressed cold tier (sqlite only)
+            'COLD_RETENTION_DAYS': 90,
+            'PLACEMENT_CONFIG_PATH': 'placement_config.json',
+            'GATEWAY_CONFIG_PATH': 'gateway_config.json',
+            'GATEWAY_API_KEY': '',  # empty leaves the /v1 endpoints open to the LAN
+            'SWAP_POLICY_PATH': 'swap_policy.json',
+            'PRELOAD_POLICY_PATH': 'preload_policy.json',
+            'PRELOAD_HISTORY_PATH': 'usage_history.jsonl',
+            'ADAPTIVE_SAMPLING': False,  # send agents sampling intervals with each response
+            'SAMPLING_ACTIVE_INTERVAL': 1,  # seconds, while loading, running a script or viewed
+            'SAMPLING_NORMAL_INTERVAL': 5,
+            'SAMPLING_IDLE_INTERVAL': 20,  # capped at a third of DEVICE_OFFLINE_THRESHOLD
+            'SAMPLING_VIEW_TTL': 30  # seconds a dashboard's report of visible charts stays valid
         }
+        self.int_keys = ['DATA_RETENTION_DAYS', 'CLEANUP_INTERVAL_SECONDS', 'PORT',
+                         'DEVICE_OFFLINE_THRESHOLD', 'RING_BUFFER_SLOTS', 'HISTORY_CACHE_MB',
+                         'HISTORY_CACHE_TTL', 'COLD_STORAGE_AFTER_HOURS', 'COLD_RETENTION_DAYS',
+                         'SAMPLING_ACTIVE_INTERVAL', 'SAMPLING_NORMAL_INTERVAL', 'SAMPLING_IDLE_INTERVAL',
+                         'SAMPLING_VIEW_TTL']
+        self.bool_keys = ['DEBUG', 'ADAPTIVE_SAMPLING']
         
         # Load from config file if it exists
         if os.path.exists(self.config_file):
@@ -62,9 +107,9 @@ class DashboardConfig:
                         if key in parser['dashboard']:
                             value = parser['dashboard'][key]
                             # Convert to appropriate type
-                            if key in ['DATA_RETENTION_DAYS', 'CLEANUP_INTERVAL_SECONDS', 'PORT', 'DEVICE_OFFLINE_THRESHOLD']:
+                            if key in self.int_keys:
                                 self.defaults[key] = int(value)
-                            elif key in ['DEBUG']:
+                            elif key in self.bool_keys:
                                 self.defaults[key] = value.lower() in ('true', '1', 'yes')
                             else:
                                 self.defaults[key] = value
@@ -83,16 +128,37 @@ class DashboardConfig:
             'DASHBOARD_HOST': 'HOST',
             'DASHBOARD_PORT': 'PORT',
             'DASHBOARD_DEVICE_OFFLINE_THRESHOLD': 'DEVICE_OFFLINE_THRESHOLD',
-            'DASHBOARD_DEBUG': 'DEBUG'
+            'DASHBOARD_DEBUG': 'DEBUG',
+            'DASHBOARD_STORAGE_BACKEND': 'STORAGE_BACKEND',
+            'DASHBOARD_RING_BUFFER_PATH': 'RING_BUFFER_PATH',
+            'DASHBOARD_RING_BUFFER_SLOTS': 'RING_BUFFER_SLOTS',
+            'DASHBOARD_ALERT_RULES_PATH': 'ALERT_RULES_PATH',
+            'DASHBOARD_ALERT_WEBHOOK_URL': 'ALERT_WEBHOOK_URL',
+            'DASHBOARD_ALERT_LOG_PATH': 'ALERT_LOG_PATH',
+            'DASHBOARD_HISTORY_CACHE_MB': 'HISTORY_CACHE_MB',
+            'DASHBOARD_HISTORY_CACHE_TTL': 'HISTORY_CACHE_TTL',
+            'DASHBOARD_COLD_STORAGE_AFTER_HOURS': 'COLD_STORAGE_AFTER_HOURS',
+            'DASHBOARD_COLD_RETENTION_DAYS': 'COLD_RETENTION_DAYS',
+            'DASHBOARD_PLACEMENT_CONFIG_PATH': 'PLACEMENT_CONFIG_PATH',
+            'DASHBOARD_GATEWAY_CONFIG_PATH': 'GATEWAY_CONFIG_PATH',
+            'DASHBOARD_GATEWAY_API_KEY': 'GATEWAY_API_KEY',
+            'DASHBOARD_SWAP_POLICY_PATH': 'SWAP_POLICY_PATH',
+            'DASHBOARD_PRELOAD_POLICY_PATH': 'PRELOAD_POLICY_PATH',
+            'DASHBOARD_PRELOAD_HISTORY_PATH': 'PRELOAD_HISTORY_PATH',
+            'DASHBOARD_ADAPTIVE_SAMPLING': 'ADAPTIVE_SAMPLING',
+            'DASHBOARD_SAMPLING_ACTIVE_INTERVAL': 'SAMPLING_ACTIVE_INTERVAL',
+            'DASHBOARD_SAMPLING_NORMAL_INTERVAL': 'SAMPLING_NORMAL_INTERVAL',
+            'DASHBOARD_SAMPLING_IDLE_INTERVAL': 'SAMPLING_IDLE_INTERVAL',
+            'DASHBOARD_SAMPLING_VIEW_TTL': 'SAMPLING_VIEW_TTL'
         }
         
         for env_var, config_key in env_mappings.items():
             env_value = os.getenv(env_var)
             if env_value is not None:
                 # Convert to appropriate type
-                if config_key in ['DATA_RETENTION_DAYS', 'CLEANUP_INTERVAL_SECONDS', 'PORT', 'DEVICE_OFFLINE_THRESHOLD']:
+                if config_key in self.int_keys:
                     self.defaults[config_key] = int(env_value)
-                elif config_key in ['DEBUG']:
+                elif config_key in self.bool_keys:
                     self.defaults[config_key] = env_value.lower() in ('true', '1', 'yes')
                 else:
                     self.defaults[config_key] = env_value
@@ -115,6 +181,21 @@ DATABASE_PATH = dashboard.db
 DATA_RETENTION_DAYS = 7
 CLEANUP_INTERVAL_SECONDS = 3600
 
+# Storage backend: sqlite (default) or ringbuffer
+# The ring buffer keeps a fixed number of slots per device in memory-mapped files
+STORAGE_BACKEND = sqlite
+RING_BUFFER_PATH = ringbuffer
+RING_BUFFER_SLOTS = 120960
+
+# History query cache: memory limit in MB (0 disables) and maximum entry age in seconds
+HISTORY_CACHE_MB = 64
+HISTORY_CACHE_TTL = 300
+
+# Cold tier (sqlite backend): samples older than COLD_STORAGE_AFTER_HOURS are packed into
+# compressed hourly blocks and kept for COLD_RETENTION_DAYS. 0 disables it.
+COLD_STORAGE_AFTER_HOURS = 0
+COLD_RETENTION_DAYS = 90
+
 # Server settings
 HOST = 0.0.0.0
 PORT = 3000
@@ -122,6 +203,34 @@ PORT = 3000
 # Device monitoring settings
 DEVICE_OFFLINE_THRESHOLD = 60
 
+# Alerting: rules file, optional local webhook and optional JSON lines alert log
+ALERT_RULES_PATH = alert_rules.json
+ALERT_WEBHOOK_URL =
+ALERT_LOG_PATH =
+
+# Model placement advisor: devices, model directories and memory reserves
+PLACEMENT_CONFIG_PATH = placement_config.json
+
+# OpenAI-compatible inference gateway on /v1: backends file and optional bearer key for clients
+GATEWAY_CONFIG_PATH = gateway_config.json
+GATEWAY_API_KEY =
+
+# Idle-aware model swapping: scripts to run when the watched devices go idle or are needed again
+SWAP_POLICY_PATH = swap_policy.json
+
+# Predictive preloading: deployments to learn usage profiles for, and where usage is recorded
+PRELOAD_POLICY_PATH = preload_policy.json
+PRELOAD_HISTORY_PATH = usage_history.jsonl
+
+# Adaptive sampling: agents are told to sample every ACTIVE seconds while a model loads, a script
+# runs or their chart is visible, every IDLE seconds when idle, and every NORMAL seconds otherwise.
+# Agents need adaptive_sampling = true as well. IDLE is capped at a third of DEVICE_OFFLINE_THRESHOLD.
+ADAPTIVE_SAMPLING = false
+SAMPLING_ACTIVE_INTERVAL = 1
+SAMPLING_NORMAL_INTERVAL = 5
+SAMPLING_IDLE_INTERVAL = 20
+SAMPLING_VIEW_TTL = 30
+
 # Debug mode
 DEBUG = false
 
@@ -151,15 +260,19 @@ ADMIN_PASSWORD = config.get('ADMIN_PASSWORD')
 DATA_RETENTION_DAYS = config.get('DATA_RETENTION_DAYS')
 CLEANUP_INTERVAL_SECONDS = config.get('CLEANUP_INTERVAL_SECONDS')
 DEVICE_OFFLINE_THRESHOLD = config.get('DEVICE_OFFLINE_THRESHOLD')  # 60 seconds
+STORAGE_BACKEND = config.get('STORAGE_BACKEND')
+COLD_STORAGE_AFTER_HOURS = config.get('COLD_STORAGE_AFTER_HOURS')
+COLD_RETENTION_DAYS = config.get('COLD_RETENTION_DAYS')
 
 # Global variables for script execution status
 script_status = {
     'running': False,
     'current_script': None,
+    'script_id': None,
     'logs': []
 }
 
-class DatabaseManager:
+class DatabaseManager(MetricsStore):
     """Handles all database operations for the dashboard."""
     
     def __init__(self, db_path: str):
@@ -195,15 +308,49 @@ class DatabaseManager:
             ON device_metrics(device_name, timestamp)
         ''')
         
+        # Per-process-group usage reported by agents
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS process_metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                device_name TEXT NOT NULL,
+                process_name TEXT NOT NULL,
+                timestamp DATETIME NOT NULL,
+                cpu_percent REAL,
+                rss REAL,
+                threads INTEGER,
+                connections INTEGER,
+                count INTEGER
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_process_device_timestamp 
+            ON process_metrics(device_name, timestamp)
+        ''')
+        
+        # Compressed hourly blocks of older samples; series is '' for device metrics,
+        # otherwise the process group name
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS cold_blocks (
+                device_name TEXT NOT NULL,
+                series TEXT NOT NULL,
+                block_start INTEGER NOT NULL,
+                sample_count INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (device_name, series, block_start)
+            )
+        ''')
+        
         conn.commit()
         conn.close()
         logger.info("Database initialized successfully")
     
-    def insert_metrics(self, device_name: str, metrics: Dict):
+    def insert_metrics(self, device_name: str, metrics: Dict, timestamp: float = None):
         """Insert device metrics into the database."""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
+        sample_time = datetime.fromtimestamp(timestamp, timezone.utc) if timestamp else datetime.now(timezone.utc)
         cursor.execute('''
             INSERT INTO device_metrics 
             (device_name, timestamp, cpu_usage, ram_usage, ram_total, 
@@ -211,7 +358,7 @@ class DatabaseManager:
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             device_name,
-            datetime.now(timezone.utc),
+            sample_time,
             metrics.get('cpu_usage'),
             metrics.get('ram_usage'),
             metrics.get('ram_total'),
@@ -225,58 +372,204 @@ class DatabaseManager:
         conn.commit()
         conn.close()
     
-    def get_metrics(self, device_name: str = None, hours: int = 24) -> List[Dict]:
-        """Retrieve metrics from the database."""
+    def insert_process_metrics(self, device_name: str, processes: Dict[str, Dict], timestamp: float = None):
+        """Insert one row per process group."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        sample_time = datetime.fromtimestamp(timestamp, timezone.utc) if timestamp else datetime.now(timezone.utc)
+        cursor.executemany(f'''
+            INSERT INTO process_metrics 
+            (device_name, process_name, timestamp, {', '.join(PROCESS_COLUMNS)})
+            VALUES (?, ?, ?, {', '.join('?' * len(PROCESS_COLUMNS))})
+        ''', [
+            (device_name, process_name, sample_time, *[values.get(column) for column in PROCESS_COLUMNS])
+            for process_name, values in processes.items()
+        ])
+        
+        conn.commit()
+        conn.close()
+    
+    def get_process_columns(self, device_name: str, hours: int = 24) -> Dict[str, Dict[str, np.ndarray]]:
+        """Retrieve per-process-group metrics as NumPy column arrays."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        since_time = datetime.now(timezone.utc) - timedelta(hours=hours)
+        cursor.execute(f'''
+            SELECT process_name, (julianday(timestamp) - 2440587.5) * 86400.0, {', '.join(PROCESS_COLUMNS)}
+            FROM process_metrics
+            WHERE device_name = ? AND timestamp >= ?
+            ORDER BY process_name, timestamp
+        ''', (device_name, since_time))
+        rows = cursor.fetchall()
+        cold = self.read_cold_blocks(cursor, device_name, since_time.timestamp(), processes=True)
+        conn.close()
+        
+        results = {}
+        if not rows:
+            return cold
+        
+        names = np.array([row[0] for row in rows])
+        values = np.array([row[1:] for row in rows], dtype=np.float64)
+        # Rows are sorted by process name, so each group is one contiguous slice
+        boundaries = np.flatnonzero(names[1:] != names[:-1]) + 1
+        for start, end in zip(np.r_[0, boundaries], np.r_[boundaries, len(rows)]):
+            columns = {'timestamp': values[start:end, 0]}
+            for index, column in enumerate(PROCESS_COLUMNS, start=1):
+                columns[column] = values[start:end, index]
+            results[str(names[start])] = columns
+        
+        for name, columns in cold.items():
+            results[name] = concat_columns([columns, results[name]]) if name in results else columns
+        return results
+    
+    def get_metric_columns(self, device_name: str = None, hours: int = 24) -> Dict[str, Dict[str, np.ndarray]]:
+        """Retrieve metrics from the database as NumPy column arrays."""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
         since_time = datetime.now(timezone.utc) - timedelta(hours=hours)
         
         if device_name:
-            cursor.execute('''
-                SELECT * FROM device_metrics 
-                WHERE device_name = ? AND timestamp >= ?
-                ORDER BY timestamp DESC
-            ''', (device_name, since_time))
+            device_names = [device_name]
         else:
             cursor.execute('''
-                SELECT * FROM device_metrics 
-                WHERE timestamp >= ?
-                ORDER BY device_name, timestamp DESC
-            ''', (since_time,))
+                SELECT device_name FROM device_metrics
+                UNION SELECT device_name FROM cold_blocks WHERE series = ''
+                ORDER BY device_name
+            ''')
+            device_names = [row[0] for row in cursor.fetchall()]
         
-        columns = [description[0] for description in cursor.description]
-        results = []
+        # Timestamps are converted to epoch seconds by SQLite so every column is numeric
+        query = f'''
+            SELECT (julianday(timestamp) - 2440587.5) * 86400.0, {', '.join(METRIC_COLUMNS)}
+            FROM device_metrics
+            WHERE device_name = ? AND timestamp >= ?
+            ORDER BY timestamp
+        '''
         
-        for row in cursor.fetchall():
-            row_dict = dict(zip(columns, row))
-            # Convert timestamp to ISO format for JavaScript compatibility
-            try:
-                if isinstance(row_dict['timestamp'], str):
-                    # Handle different timestamp formats
-                    if 'T' in row_dict['timestamp']:
-                        # ISO format
-                        timestamp_obj = datetime.fromisoformat(row_dict['timestamp'].replace('Z', '+00:00'))
-                    else:
-                        # SQLite datetime format - handle timezone info
-                        if '+' in row_dict['timestamp'] or 'Z' in row_dict['timestamp']:
-                            # Handle timezone-aware timestamps
-                            timestamp_obj = datetime.fromisoformat(row_dict['timestamp'].replace('Z', '+00:00'))
-                        else:
-                            # Handle naive timestamps
-                            timestamp_obj = datetime.strptime(row_dict['timestamp'], '%Y-%m-%d %H:%M:%S.%f')
-                else:
-                    timestamp_obj = row_dict['timestamp']
-                row_dict['timestamp'] = timestamp_obj.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
-            except (ValueError, AttributeError) as e:
-                logger.warning(f"Invalid timestamp in metrics: {row_dict['timestamp']}, error: {e}")
-                row_dict['timestamp'] = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
-            
-            results.append(row_dict)
+        results = {}
+        for name in device_names:
+            cursor.execute(query, (name, since_time))
+            rows = cursor.fetchall()
+            parts = list(self.read_cold_blocks(cursor, name, since_time.timestamp()).values())
+            if rows:
+                values = np.array(rows, dtype=np.float64)
+                columns = {'timestamp': values[:, 0]}
+                for index, column in enumerate(METRIC_COLUMNS, start=1):
+                    columns[column] = values[:, index]
+                parts.append(columns)
+            if parts:
+                results[name] = concat_columns(parts)
         
         conn.close()
         return results
     
+    def read_cold_blocks(self, cursor, device_name: str, since: float,
+                         processes: bool = False) -> Dict[str, Dict[str, np.ndarray]]:
+        """Decode the cold blocks of a device that overlap [since, now), per series."""
+        if not COLD_STORAGE_AFTER_HOURS:
+            return {}
+        
+        cursor.execute(f'''
+            SELECT series, data FROM cold_blocks
+            WHERE device_name = ? AND series {'!=' if processes else '='} '' AND block_start > ?
+            ORDER BY series, block_start
+        ''', (device_name, since - BLOCK_SECONDS))
+        
+        column_names = PROCESS_COLUMNS if processes else METRIC_COLUMNS
+        blocks = {}
+        for series, data in cursor.fetchall():
+            blocks.setdefault(series, []).append(decode_block(data, column_names))
+        
+        results = {}
+        for series, parts in blocks.items():
+            columns = concat_columns(parts)
+            first = np.searchsorted(columns['timestamp'], since)
+            if first < len(columns['timestamp']):
+                results[series] = {name: values[first:] for name, values in columns.items()}
+        return results
+    
+    def write_cold_blocks(self, cursor, device_name: str, series: str, columns: Dict[str, np.ndarray],
+                          column_names: List[str]) -> int:
+        """Pack columns into hourly blocks, merging with blocks that already exist."""
+        written = 0
+        for block_start, block in split_blocks(columns).items():
+            cursor.execute('''
+                SELECT data FROM cold_blocks WHERE device_name = ? AND series = ? AND block_start = ?
+            ''', (device_name, series, block_start))
+            existing = cursor.fetchone()
+            if existing:
+                # Late samples for an hour that was already compacted
+                block = concat_columns([decode_block(existing[0], column_names), block])
+            cursor.execute('''
+                INSERT OR REPLACE INTO cold_blocks (device_name, series, block_start, sample_count, data)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (device_name, series, block_start, len(block['timestamp']), encode_block(block, column_names)))
+            written += 1
+        return written
+    
+    def compact_cold_data(self):
+        """Move samples older than COLD_STORAGE_AFTER_HOURS (whole hours only) into cold blocks."""
+        cutoff = (time.time() - COLD_STORAGE_AFTER_HOURS * 3600) // BLOCK_SECONDS * BLOCK_SECONDS
+        cutoff_time = datetime.fromtimestamp(cutoff, timezone.utc)
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        samples = blocks = 0
+        cursor.execute('SELECT DISTINCT device_name FROM device_metrics')
+        for (device_name,) in cursor.fetchall():
+            cursor.execute(f'''
+                SELECT (julianday(timestamp) - 2440587.5) * 86400.0, {', '.join(METRIC_COLUMNS)}
+                FROM device_metrics
+                WHERE device_name = ? AND timestamp < ?
+                ORDER BY timestamp
+            ''', (device_name, cutoff_time))
+            rows = cursor.fetchall()
+            if rows:
+                values = np.array(rows, dtype=np.float64)
+                columns = {'timestamp': values[:, 0]}
+                for index, column in enumerate(METRIC_COLUMNS, start=1):
+                    columns[column] = values[:, index]
+                blocks += self.write_cold_blocks(cursor, device_name, '', columns, METRIC_COLUMNS)
+                cursor.execute('DELETE FROM device_metrics WHERE device_name = ? AND timestamp < ?',
+                               (device_name, cutoff_time))
+                samples += len(rows)
+            
+            cursor.execute(f'''
+                SELECT process_name, (julianday(timestamp) - 2440587.5) * 86400.0, {', '.join(PROCESS_COLUMNS)}
+                FROM process_metrics
+                WHERE device_name = ? AND timestamp < ?
+                ORDER BY process_name, timestamp
+            ''', (device_name, cutoff_time))
+            groups: Dict[str, List] = {}
+            for row in cursor.fetchall():
+                groups.setdefault(row[0], []).append(row[1:])
+            for process_name, group_rows in groups.items():
+                values = np.array(group_rows, dtype=np.float64)
+                columns = {'timestamp': values[:, 0]}
+                for index, column in enumerate(PROCESS_COLUMNS, start=1):
+                    columns[column] = values[:, index]
+                blocks += self.write_cold_blocks(cursor, device_name, process_name, columns, PROCESS_COLUMNS)
+                samples += len(group_rows)
+            if groups:
+                cursor.execute('DELETE FROM process_metrics WHERE device_name = ? AND timestamp < ?',
+                               (device_name, cutoff_time))
+            # Commit per device so readers are never blocked for the whole pass
+            conn.commit()
+        
+        conn.close()
+        if samples:
+            logger.info(f"Compacted {samples} samples into {blocks} cold storage blocks")
+    
+    def storage_size_bytes(self) -> int:
+        """Get the size of the database file."""
+        try:
+            return os.path.getsize(self.db_path)
+        except OSError:
+            return 0
+    
     def get_latest_metrics(self) -> Dict[str, Dict]:
         """Get the latest metrics for each device."""
         conn = sqlite3.connect(self.db_path)
@@ -345,6 +638,9 @@ class DatabaseManager:
     
     def cleanup_old_data(self):
         """Remove data older than the retention period."""
+        if COLD_STORAGE_AFTER_HOURS:
+            self.compact_cold_data()
+        
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
@@ -352,16 +648,103 @@ class DatabaseManager:
         cursor.execute('''
             DELETE FROM device_metrics WHERE timestamp < ?
         ''', (cutoff_time,))
-        
         deleted_rows = cursor.rowcount
+        
+        cursor.execute('''
+            DELETE FROM process_metrics WHERE timestamp < ?
+        ''', (cutoff_time,))
+        deleted_rows += cursor.rowcount
+        
+        if COLD_STORAGE_AFTER_HOURS:
+            cursor.execute('''
+                DELETE FROM cold_blocks WHERE block_start < ?
+            ''', (time.time() - COLD_RETENTION_DAYS * 86400 - BLOCK_SECONDS,))
+            if cursor.rowcount:
+                logger.info(f"Removed {cursor.rowcount} expired cold storage blocks")
         conn.commit()
         conn.close()
         
         if deleted_rows > 0:
             logger.info(f"Cleaned up {deleted_rows} old metric records")
 
+def create_metrics_store() -> MetricsStore:
+    """Create the metrics store selected by STORAGE_BACKEND."""
+    if STORAGE_BACKEND == 'ringbuffer':
+        return RingBufferStore(
+            config.get('RING_BUFFER_PATH'),
+            config.get('RING_BUFFER_SLOTS'),
+            DATA_RETENTION_DAYS
+        )
+    if STORAGE_BACKEND != 'sqlite':
+        logger.warning(f"Unknown storage backend '{STORAGE_BACKEND}', using sqlite")
+    return DatabaseManager(DATABASE_PATH)
+
+# Hot-path latency histograms, exposed on /metrics and /api/debug/perf
+request_latency = Histogram('hld_http_request_duration_seconds', 'HTTP request handling time',
+                            label_names=('endpoint',))
+store_latency = Histogram('hld_store_call_duration_seconds', 'Metrics store call time',
+                          label_names=('method',))
+ingest_latency = Histogram('hld_ingest_phase_duration_seconds', 'Time spent in each metrics ingest phase',
+                           label_names=('phase',))
+json_latency = Histogram('hld_json_serialize_duration_seconds', 'JSON response serialization time')
+emit_latency = Histogram('hld_socket_emit_duration_seconds', 'WebSocket emit time',
+                         label_names=('event',))
+profiler = StackSampler()
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON provider that records serialization time for every response."""
+    
+    def dumps(self, obj, **kwargs):
+        with timed(json_latency):
+            return super().dumps(obj, **kwargs)
+
+app.json = TimedJSONProvider(app)
+
+def emit_event(event: str, data: Dict):
+    """Emit a WebSocket event to all clients, recording how long it takes."""
+    with timed(emit_latency, event):
+        socketio.emit(event, data)
+
 # Initialize database manager
-db_manager = DatabaseManager(DATABASE_PATH)
+db_manager = instrument_methods(create_metrics_store(), store_latency, [
+    'insert_metrics', 'get_metric_columns', 'get_metrics',
+    'insert_process_metrics', 'get_process_columns',
+    'get_latest_metrics', 'cleanup_old_data', 'storage_size_bytes'
+])
+
+# In-memory telemetry served by /metrics without touching the database
+fleet_state = FleetState()
+fleet_state.seed(db_manager.get_latest_metrics())
+ingest_samples = Counter('hld_ingest_samples', 'Metric samples received from agents')
+ingest_rate = RateMeter()
+script_durations = Histogram('hld_script_duration_seconds', 'Script execution time',
+                             [1, 5, 10, 30, 60, 120, 300, 600], ('script', 'result'))
+socket_clients = set()
+history_cache = HistoryCache(config.get('HISTORY_CACHE_MB') * 1024 * 1024, config.get('HISTORY_CACHE_TTL'))
+agent_sessions: Dict[str, AgentStreamSession] = {}
+stream_frames = Counter('hld_stream_frames', 'Sample frames received over agent streams')
+relay_samples = Counter('hld_relay_samples', 'Samples received in relay batches', ('relay',))
+
+def create_alert_engine() -> AlertEngine:
+    """Create the alert engine with socket, log and optional webhook sinks."""
+    sinks = [
+        lambda alert: emit_event('alert', alert),
+        LogSink(config.get('ALERT_LOG_PATH'))
+    ]
+    if config.get('ALERT_WEBHOOK_URL'):
+        sinks.append(WebhookSink(config.get('ALERT_WEBHOOK_URL')))
+    
+    engine = AlertEngine(config.get('ALERT_RULES_PATH'), DEVICE_OFFLINE_THRESHOLD, sinks)
+    engine.seed_last_seen(db_manager.get_latest_metrics())
+    return engine
+
+alert_engine = create_alert_engine()
+placement_advisor = PlacementAdvisor(config.get('PLACEMENT_CONFIG_PATH'), fleet_state.latest.get,
+                                     fleet_state.last_seen.get, DEVICE_OFFLINE_THRESHOLD)
+inference_gateway = InferenceGateway(config.get('GATEWAY_CONFIG_PATH'))
+energy_tracker = EnergyTracker()
+inference_gateway.listeners.append(energy_tracker.observe_request)
+inference_gateway.start()
 
 class ScriptManager:
     """Handles execution of predefined scripts via SSH."""
@@ -433,8 +816,8 @@ class ScriptManager:
             # Just add SSH options for passwordless SSH
             return f'{ssh_cmd} -o StrictHostKeyChecking=no {user_host} {remote_cmd}'
     
-    def execute_script(self, script_id: str) -> bool:
-        """Execute a predefined script."""
+    def execute_script(self, script_id: str, substitutions: Optional[Dict[str, str]] = None) -> bool:
+        """Execute a predefined script, filling {name} placeholders from substitutions."""
         global script_status
         
         if script_id not in self.scripts:
@@ -448,17 +831,24 @@ class ScriptManager:
         script = self.scripts[script_id]
         script_status['running'] = True
         script_status['current_script'] = script['name']
+        script_status['script_id'] = script_id
         script_status['logs'] = []
         
+        commands = script['commands']
+        for key, value in (substitutions or {}).items():
+            commands = [command.replace(f'{{{key}}}', value) for command in commands]
+        
         def run_script():
+            started = time.time()
+            result_label = 'error'
             try:
-                for command in script['commands']:
+                for command in commands:
                     # Wrap SSH commands with password support
                     wrapped_command = self.wrap_ssh_command(command)
                     
                     logger.info(f"Executing: {command}")
                     script_status['logs'].append(f"Executing: {command}")
-                    socketio.emit('script_log', {'message': f"Executing: {command}"})
+                    emit_event('script_log', {'message': f"Executing: {command}"})
                     
                     # Execute the wrapped command
                     result = subprocess.run(
@@ -480,29 +870,33 @@ class ScriptManager:
                     
                     logger.info(log_msg)
                     script_status['logs'].append(log_msg)
-                    socketio.emit('script_log', {'message': log_msg})
+                    emit_event('script_log', {'message': log_msg})
                 
                 script_status['logs'].append("Script execution completed")
-                socketio.emit('script_log', {'message': "Script execution completed"})
-                socketio.emit('script_finished', {'success': True})
+                emit_event('script_log', {'message': "Script execution completed"})
+                emit_event('script_finished', {'success': True})
+                result_label = 'success'
                 
             except subprocess.TimeoutExpired:
+                result_label = 'timeout'
                 error_msg = "Script execution timed out"
                 logger.error(error_msg)
                 script_status['logs'].append(error_msg)
-                socketio.emit('script_log', {'message': error_msg})
-                socketio.emit('script_finished', {'success': False})
+                emit_event('script_log', {'message': error_msg})
+                emit_event('script_finished', {'success': False})
                 
             except Exception as e:
                 error_msg = f"Script execution failed: {str(e)}"
                 logger.error(error_msg)
                 script_status['logs'].append(error_msg)
-                socketio.emit('script_log', {'message': error_msg})
-                socketio.emit('script_finished', {'success': False})
+                emit_event('script_log', {'message': error_msg})
+                emit_event('script_finished', {'success': False})
                 
             finally:
+                script_durations.observe(time.time() - started, script_id, result_label)
                 script_status['running'] = False
                 script_status['current_script'] = None
+                script_status['script_id'] = None
         
         # Run script in background thread
         thread = threading.Thread(target=run_script)
@@ -523,6 +917,144 @@ class ScriptManager:
 
 script_manager = ScriptManager()
 
+def script_substitutions(script_id: str) -> Optional[Dict[str, str]]:
+    """Placeholder values for a script, computing its placement if it has one."""
+    placement = script_manager.scripts.get(script_id, {}).get('placement')
+    if not placement:
+        return None
+    advice = placement_advisor.advise(placement['model'], int(placement.get('ctx_size', 0)),
+                                      placement.get('cache_type_k', 'f16'),
+                                      placement.get('cache_type_v', 'f16'))
+    logger.info(f"Placement for {script_id}: {' '.join(advice['args'])}")
+    return {'placement_args': ' '.join(advice['args'])}
+
+def run_scheduled_script(script_id: str) -> bool:
+    """Start a script on behalf of a scheduler, pre-warming its model files first if it lists any."""
+    try:
+        substitutions = script_substitutions(script_id)
+    except (OSError, ValueError) as e:
+        logger.error(f"Placement failed for {script_id}: {e}")
+        return False
+    if script_manager.scripts.get(script_id, {}).get('prewarm'):
+        if script_status['running']:
+            return False
+        thread = threading.Thread(target=prewarm_and_execute, args=(script_id, substitutions), name='prewarm')
+        thread.daemon = True
+        thread.start()
+        return True
+    if not script_manager.execute_script(script_id, substitutions):
+        return False
+    push_sampling()
+    return True
+
+def running_script_devices() -> Optional[set]:
+    """Devices targeted by the running script (empty for all), or None when idle."""
+    script_id = script_status['script_id']
+    if not script_status['running'] or script_id is None:
+        return None
+    return set(script_manager.scripts.get(script_id, {}).get('devices', []))
+
+sampling = SamplingController(
+    config.get('SAMPLING_ACTIVE_INTERVAL'),
+    config.get('SAMPLING_NORMAL_INTERVAL'),
+    # Idle agents report at least three times per offline threshold, so one lost sample does not
+    # make a device look offline
+    min(config.get('SAMPLING_IDLE_INTERVAL'), max(1, DEVICE_OFFLINE_THRESHOLD // 3)),
+    config.get('SAMPLING_VIEW_TTL'),
+    running_script_devices
+)
+
+def sampling_directive(device_name: str, metrics: Dict = None) -> Optional[Dict]:
+    """Sampling directive for an agent, or None when adaptive sampling is off."""
+    if not config.get('ADAPTIVE_SAMPLING'):
+        return None
+    return sampling.directive(device_name, metrics if metrics is not None else fleet_state.latest.get(device_name))
+
+def agent_directives(device_name: str, metrics: Dict = None) -> Dict:
+    """Sampling and pre-warm requests to return to an agent reporting over HTTP."""
+    directives = {}
+    directive = sampling_directive(device_name, metrics)
+    if directive is not None:
+        sampling.changed(device_name, directive)
+        directives['sampling'] = directive
+    files = pending_prewarm.pop(device_name, None)
+    if files:
+        directives['prewarm'] = {'files': sorted(files)}
+    return directives
+
+def push_sampling(devices: Optional[set] = None):
+    """Push changed directives to streaming agents, so a slow agent speeds up right away."""
+    for sid, session_state in list(agent_sessions.items()):
+        device_name = session_state.device_name
+        if devices is not None and device_name not in devices:
+            continue
+        directive = sampling_directive(device_name)
+        if directive is not None and sampling.changed(device_name, directive):
+            socketio.emit('sampling', directive, to=sid, namespace='/agent')
+
+# Pre-warm requests for agents reporting over HTTP, delivered with their next response
+pending_prewarm: Dict[str, set] = {}
+# A pre-warmed file counts as loaded into RAM from this fraction of its pages on
+PREWARM_RESIDENT = 0.9
+
+def request_prewarm(device_name: str, files: List[str]) -> str:
+    """Ask a device's agent to read model files into its page cache."""
+    for sid, session_state in list(agent_sessions.items()):
+        if session_state.device_name == device_name:
+            socketio.emit('prewarm', {'files': list(files)}, to=sid, namespace='/agent')
+            return 'sent'
+    pending_prewarm.setdefault(device_name, set()).update(files)
+    return 'queued'
+
+def wait_for_prewarm(prewarm: Dict[str, List[str]], timeout: float) -> bool:
+    """Wait until the agents report each file resident, or done reading it if it does not fit."""
+    started = set()
+    deadline = time.time() + timeout
+    while True:
+        waiting = []
+        for device_name, files in prewarm.items():
+            model_files = (fleet_state.latest.get(device_name) or {}).get('model_files') or {}
+            for name in files:
+                state = model_files.get(name) or {}
+                if state.get('prewarming'):
+                    started.add((device_name, name))
+                    waiting.append(name)
+                elif state.get('resident', 0) < PREWARM_RESIDENT and (device_name, name) not in started:
+                    waiting.append(name)
+        if not waiting:
+            return True
+        if time.time() >= deadline:
+            logger.warning(f"Pre-warm timed out waiting for {', '.join(waiting)}")
+            return False
+        time.sleep(2)
+
+def prewarm_and_execute(script_id: str, substitutions: Optional[Dict[str, str]]):
+    """Pre-warm a script's model files on their devices, then run it."""
+    script = script_manager.scripts[script_id]
+    for device_name, files in script['prewarm'].items():
+        logger.info(f"Pre-warming {', '.join(files)} on {device_name} ({request_prewarm(device_name, files)})")
+    wait_for_prewarm(script['prewarm'], script.get('prewarm_timeout', 300))
+    if script_manager.execute_script(script_id, substitutions):
+        push_sampling()
+
+swap_scheduler = SwapScheduler(config.get('SWAP_POLICY_PATH'), fleet_state.latest.get, inference_gateway,
+                               run_scheduled_script, lambda event: emit_event('swap_event', event))
+swap_scheduler.start()
+
+def run_preload_script(script_id: str) -> bool:
+    """Start a deployment ahead of its predicted demand."""
+    if not run_scheduled_script(script_id):
+        return False
+    swap_scheduler.record_manual(script_id, 'preload', 'Preloaded ahead of predicted demand')
+    return True
+
+model_preloader = ModelPreloader(config.get('PRELOAD_POLICY_PATH'), config.get('PRELOAD_HISTORY_PATH'),
+                                 inference_gateway, run_preload_script,
+                                 lambda: swap_scheduler.hold_until is not None,
+                                 lambda event: emit_event('preload_event', event))
+inference_gateway.listeners.append(model_preloader.observe_request)
+model_preloader.start()
+
 def cleanup_old_data_periodic():
     """Periodic cleanup task for old data."""
     while True:
@@ -538,11 +1070,43 @@ cleanup_thread = threading.Thread(target=cleanup_old_data_periodic)
 cleanup_thread.daemon = True
 cleanup_thread.start()
 
+def check_alerts_periodic():
+    """Periodic check for devices that stopped reporting."""
+    interval = max(1, min(10, DEVICE_OFFLINE_THRESHOLD // 2))
+    while True:
+        try:
+            alert_engine.check_absence()
+        except Exception as e:
+            logger.error(f"Error during alert check: {e}")
+        time.sleep(interval)
+
+# Start alert check thread
+alert_thread = threading.Thread(target=check_alerts_periodic)
+alert_thread.daemon = True
+alert_thread.start()
+
+@app.before_request
+def start_request_timer():
+    """Record when request handling started."""
+    g.request_started = time.perf_counter()
+
+@app.teardown_request
+def record_request_latency(exception=None):
+    """Record request handling time under the matched route."""
+    started = g.get('request_started')
+    if started is not None and request.url_rule is not None:
+        request_latency.observe(time.perf_counter() - started, request.url_rule.rule)
+
 # Authentication helper
 def check_auth():
     """Check if user is authenticated."""
     return session.get('authenticated', False)
 
+def check_gateway_auth():
+    """Check the bearer key of an inference gateway client, if one is configured."""
+    api_key = config.get('GATEWAY_API_KEY')
+    return not api_key or check_auth() or request.headers.get('Authorization') == f"Bearer {api_key}"
+
 # Routes
 @app.route('/')
 def index():
@@ -570,37 +1134,120 @@ def logout():
     session.pop('authenticated', None)
     return redirect(url_for('login'))
 
+def ingest_metrics(device_name: str, metrics: Dict, timestamp: float = None):
+    """Store, evaluate and broadcast one sample, whichever transport it arrived on.
+
+    `timestamp` is when the sample was taken, for samples buffered by a relay;
+    it defaults to the time of arrival.
+    """
+    # Store metrics in database
+    with timed(ingest_latency, 'store'):
+        db_manager.insert_metrics(device_name, metrics, timestamp)
+        processes = metrics.get('processes')
+        if processes:
+            db_manager.insert_process_metrics(device_name, processes, timestamp)
+    history_cache.invalidate(device_name)
+    
+    received_at = timestamp or time.time()
+    fleet_state.update(device_name, metrics, received_at)
+    energy_tracker.observe(device_name, metrics, received_at)
+    ingest_samples.inc()
+    ingest_rate.mark()
+    
+    # Evaluate alert rules against the new sample
+    with timed(ingest_latency, 'alerts'):
+        alert_engine.observe(device_name, metrics, received_at)
+    
+    # Create ISO timestamp for real-time update
+    current_time = datetime.fromtimestamp(received_at, timezone.utc)
+    iso_timestamp = current_time.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+    
+    # Emit real-time update to connected clients
+    emit_event('metrics_update', {
+        'device_name': device_name,
+        'metrics': metrics,
+        'timestamp': iso_timestamp
+    })
+    
+    logger.debug(f"Received metrics from {device_name}, timestamp: {iso_timestamp}")
+
 @app.route('/api/metrics', methods=['POST'])
 def receive_metrics():
     """Receive metrics from agents."""
     try:
-        data = request.get_json()
-        device_name = data.get('device_name')
-        metrics = data.get('metrics', {})
+        with timed(ingest_latency, 'parse'):
+            data = request.get_json()
+            device_name = data.get('device_name')
+            metrics = data.get('metrics', {})
         
         if not device_name:
             return jsonify({'error': 'Device name is required'}), 400
         
-        # Store metrics in database
-        db_manager.insert_metrics(device_name, metrics)
+        ingest_metrics(device_name, metrics)
         
-        # Create ISO timestamp for real-time update
-        current_time = datetime.now(timezone.utc)
-        iso_timestamp = current_time.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+        return jsonify({'status': 'success', **agent_directives(device_name, metrics)}), 200
         
-        # Emit real-time update to connected clients
-        socketio.emit('metrics_update', {
-            'device_name': device_name,
-            'metrics': metrics,
-            'timestamp': iso_timestamp
-        })
+    except Exception as e:
+        logger.error(f"Error receiving metrics: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+def cached_history_response(cache_key: Tuple, entry: HistoryEntry, body_name: str,
+                            render: Callable[[Dict], object]) -> Response:
+    """Serve a cached history window, answering matching If-None-Match requests with 304."""
+    etag = f"{entry.etag}-{body_name}"
+    if request.if_none_match.contains(etag):
+        history_cache.not_modified.inc()
+        response = Response(status=304)
+    else:
+        body, added_bytes = entry.body(body_name, lambda groups: app.json.dumps(render(groups)).encode())
+        history_cache.account(cache_key, entry, added_bytes)
+        response = Response(body, content_type='application/json')
+    response.set_etag(etag)
+    # Revalidate on every use; the window changes whenever the device reports
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@app.route('/api/metrics/batch', methods=['POST'])
+def receive_metrics_batch():
+    """Receive a batch of timestamped samples forwarded by a relay agent."""
+    try:
+        with timed(ingest_latency, 'parse'):
+            body = request.get_data()
+            if request.headers.get('Content-Encoding') == 'deflate':
+                body = zlib.decompress(body)
+            data = json.loads(body)
+            samples = data.get('samples', [])
         
-        logger.debug(f"Received metrics from {device_name}, timestamp: {iso_timestamp}")
+        now = time.time()
+        accepted = 0
+        latest = {}
+        for sample in samples:
+            device_name = sample.get('device_name')
+            if not device_name:
+                continue
+            # Never store samples in the future, whatever the relay's clock says
+            timestamp = min(float(sample.get('timestamp') or now), now)
+            ingest_metrics(device_name, sample.get('metrics', {}), timestamp)
+            latest[device_name] = sample.get('metrics', {})
+            accepted += 1
         
-        return jsonify({'status': 'success'}), 200
+        relay_samples.inc(accepted, data.get('relay', 'unknown'))
+        # The relay hands each device its directives with the reply to its next sample
+        devices = {}
+        for device_name, metrics in latest.items():
+            directives = agent_directives(device_name, metrics)
+            if directives:
+                devices[device_name] = directives
+        response = {'status': 'success', 'accepted': accepted}
+        if devices:
+            response['devices'] = devices
+        return jsonify(response), 200
         
+    except (ValueError, zlib.error) as e:
+        logger.warning(f"Rejected malformed metrics batch: {e}")
+        return jsonify({'error': 'Malformed batch'}), 400
     except Exception as e:
-        logger.error(f"Error receiving metrics: {e}")
+        logger.error(f"Error receiving metrics batch: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/metrics/<device_name>')
@@ -610,8 +1257,94 @@ def get_device_metrics(device_name):
         return jsonify({'error': 'Authentication required'}), 401
     
     hours = request.args.get('hours', 24, type=int)
-    metrics = db_manager.get_metrics(device_name, hours)
-    return jsonify(metrics)
+    resolution = request.args.get('resolution', 0, type=int)
+    points = request.args.get('points', 0, type=int)
+    if points and not resolution:
+        resolution = resolution_for_points(hours, points)
+    
+    cache_key = ('metrics', device_name, hours, resolution)
+    entry = history_cache.get(cache_key, device_name, hours, resolution,
+                              lambda span: db_manager.get_metric_columns(device_name, span))
+    
+    if request.args.get('format') == 'columns':
+        return cached_history_response(cache_key, entry, 'columns',
+                                       lambda groups: columns_to_json(groups.get(device_name, empty_columns())))
+    return cached_history_response(cache_key, entry, 'rows',
+                                   lambda groups: columns_to_rows(device_name, groups.get(device_name, empty_columns())))
+
+@app.route('/api/metrics/<device_name>/processes')
+def get_device_process_metrics(device_name):
+    """Get per-process-group metrics for a device as columnar series."""
+    if not check_auth():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    hours = request.args.get('hours', 24, type=int)
+    resolution = request.args.get('resolution', 0, type=int)
+    points = request.args.get('points', 0, type=int)
+    if points and not resolution:
+        resolution = resolution_for_points(hours, points)
+    
+    cache_key = ('processes', device_name, hours, resolution)
+    entry = history_cache.get(cache_key, device_name, hours, resolution,
+                              lambda span: db_manager.get_process_columns(device_name, span))
+    return cached_history_response(cache_key, entry, 'columns', lambda groups: {
+        process_name: columns_to_json(columns, PROCESS_COLUMNS)
+        for process_name, columns in groups.items()
+    })
+
+@app.route('/api/metrics/summary')
+def get_metrics_summary():
+    """Get per-device summary statistics over a time window."""
+    if not check_auth():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    hours = request.args.get('hours', 24, type=int)
+    device_name = request.args.get('device')
+    
+    all_columns = db_manager.get_metric_columns(device_name, hours)
+    return jsonify({
+        name: summarize(columns)
+        for name, columns in all_columns.items()
+    })
+
+@app.route('/api/metrics/cluster')
+def get_cluster_metrics():
+    """Get one combined series for a group of devices (a gateway backend or a device list)."""
+    if not check_auth():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    hours = request.args.get('hours', 24, type=int)
+    resolution = request.args.get('resolution', 0, type=int)
+    if not resolution:
+        resolution = resolution_for_points(hours, request.args.get('points', 300, type=int))
+    
+    group = request.args.get('group')
+    if group:
+        backend = next((backend for backend in inference_gateway.backends if backend.name == group), None)
+        if backend is None or not backend.devices:
+            return jsonify({'error': f"Unknown group {group}"}), 404
+        device_names = backend.devices
+    elif request.args.get('devices'):
+        device_names = [name.strip() for name in request.args['devices'].split(',') if name.strip()]
+    else:
+        device_names = sorted(fleet_state.latest)
+    
+    # Per-device windows come from the history cache shared with the device charts
+    groups = {}
+    for device_name in device_names:
+        entry = history_cache.get(('metrics', device_name, hours, resolution), device_name, hours, resolution,
+                                  lambda span, name=device_name: db_manager.get_metric_columns(name, span))
+        if device_name in entry.groups:
+            groups[device_name] = entry.groups[device_name]
+    
+    # A device counts until it has been silent for longer than the offline threshold
+    columns = cluster_aggregate(groups, resolution, DEVICE_OFFLINE_THRESHOLD)
+    return jsonify({
+        'group': group,
+        'devices': sorted(groups),
+        'resolution': resolution,
+        'series': columns_to_json(columns, CLUSTER_COLUMNS)
+    })
 
 @app.route('/api/metrics/latest')
 def get_latest_metrics():
@@ -620,8 +1353,88 @@ def get_latest_metrics():
         return jsonify({'error': 'Authentication required'}), 401
     
     metrics = db_manager.get_latest_metrics()
+    # Process breakdowns are only kept as series, so attach the latest from memory
+    for device_name, device_metrics in metrics.items():
+        latest = fleet_state.get(device_name)
+        if latest and latest.get('processes'):
+            device_metrics['processes'] = latest['processes']
     return jsonify(metrics)
 
+@app.route('/metrics')
+def openmetrics():
+    """Expose fleet and dashboard metrics in OpenMetrics text format."""
+    body = render_openmetrics([
+        fleet_state.render(DEVICE_OFFLINE_THRESHOLD),
+        ingest_samples.render(),
+        render_gauge('hld_ingest_rate', 'Samples received per second over the last minute', ingest_rate.rate()),
+        render_gauge('hld_db_size', 'Size of the metrics store on disk', db_manager.storage_size_bytes(), 'bytes'),
+        render_gauge('hld_socket_clients', 'Connected dashboard WebSocket clients', len(socket_clients)),
+        render_gauge('hld_agent_streams', 'Connected agent streams', len(agent_sessions)),
+        stream_frames.render(),
+        relay_samples.render(),
+        history_cache.render(),
+        inference_gateway.render(),
+        energy_tracker.render(),
+        swap_scheduler.switches.render(),
+        model_preloader.outcomes.render(),
+        script_durations.render(),
+        request_latency.render(),
+        store_latency.render(),
+        ingest_latency.render(),
+        json_latency.render(),
+        emit_latency.render()
+    ])
+    return Response(body, content_type=OPENMETRICS_CONTENT_TYPE)
+
+@app.route('/api/debug/perf')
+def get_perf_stats():
+    """Get hot-path latency summaries and profiler status."""
+    if not check_auth():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    return jsonify({
+        'requests': request_latency.summary(),
+        'store': store_latency.summary(),
+        'ingest': ingest_latency.summary(),
+        'json': json_latency.summary(),
+        'socket_emits': emit_latency.summary(),
+        'history_cache': history_cache.stats(),
+        'sampling': sampling.status(),
+        'profiler': profiler.status()
+    })
+
+@app.route('/api/debug/profiler', methods=['GET', 'POST'])
+def control_profiler():
+    """Start or stop the sampling profiler, or dump collapsed stacks."""
+    if not check_auth():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    if request.method == 'GET':
+        limit = request.args.get('limit', 0, type=int)
+        return Response(profiler.dump(limit), content_type='text/plain; charset=utf-8')
+    
+    action = request.args.get('action', 'start')
+    if action == 'start':
+        started = profiler.start(
+            interval=request.args.get('interval', 0.01, type=float),
+            duration=request.args.get('duration', 30, type=float)
+        )
+        if not started:
+            return jsonify({'error': 'Profiler is already running'}), 400
+    elif action == 'stop':
+        profiler.stop()
+    else:
+        return jsonify({'error': f'Unknown action: {action}'}), 400
+    return jsonify(profiler.status())
+
+@app.route('/api/alerts')
+def get_alerts():
+    """Get active alerts and recent alert history."""
+    if not check_auth():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    return jsonify(alert_engine.get_alerts())
+
 @app.route('/api/scripts')
 def get_scripts():
     """Get available scripts."""
@@ -636,12 +1449,165 @@ def execute_script(script_id):
     if not check_auth():
         return jsonify({'error': 'Authentication required'}), 401
     
-    success = script_manager.execute_script(script_id)
+    try:
+        substitutions = script_substitutions(script_id)
+    except (OSError, ValueError) as e:
+        return jsonify({'error': f"Placement failed: {e}"}), 400
+    
+    success = script_manager.execute_script(script_id, substitutions)
     if success:
+        swap_scheduler.record_manual(script_id)
+        model_preloader.observe_script(script_id)
+        push_sampling()
         return jsonify({'status': 'started'}), 200
     else:
         return jsonify({'error': 'Script execution failed or another script is running'}), 400
 
+@app.route('/api/placement/models')
+def get_placement_models():
+    """List GGUF models known to the placement advisor."""
+    if not check_auth():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    return jsonify(placement_advisor.catalog.list())
+
+@app.route('/api/placement')
+def get_placement():
+    """Recommend -ngl / --tensor-split for a model from current free memory."""
+    if not check_auth():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    model = request.args.get('model')
+    if not model:
+        return jsonify({'error': 'model parameter is required'}), 400
+    
+    try:
+        advice = placement_advisor.advise(model, request.args.get('ctx', 0, type=int),
+                                          request.args.get('cache_type_k', 'f16'),
+                                          request.args.get('cache_type_v', 'f16'))
+    except (OSError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(advice)
+
+@app.route('/api/prewarm', methods=['POST'])
+def prewarm_model_files():
+    """Ask an agent to read model files into its page cache ahead of a load."""
+    if not check_auth():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    device_name, files = data.get('device'), data.get('files')
+    if not device_name or not isinstance(files, list) or not files:
+        return jsonify({'error': 'device and a list of files are required'}), 400
+    return jsonify({'status': request_prewarm(device_name, [str(name) for name in files])})
+
+@app.route('/v1/models')
+def list_gateway_models():
+    """List models served by the inference gateway backends."""
+    if not check_gateway_auth():
+        return jsonify(GatewayError(401, 'Invalid API key').body()), 401
+    
+    return jsonify(inference_gateway.list_models())
+
+@app.route('/v1/chat/completions', methods=['POST'])
+@app.route('/v1/completions', methods=['POST'])
+@app.route('/v1/embeddings', methods=['POST'])
+def proxy_inference():
+    """Route an OpenAI-compatible request to a backend serving its model."""
+    if not check_gateway_auth():
+        return jsonify(GatewayError(401, 'Invalid API key').body()), 401
+    
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify(GatewayError(400, 'Request body must be a JSON object').body()), 400
+    
+    # Client keys are only passed on when the gateway itself is open
+    headers = {} if config.get('GATEWAY_API_KEY') else {'Authorization': request.headers.get('Authorization', '')}
+    try:
+        status, response_headers, body = inference_gateway.forward(request.path, payload, headers)
+    except GatewayError as e:
+        return jsonify(e.body()), e.status
+    
+    return Response(body, status=status, headers=response_headers)
+
+@app.route('/api/gateway/status')
+def get_gateway_status():
+    """Get backend states, queued requests and recent request timings."""
+    if not check_auth():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    return jsonify(inference_gateway.status())
+
+@app.route('/api/gateway/reload', methods=['POST'])
+def reload_gateway():
+    """Reload inference gateway backends from file."""
+    if not check_auth():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    if inference_gateway.reload():
+        inference_gateway.start()
+        return jsonify({'status': 'success', 'message': 'Gateway configuration reloaded'}), 200
+    return jsonify({'error': 'Failed to reload gateway configuration'}), 500
+
+@app.route('/api/energy')
+def get_energy():
+    """Get power and energy per device and energy efficiency per model and backend."""
+    if not check_auth():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    return jsonify(energy_tracker.status())
+
+@app.route('/api/swap/status')
+def get_swap_status():
+    """Get the idle swap scheduler's mode, idle time and recent decisions."""
+    if not check_auth():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    return jsonify(swap_scheduler.status())
+
+@app.route('/api/swap/hold', methods=['POST'])
+def hold_swaps():
+    """Pause automatic swaps for a number of minutes (null for indefinitely, 0 to resume)."""
+    if not check_auth():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    minutes = (request.get_json(silent=True) or {}).get('minutes')
+    if minutes is not None and (not isinstance(minutes, (int, float)) or minutes < 0):
+        return jsonify({'error': 'minutes must be a non-negative number or null'}), 400
+    
+    swap_scheduler.hold(minutes)
+    return jsonify(swap_scheduler.status())
+
+@app.route('/api/swap/reload', methods=['POST'])
+def reload_swap_policy():
+    """Reload the idle swap policy from file."""
+    if not check_auth():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    if swap_scheduler.reload():
+        swap_scheduler.start()
+        return jsonify({'status': 'success', 'message': 'Swap policy reloaded'}), 200
+    return jsonify({'error': 'Failed to reload swap policy'}), 500
+
+@app.route('/api/preload/status')
+def get_preload_status():
+    """Get usage profiles, upcoming predictions and preload hit/miss counts."""
+    if not check_auth():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    return jsonify(model_preloader.status())
+
+@app.route('/api/preload/reload', methods=['POST'])
+def reload_preload_policy():
+    """Reload the predictive preload policy from file."""
+    if not check_auth():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    if model_preloader.reload():
+        model_preloader.start()
+        return jsonify({'status': 'success', 'message': 'Preload policy reloaded'}), 200
+    return jsonify({'error': 'Failed to reload preload policy'}), 500
+
 @app.route('/api/scripts/status')
 def get_script_status():
     """Get current script execution status."""
@@ -667,14 +1633,77 @@ def reload_scripts():
 def handle_connect():
     """Handle client connection."""
     if check_auth():
+        socket_clients.add(request.sid)
         logger.info("Client connected to WebSocket")
         emit('connected', {'status': 'Connected to dashboard'})
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection."""
+    socket_clients.discard(request.sid)
+    sampling.drop_view(request.sid)
     logger.info("Client disconnected from WebSocket")
 
+@socketio.on('view_devices')
+def handle_view_devices(data):
+    """Record which device charts a dashboard has on screen and speed those agents up."""
+    if not check_auth() or not isinstance(data, dict):
+        return
+    
+    devices = {str(device) for device in data.get('devices') or []}
+    sampling.set_view(request.sid, devices)
+    push_sampling(devices)
+
+# Persistent agent stream (see agent_stream.py for the frame format)
+@socketio.on('hello', namespace='/agent')
+def handle_agent_hello(hello):
+    """Start or restart an agent stream session."""
+    if not isinstance(hello, dict) or not hello.get('device_name'):
+        return {'status': 'error', 'error': 'Device name is required'}
+    
+    session_state = AgentStreamSession(hello)
+    agent_sessions[request.sid] = session_state
+    logger.info(f"Agent stream opened for {session_state.device_name} "
+                f"(compression: {session_state.compression})")
+    return session_state.handshake_reply()
+
+@socketio.on('sample', namespace='/agent')
+def handle_agent_sample(payload):
+    """Decode one delta frame from an agent stream and ingest it."""
+    session_state = agent_sessions.get(request.sid)
+    metrics = None
+    if session_state is not None:
+        try:
+            with timed(ingest_latency, 'decode'):
+                metrics = session_state.decode(payload)
+        except (ValueError, IndexError, TypeError, zlib.error) as e:
+            logger.warning(f"Invalid stream frame from {session_state.device_name}: {e}")
+    
+    if metrics is None:
+        # Unknown session or broken frame sequence: ask the agent to handshake again
+        agent_sessions.pop(request.sid, None)
+        emit('resync', {'reason': 'handshake required'})
+        return
+    
+    stream_frames.inc()
+    try:
+        ingest_metrics(session_state.device_name, metrics)
+    except Exception as e:
+        logger.error(f"Error ingesting streamed metrics: {e}")
+        return
+    
+    directive = sampling_directive(session_state.device_name)
+    if directive is not None and sampling.changed(session_state.device_name, directive):
+        emit('sampling', directive)
+
+@socketio.on('disconnect', namespace='/agent')
+def handle_agent_disconnect():
+    """Drop the stream session of a disconnected agent."""
+    session_state = agent_sessions.pop(request.sid, None)
+    if session_state is not None:
+        logger.info(f"Agent stream closed for {session_state.device_name} after "
+                    f"{session_state.frames} frames ({session_state.bytes_received} bytes)")
+
 if __name__ == '__main__':
     import argparse
     
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Home LLM Dashboard - Energy Accounting
+Integrates the power draw reported by agents into energy per device and
+attributes it to inference requests, giving joules per token and tokens per
+joule for each model and backend combination.
+"""
+
+import bisect
+import logging
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+from telemetry import format_labels, format_value, family_header
+
+logger = logging.getLogger(__name__)
+
+# Samples further apart than this are not integrated (agent offline or restarted)
+MAX_GAP_SECONDS = 120
+# How far back request windows can be looked up
+TIMELINE_SECONDS = 3600
+HOURLY_BUCKETS = 24 * 7
+
+
+class DeviceEnergy:
+    """Cumulative energy of one device, with a timeline for window lookups."""
+
+    def __init__(self):
+        self.last_time: Optional[float] = None
+        self.last_power: Optional[float] = None
+        self.joules = 0.0
+        self.times: deque = deque()
+        self.totals: deque = deque()
+        self.hourly: deque = deque(maxlen=HOURLY_BUCKETS)  # [hour start, joules]
+
+    def add(self, timestamp: float, power: float):
+        if self.last_time is not None and timestamp <= self.last_time:
+            return  # Late relay samples would break the timeline order
+        if self.last_time is not None and timestamp - self.last_time <= MAX_GAP_SECONDS:
+            # Trapezoidal rule between consecutive samples
+            added = (self.last_power + power) / 2 * (timestamp - self.last_time)
+            self.joules += added
+            hour = timestamp - timestamp % 3600
+            if not self.hourly or self.hourly[-1][0] != hour:
+                self.hourly.append([hour, 0.0])
+            self.hourly[-1][1] += added
+        self.last_time, self.last_power = timestamp, power
+        self.times.append(timestamp)
+        self.totals.append(self.joules)
+        while self.times and self.times[0] < timestamp - TIMELINE_SECONDS:
+            self.times.popleft()
+            self.totals.popleft()
+
+    def total_at(self, timestamp: float) -> Optional[float]:
+        """Cumulative joules at a time, interpolated between samples.
+
+        Past the newest sample the latest power is extrapolated, so a request that
+        ends between two samples is still charged for its tail.
+        """
+        if not self.times or timestamp < self.times[0]:
+            return None
+        if timestamp >= self.times[-1]:
+            return self.totals[-1] + self.last_power * min(timestamp - self.times[-1], MAX_GAP_SECONDS)
+        index = bisect.bisect_right(self.times, timestamp)
+        t0, t1 = self.times[index - 1], self.times[index]
+        e0, e1 = self.totals[index - 1], self.totals[index]
+        return e0 + (e1 - e0) * (timestamp - t0) / (t1 - t0) if t1 > t0 else e0
+
+    def between(self, start: float, end: float) -> Optional[float]:
+        first, last = self.total_at(start), self.total_at(end)
+        if first is None or last is None:
+            return None
+        return max(0.0, last - first)
+
+
+class EnergyTracker:
+    """Per-device energy from agent power samples and per-model efficiency.
+
+    Agents report `power_total` in watts (macmon `sys_power`/`all_power` on
+    Apple Silicon, NVML board power on NVIDIA). Gateway requests are charged the
+    energy the devices of their backend used while the request ran, shared
+    evenly between requests running on the backend at the same time.
+    """
+
+    def __init__(self):
+        self.devices: Dict[str, DeviceEnergy] = {}
+        self.models: Dict[tuple, Dict] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, device_name: str, metrics: Dict, timestamp: float):
+        power = metrics.get('power_total')
+        if power is None:
+            return
+        with self.lock:
+            device = self.devices.get(device_name)
+            if device is None:
+                device = self.devices[device_name] = DeviceEnergy()
+            device.add(timestamp, float(power))
+
+    def observe_request(self, request: Dict):
+        """Charge a finished gateway request (see InferenceGateway.record) with its energy."""
+        devices = request.get('devices') or []
+        if not devices or request['result'] != 'success':
+            return
+        with self.lock:
+            used = [self.devices[name].between(request['started'], request['timestamp'])
+                    for name in devices if name in self.devices]
+            used = [joules for joules in used if joules is not None]
+            if not used:
+                return
+            joules = sum(used) / max(1, request.get('concurrency', 1))
+            key = (request['model'], request['backend'])
+            stats = self.models.setdefault(key, {'requests': 0, 'tokens': 0, 'joules': 0.0, 'seconds': 0.0})
+            stats['requests'] += 1
+            stats['tokens'] += request['completion_tokens']
+            stats['joules'] += joules
+            stats['seconds'] += request['duration']
+
+    def status(self) -> Dict:
+        with self.lock:
+            devices = {
+                name: {
+                    'power': device.last_power,
+                    'updated_at': device.last_time,
+                    'joules': round(device.joules, 1),
+                    'kwh': round(device.joules / 3.6e6, 4),
+                    'hourly_wh': [[hour, round(joules / 3600, 2)] for hour, joules in device.hourly]
+                }
+                for name, device in self.devices.items()
+            }
+            models = []
+            for (model, backend), stats in self.models.items():
+                tokens, joules, seconds = stats['tokens'], stats['joules'], stats['seconds']
+                models.append({
+                    'model': model,
+                    'backend': backend,
+                    'requests': stats['requests'],
+                    'tokens': tokens,
+                    'joules': round(joules, 1),
+                    'average_watts': round(joules / seconds, 1) if seconds else None,
+                    'tokens_per_second': round(tokens / seconds, 2) if seconds else None,
+                    'joules_per_token': round(joules / tokens, 3) if tokens else None,
+                    # Tokens per second per watt is the same quantity as tokens per joule
+                    'tokens_per_joule': round(tokens / joules, 3) if joules else None
+                })
+        models.sort(key=lambda entry: entry['joules_per_token'] if entry['joules_per_token'] is not None else float('inf'))
+        return {'devices': devices, 'models': models}
+
+    def render(self) -> str:
+        with self.lock:
+            device_lines = [(name, device.joules) for name, device in self.devices.items()]
+            model_lines = [(key, stats['joules']) for key, stats in self.models.items()]
+        lines = [family_header('hld_device_energy_joules', 'counter', 'Energy integrated from reported power draw')]
+        for name, joules in device_lines:
+            lines.append(f"hld_device_energy_joules_total{format_labels({'device': name})} {format_value(joules)}\n")
+        lines.append(family_header('hld_inference_energy_joules', 'counter', 'Energy charged to gateway requests'))
+        for (model, backend), joules in model_lines:
+            labels = format_labels({'model': model, 'backend': backend})
+            lines.append(f"hld_inference_energy_joules_total{labels} {format_value(joules)}\n")
+        return ''.join(lines)
@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+Home LLM Dashboard - Inference Gateway
+OpenAI-compatible proxy that routes requests by model name across llama-server and
+Ollama backends, queues them while a backend is loading or all its slots are busy,
+and records latency and generation speed per request.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+from telemetry import Counter, Histogram, render_gauge
+
+logger = logging.getLogger(__name__)
+
+# Headers that belong to a single hop and must not be copied between connections
+HOP_HEADERS = {'connection', 'keep-alive', 'transfer-encoding', 'content-length', 'content-encoding'}
+
+DURATION_BUCKETS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300]
+SPEED_BUCKETS = [1, 2, 5, 10, 20, 40, 80, 160, 320]
+
+
+class GatewayError(Exception):
+    """A request the gateway cannot route, with the HTTP status to answer with."""
+
+    def __init__(self, status: int, message: str, error_type: str = 'invalid_request_error'):
+        super().__init__(message)
+        self.status = status
+        self.error_type = error_type
+
+    def body(self) -> Dict:
+        return {'error': {'message': str(self), 'type': self.error_type, 'code': self.status}}
+
+
+class Backend:
+    """One inference server and the state learned from polling it."""
+
+    def __init__(self, config: Dict):
+        self.name = config['name']
+        self.url = config['url'].rstrip('/')
+        self.configure(config)
+        self.state = 'unknown'  # unknown, ready, loading or down
+        self.models: set = set()
+        self.loaded: set = set()
+        self.slots_total = self.configured_slots
+        self.slots_busy = 0
+        self.inflight = 0
+        self.checked_at = 0.0
+
+    def configure(self, config: Dict):
+        self.kind = config.get('type', 'llama')  # llama or ollama
+        self.api_key = config.get('api_key', '')
+        self.configured_models = set(config.get('models', []))
+        self.configured_slots = int(config.get('slots', 1))
+        # Agents whose power draw the backend accounts for (an RPC split spans several)
+        self.devices = list(config.get('devices', []))
+
+    def serves(self, model: str) -> bool:
+        return model in self.configured_models or model in self.models
+
+    def free_slots(self) -> int:
+        """Slots not in use, counting both our requests and others seen at the last poll."""
+        return self.slots_total - max(self.inflight, self.slots_busy)
+
+    def status(self) -> Dict:
+        return {
+            'name': self.name,
+            'url': self.url,
+            'type': self.kind,
+            'state': self.state,
+            'models': sorted(self.models | self.configured_models),
+            'loaded': sorted(self.loaded),
+            'slots_total': self.slots_total,
+            'slots_busy': self.slots_busy,
+            'inflight': self.inflight,
+            'devices': self.devices,
+            'checked_at': self.checked_at
+        }
+
+
+class InferenceGateway:
+    """Routes OpenAI-style requests to the least busy backend serving the model.
+
+    Backends are polled every `poll_interval` seconds for health, slot usage and
+    models. A request for a model whose backends are all loading, down or out of
+    free slots waits (up to `queue_timeout` seconds) until a poll or a finished
+    request frees one, so clients ride out model swaps instead of failing.
+    """
+
+    def __init__(self, config_path: str):
+        self.config_path = config_path
+        self.backends: List[Backend] = []
+        self.poll_interval = 5
+        self.queue_timeout = 300
+        self.request_timeout = 600
+        self.condition = threading.Condition()
+        self.waiting: Dict[str, int] = {}
+        self.recent = deque(maxlen=200)
+        self.last_request_at: Optional[float] = None
+        self.local = threading.local()
+        self.poller: Optional[threading.Thread] = None
+        self.listeners: List[Callable[[Dict], None]] = []
+        # Predicates for models no backend lists yet but a swap will bring up; requests for them queue
+        self.expected: List[Callable[[str], bool]] = []
+
+        self.requests = Counter('hld_gateway_requests', 'Gateway requests by model, backend and result',
+                                ('model', 'backend', 'result'))
+        self.tokens = Counter('hld_gateway_completion_tokens', 'Completion tokens streamed through the gateway',
+                              ('model', 'backend'))
+        self.durations = Histogram('hld_gateway_request_duration_seconds', 'Gateway request time end to end',
+                                   DURATION_BUCKETS, ('model', 'backend'))
+        self.first_token = Histogram('hld_gateway_time_to_first_token_seconds',
+                                     'Time from routing to the first streamed token', DURATION_BUCKETS, ('model',))
+        self.queue_wait = Histogram('hld_gateway_queue_wait_seconds', 'Time requests waited for a backend',
+                                    DURATION_BUCKETS, ('model',))
+        self.speed = Histogram('hld_gateway_generation_speed_tokens_per_second', 'Completion tokens per second',
+                               SPEED_BUCKETS, ('model', 'backend'), unit='tokens_per_second')
+        self.reload()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.backends)
+
+    def reload(self) -> bool:
+        """Load backends from the config file, keeping the state of unchanged ones."""
+        if not os.path.exists(self.config_path):
+            logger.info(f"Gateway config {self.config_path} not found, inference gateway disabled")
+            return False
+        try:
+            with open(self.config_path) as f:
+                config = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Error loading gateway config {self.config_path}: {e}")
+            return False
+
+        with self.condition:
+            previous = {(backend.name, backend.url): backend for backend in self.backends}
+            backends = []
+            for entry in config.get('backends', []):
+                backend = previous.get((entry['name'], entry['url'].rstrip('/')))
+                if backend is None:
+                    backend = Backend(entry)
+                else:
+                    # Keep polled state and in-flight counts of backends that did not move
+                    backend.configure(entry)
+                backends.append(backend)
+            self.backends = backends
+            self.poll_interval = config.get('poll_interval', 5)
+            self.queue_timeout = config.get('queue_timeout', 300)
+            self.request_timeout = config.get('request_timeout', 600)
+            self.condition.notify_all()
+        logger.info(f"Loaded {len(self.backends)} inference backends from {self.config_path}")
+        return True
+
+    def start(self):
+        if self.poller is None and self.enabled:
+            self.poller = threading.Thread(target=self._poll_loop, name='gateway-poller')
+            self.poller.daemon = True
+            self.poller.start()
+
+    def _session(self) -> requests.Session:
+        # Sessions are not thread-safe; each request thread keeps its own pool
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = requests.Session()
+        return session
+
+    def _poll_loop(self):
+        while True:
+            for backend in list(self.backends):
+                try:
+                    self.poll(backend)
+                except Exception as e:
+                    logger.error(f"Error polling backend {backend.name}: {e}")
+            time.sleep(self.poll_interval)
+
+    def poll(self, backend: Backend):
+        """Refresh a backend's health, slots and models, waking queued requests on change."""
+        http = self._session()
+        state, slots_total, slots_busy = 'down', backend.configured_slots, 0
+        models, loaded = set(), set()
+        try:
+            if backend.kind == 'ollama':
+                tags = http.get(f"{backend.url}/api/tags", timeout=2)
+                state = 'ready' if tags.status_code == 200 else 'down'
+                if state == 'ready':
+                    models = {model['name'] for model in tags.json().get('models', [])}
+                    running = http.get(f"{backend.url}/api/ps", timeout=2).json().get('models', [])
+                    loaded = {model['name'] for model in running}
+            else:
+                health = http.get(f"{backend.url}/health", timeout=2)
+                # llama-server answers 503 while it is loading a model
+                state = {200: 'ready', 503: 'loading'}.get(health.status_code, 'down')
+                if state == 'ready':
+                    listed = http.get(f"{backend.url}/v1/models", timeout=2)
+                    if listed.status_code == 200:
+                        models = {model['id'] for model in listed.json().get('data', [])}
+                        loaded = set(models)
+                    slots = http.get(f"{backend.url}/slots", timeout=2)
+                    if slots.status_code == 200 and isinstance(slots.json(), list):
+                        slots_total = len(slots.json())
+                        slots_busy = sum(1 for slot in slots.json() if slot.get('is_processing'))
+        except (requests.exceptions.RequestException, ValueError, KeyError):
+            pass
+
+        with self.condition:
+            changed = state != backend.state or slots_busy < backend.slots_busy
+            backend.state, backend.checked_at = state, time.time()
+            backend.slots_total, backend.slots_busy = max(1, slots_total), slots_busy
+            if models:
+                backend.models = models
+            backend.loaded = loaded
+            if changed:
+                self.condition.notify_all()
+
+    def list_models(self) -> Dict:
+        """Models across all backends in the /v1/models format."""
+        owners: Dict[str, List[str]] = {}
+        for backend in self.backends:
+            for model in backend.models | backend.configured_models:
+                owners.setdefault(model, []).append(backend.name)
+        return {'object': 'list', 'data': [
+            {'id': model, 'object': 'model', 'created': 0, 'owned_by': ','.join(names)}
+            for model, names in sorted(owners.items())
+        ]}
+
+    def _pick(self, model: str) -> Tuple[Optional[Backend], bool]:
+        """Best ready backend with a free slot, and whether any backend may serve the model.
+
+        A backend without a static `models` list only reports its model once it is
+        ready, so while one is loading, down or not yet polled any model may be its.
+        """
+        candidates = [backend for backend in self.backends if backend.serves(model)]
+        ready = [backend for backend in candidates if backend.state in ('ready', 'unknown')
+                 and backend.free_slots() > 0]
+        if not ready:
+            pending = any(not backend.configured_models and backend.state != 'ready' for backend in self.backends)
+            return None, bool(candidates) or pending or any(expects(model) for expects in self.expected)
+        # Most free slots first; prefer a backend that already has the model in memory
+        best = max(ready, key=lambda backend: (model in backend.loaded, backend.free_slots(), -backend.inflight))
+        return best, True
+
+    def available(self, model: str) -> bool:
+        """Whether a ready backend lists the model, busy or not."""
+        return any(backend.state == 'ready' and backend.serves(model) for backend in self.backends)
+
+    def acquire(self, model: str, deadline: float) -> Backend:
+        """Reserve a slot on a backend for `model`, waiting until `deadline` while none is available."""
+        started = time.time()
+        with self.condition:
+            self.waiting[model] = self.waiting.get(model, 0) + 1
+            try:
+                while True:
+                    backend, known = self._pick(model)
+                    if backend is not None:
+                        backend.inflight += 1
+                        break
+                    if not known:
+                        raise GatewayError(404, f"Model '{model}' is not served by any backend", 'model_not_found')
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise GatewayError(503, f"No backend for '{model}' became available in time",
+                                           'backend_unavailable')
+                    self.condition.wait(min(remaining, self.poll_interval))
+            finally:
+                self.waiting[model] -= 1
+        self.queue_wait.observe(time.time() - started, model)
+        return backend
+
+    def release(self, backend: Backend):
+        with self.condition:
+            backend.inflight -= 1
+            self.condition.notify_all()
+
+    def mark_down(self, backend: Backend):
+        with self.condition:
+            backend.state = 'down'
+
+    def forward(self, path: str, payload: Dict, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], 'Relay']:
+        """Send a request to a backend serving payload['model'].
+
+        Returns the upstream status, response headers and the body as a Relay,
+        which must be closed to release the backend slot. A backend that refuses
+        the connection is marked down and the request is routed again.
+        """
+        model = payload.get('model')
+        if not model:
+            raise GatewayError(400, "The 'model' field is required")
+        self.last_request_at = time.time()
+        deadline = self.last_request_at + self.queue_timeout
+
+        while True:
+            backend = self.acquire(model, deadline)
+            started = time.time()
+            forward_headers = {'Content-Type': 'application/json'}
+            if backend.api_key:
+                forward_headers['Authorization'] = f"Bearer {backend.api_key}"
+            elif headers.get('Authorization'):
+                forward_headers['Authorization'] = headers['Authorization']
+            try:
+                upstream = self._session().post(f"{backend.url}{path}", json=payload, headers=forward_headers,
+                                                stream=True, timeout=(5, self.request_timeout))
+            except requests.exceptions.ConnectionError:
+                logger.warning(f"Gateway backend {backend.name} refused a connection, rerouting")
+                self.release(backend)
+                self.mark_down(backend)
+                continue
+            except requests.exceptions.RequestException as e:
+                self.release(backend)
+                self.record(model, backend, started, None, 0, 'error')
+                raise GatewayError(502, f"Backend {backend.name} failed: {e}", 'backend_error')
+
+            if upstream.status_code == 503:
+                # The backend started loading between polls; queue again until it is ready
+                upstream.close()
+                self.release(backend)
+                with self.condition:
+                    backend.state = 'loading'
+                continue
+
+            response_headers = {key: value for key, value in upstream.headers.items()
+                                if key.lower() not in HOP_HEADERS}
+            response_headers['X-Gateway-Backend'] = backend.name
+            return upstream.status_code, response_headers, Relay(self, upstream, model, backend, started)
+
+    def record(self, model: str, backend: Backend, started: float, first_token_at: Optional[float],
+               tokens: int, result: str, concurrency: int = 1):
+        finished = time.time()
+        duration = finished - started
+        # Generation speed excludes prompt processing, and the first token, when its time is known
+        generating = finished - first_token_at if first_token_at else duration
+        generated = tokens - 1 if first_token_at else tokens
+        speed = generated / generating if generated > 0 and generating > 0 else None
+        self.requests.inc(1, model, backend.name, result)
+        self.durations.observe(duration, model, backend.name)
+        if first_token_at:
+            self.first_token.observe(first_token_at - started, model)
+        if tokens:
+            self.tokens.inc(tokens, model, backend.name)
+        if speed is not None:
+            self.speed.observe(speed, model, backend.name)
+        entry = {
+            'timestamp': finished, 'model': model, 'backend': backend.name, 'result': result,
+            'duration': round(duration, 3),
+            'time_to_first_token': round(first_token_at - started, 3) if first_token_at else None,
+            'completion_tokens': tokens,
+            'tokens_per_second': round(speed, 2) if speed is not None else None
+        }
+        self.recent.append(entry)
+        for listener in self.listeners:
+            try:
+                listener({**entry, 'started': started, 'devices': backend.devices, 'concurrency': concurrency})
+            except Exception as e:
+                logger.error(f"Gateway request listener failed: {e}")
+
+    def active_requests(self) -> int:
+        return sum(backend.inflight for backend in self.backends) + sum(self.waiting.values())
+
+    def status(self) -> Dict:
+        with self.condition:
+            return {
+                'enabled': self.enabled,
+                'backends': [backend.status() for backend in self.backends],
+                'waiting': {model: count for model, count in self.waiting.items() if count},
+                'last_request_at': self.last_request_at,
+                'recent': list(self.recent)[-50:],
+                'latency': self.durations.summary(),
+                'speed': self.speed.summary()
+            }
+
+    def render(self) -> str:
+        return ''.join([
+            self.requests.render(),
+            self.tokens.render(),
+            self.durations.render(),
+            self.first_token.render(),
+            self.queue_wait.render(),
+            self.speed.render(),
+            render_gauge('hld_gateway_queued_requests', 'Requests waiting for a backend', sum(self.waiting.values())),
+            render_gauge('hld_gateway_inflight_requests', 'Requests being served by backends',
+                         sum(backend.inflight for backend in self.backends))
+        ])
+
+
+class Relay:
+    """Response body passed through from a backend.
+
+    Closing it releases the backend slot and records the request exactly once,
+    whether the stream finished, failed or the client went away before the
+    first chunk was sent.
+    """
+
+    def __init__(self, gateway: InferenceGateway, upstream: requests.Response, model: str,
+                 backend: Backend, started: float):
+        self.gateway = gateway
+        self.upstream = upstream
+        self.model = model
+        self.backend = backend
+        self.started = started
+        streaming = upstream.headers.get('Content-Type', '').startswith('text/event-stream')
+        self.meter = StreamMeter() if streaming else None
+        self.body = bytearray()
+        self.result = 'error' if upstream.status_code >= 400 else 'cancelled'
+        self.closed = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        try:
+            for chunk in self.upstream.iter_content(chunk_size=None):
+                if self.meter is not None:
+                    self.meter.feed(chunk)
+                else:
+                    self.body.extend(chunk)
+                yield chunk
+            if self.result != 'error':
+                self.result = 'success'
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Gateway stream from {self.backend.name} broke: {e}")
+            self.result = 'error'
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.upstream.close()
+        concurrency = self.backend.inflight
+        self.gateway.release(self.backend)
+        if self.meter is not None:
+            first_token, tokens = self.meter.first_token_at, self.meter.tokens
+        else:
+            first_token, tokens = None, completion_tokens(bytes(self.body))
+        self.gateway.record(self.model, self.backend, self.started, first_token, tokens, self.result, concurrency)
+
+
+class StreamMeter:
+    """Follows a server-sent event stream to find the first token and count tokens.
+
+    llama-server and Ollama send one token per chunk; a final `usage` block, when
+    present, replaces the chunk count.
+    """
+
+    def __init__(self):
+        self.buffer = b''
+        self.tokens = 0
+        self.first_token_at: Optional[float] = None
+
+    def feed(self, chunk: bytes):
+        self.buffer += chunk
+        *lines, self.buffer = self.buffer.split(b'\n')
+        for line in lines:
+            line = line.strip()
+            if not line.startswith(b'data:') or line == b'data: [DONE]':
+                continue
+            try:
+                event = json.loads(line[5:])
+            except ValueError:
+                continue
+            usage = event.get('usage') or {}
+            if usage.get('completion_tokens'):
+                self.tokens = usage['completion_tokens']
+                continue
+            for choice in event.get('choices') or []:
+                if (choice.get('delta') or {}).get('content') or choice.get('text'):
+                    self.tokens += 1
+                    if self.first_token_at is None:
+                        self.first_token_at = time.time()
+
+
+def completion_tokens(body: bytes) -> int:
+    """Completion tokens reported in a non-streaming OpenAI response."""
+    try:
+        return int((json.loads(body).get('usage') or {}).get('completion_tokens') or 0)
+    except (ValueError, AttributeError, TypeError):
+        return 0
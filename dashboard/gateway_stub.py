@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Home LLM Dashboard - Inference Stub Server
+Imitates the llama-server endpoints the inference gateway relies on (/health,
+/v1/models, /slots and OpenAI-style completions, streamed or not) so routing,
+queueing and model swaps can be exercised without loading a real model.
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubState:
+    """Model, slots and load progress shared by the request handlers."""
+
+    def __init__(self, model: str, slots: int, load_seconds: float, tokens_per_second: float, tokens: int):
+        self.model = model
+        self.slots = [False] * slots
+        self.ready_at = time.time() + load_seconds
+        self.token_delay = 1 / tokens_per_second
+        self.tokens = tokens
+        self.lock = threading.Lock()
+
+    def loading(self) -> bool:
+        return time.time() < self.ready_at
+
+    def take_slot(self):
+        with self.lock:
+            for index, busy in enumerate(self.slots):
+                if not busy:
+                    self.slots[index] = True
+                    return index
+        return None
+
+    def free_slot(self, index: int):
+        with self.lock:
+            self.slots[index] = False
+
+
+def make_handler(state: StubState):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status: int, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if state.loading():
+                self.send_json(503, {'error': {'code': 503, 'message': 'Loading model', 'type': 'unavailable_error'}})
+            elif self.path == '/health':
+                self.send_json(200, {'status': 'ok'})
+            elif self.path == '/v1/models':
+                self.send_json(200, {'object': 'list', 'data': [{'id': state.model, 'object': 'model'}]})
+            elif self.path == '/slots':
+                self.send_json(200, [{'id': index, 'is_processing': busy} for index, busy in enumerate(state.slots)])
+            else:
+                self.send_json(404, {'error': {'code': 404, 'message': 'Not found'}})
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            if state.loading():
+                self.send_json(503, {'error': {'code': 503, 'message': 'Loading model', 'type': 'unavailable_error'}})
+                return
+            slot = state.take_slot()
+            if slot is None:
+                self.send_json(503, {'error': {'code': 503, 'message': 'No slot available'}})
+                return
+            try:
+                tokens = min(state.tokens, int(payload.get('max_tokens') or state.tokens))
+                chat = self.path.endswith('/chat/completions')
+                if payload.get('stream'):
+                    self.stream(tokens, chat)
+                else:
+                    time.sleep(tokens * state.token_delay)
+                    text = ' '.join(['token'] * tokens)
+                    choice = {'index': 0, 'finish_reason': 'length'}
+                    choice.update({'message': {'role': 'assistant', 'content': text}} if chat else {'text': text})
+                    self.send_json(200, {'object': 'chat.completion' if chat else 'text_completion',
+                                         'model': state.model, 'choices': [choice],
+                                         'usage': {'prompt_tokens': 8, 'completion_tokens': tokens,
+                                                   'total_tokens': tokens + 8}})
+            finally:
+                state.free_slot(slot)
+
+        def stream(self, tokens: int, chat: bool):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for index in range(tokens):
+                time.sleep(state.token_delay)
+                choice = {'index': 0, 'delta': {'content': f'token{index} '}} if chat else {'index': 0, 'text': f'token{index} '}
+                self.write_chunk(f"data: {json.dumps({'model': state.model, 'choices': [choice]})}\n\n".encode())
+            self.write_chunk(b'data: [DONE]\n\n')
+            self.write_chunk(b'')
+
+        def write_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b'\r\n')
+            self.wfile.flush()
+
+    return StubHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stub llama-server for testing the inference gateway')
+    parser.add_argument('--port', type=int, default=18080)
+    parser.add_argument('--model', default='stub-model')
+    parser.add_argument('--slots', type=int, default=2, help='Parallel request slots')
+    parser.add_argument('--load-seconds', type=float, default=0, help='Answer 503 for this long after start')
+    parser.add_argument('--tokens-per-second', type=float, default=50)
+    parser.add_argument('--tokens', type=int, default=32, help='Tokens generated per request')
+    args = parser.parse_args()
+
+    state = StubState(args.model, args.slots, args.load_seconds, args.tokens_per_second, args.tokens)
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(state))
+    print(f"Stub llama-server for {args.model} on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Home LLM Dashboard - Synthetic Fleet Data Generator
+Fills a metrics store with weeks of realistic history for N devices so queries,
+cleanup and the benchmark suite can be exercised at production scale.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import numpy as np
+
+from storage import METRIC_COLUMNS, PROCESS_COLUMNS
+
+# RAM, VRAM (GB) and typical model footprints modelled on the home lab hardware
+DEVICE_PROFILES = [
+    {'prefix': 'mac-mini', 'ram_total': 24.0, 'vram_total': None, 'idle_ram': 6.0, 'model_ram': 14.0},
+    {'prefix': 'windows-3070', 'ram_total': 32.0, 'vram_total': 8.0, 'idle_ram': 9.0, 'model_ram': 12.0},
+    {'prefix': 'debian', 'ram_total': 16.0, 'vram_total': None, 'idle_ram': 3.0, 'model_ram': 2.0}
+]
+
+
+def manifest_path(args) -> str:
+    target = args.ring_path if args.backend == 'ringbuffer' else args.db
+    return f"{target.rstrip(os.sep)}.fleet.json"
+
+
+def configure_environment(backend: str, db: str, ring_path: str, slots: int, days: float):
+    """Point the dashboard at the generated store without letting cleanup delete it."""
+    os.environ.update({
+        'DASHBOARD_STORAGE_BACKEND': backend,
+        'DASHBOARD_DATABASE_PATH': db,
+        'DASHBOARD_RING_BUFFER_PATH': ring_path,
+        'DASHBOARD_RING_BUFFER_SLOTS': str(slots),
+        'DASHBOARD_DATA_RETENTION_DAYS': str(int(days) + 2),
+        'DASHBOARD_CLEANUP_INTERVAL': str(10 ** 7)
+    })
+
+
+def session_mask(rng: np.random.Generator, timestamps: np.ndarray, sessions_per_day: float) -> np.ndarray:
+    """Mark samples that fall inside model sessions of 30 minutes to 4 hours."""
+    start, end = timestamps[0], timestamps[-1]
+    count = rng.poisson(sessions_per_day * (end - start) / 86400)
+    starts = np.sort(rng.uniform(start, end, count))
+    lengths = rng.uniform(1800, 4 * 3600, count)
+    # Sessions sorted by start; a sample is active if the latest start before it has not ended
+    index = np.searchsorted(starts, timestamps, side='right') - 1
+    active = index >= 0
+    active[active] = timestamps[active] < (starts + lengths)[index[active]]
+    return active
+
+
+def generate_device(rng: np.random.Generator, profile: Dict, timestamps: np.ndarray) -> Dict[str, np.ndarray]:
+    """Generate metric and llama-server process columns for one device."""
+    count = len(timestamps)
+    hour = (timestamps % 86400) / 3600
+    daytime = 0.5 + 0.5 * np.sin((hour - 9) / 24 * 2 * np.pi)
+    active = session_mask(rng, timestamps, sessions_per_day=3)
+
+    cpu = 5 + 15 * daytime + rng.gamma(2.0, 2.0, count) + active * rng.uniform(30, 70, count)
+    ram = profile['idle_ram'] + rng.normal(0, 0.2, count) + active * profile['model_ram']
+    gpu = np.where(active, rng.uniform(40, 100, count), rng.uniform(0, 5, count))
+    network = rng.exponential(0.3, count) + active * rng.exponential(25, count)
+
+    columns = {
+        'timestamp': timestamps,
+        'cpu_usage': np.clip(cpu, 0, 100),
+        'ram_usage': np.clip(ram, 0, profile['ram_total']),
+        'ram_total': np.full(count, profile['ram_total']),
+        'gpu_usage': gpu,
+        'vram_usage': np.full(count, np.nan),
+        'vram_total': np.full(count, np.nan),
+        'network_tx': network * rng.uniform(0.2, 0.6, count),
+        'network_rx': network
+    }
+    if profile['vram_total']:
+        columns['vram_usage'] = np.clip(0.4 + active * profile['vram_total'] * 0.8
+                                        + rng.normal(0, 0.05, count), 0, profile['vram_total'])
+        columns['vram_total'] = np.full(count, profile['vram_total'])
+
+    process = {
+        'timestamp': timestamps[active],
+        'cpu_percent': cpu[active] * rng.uniform(0.7, 0.95, int(active.sum())),
+        'rss': np.full(int(active.sum()), profile['model_ram']) + rng.normal(0, 0.05, int(active.sum())),
+        'threads': np.full(int(active.sum()), 12.0),
+        'connections': rng.integers(0, 4, int(active.sum())).astype(np.float64),
+        'count': np.ones(int(active.sum()))
+    }
+    return {'metrics': columns, 'process': process}
+
+
+def sqlite_timestamps(timestamps: np.ndarray) -> List[str]:
+    """Format epoch seconds the way sqlite3 stores timezone-aware datetimes."""
+    as_datetime = (timestamps * 1e6).astype('datetime64[us]')
+    text = np.char.replace(np.datetime_as_string(as_datetime, unit='us'), 'T', ' ')
+    return np.char.add(text, '+00:00').tolist()
+
+
+def write_sqlite(db_path: str, device_name: str, data: Dict[str, Dict[str, np.ndarray]], batch: int = 50000):
+    conn = sqlite3.connect(db_path)
+    metrics = data['metrics']
+    for start in range(0, len(metrics['timestamp']), batch):
+        chunk = slice(start, start + batch)
+        values = [metrics[column][chunk].astype(object) for column in METRIC_COLUMNS]
+        for column in values:
+            column[column != column] = None  # NaN -> NULL
+        conn.executemany(f'''
+            INSERT INTO device_metrics (device_name, timestamp, {', '.join(METRIC_COLUMNS)})
+            VALUES (?, ?, {', '.join('?' * len(METRIC_COLUMNS))})
+        ''', zip([device_name] * len(values[0]), sqlite_timestamps(metrics['timestamp'][chunk]), *values))
+
+    process = data['process']
+    conn.executemany(f'''
+        INSERT INTO process_metrics (device_name, process_name, timestamp, {', '.join(PROCESS_COLUMNS)})
+        VALUES (?, ?, ?, {', '.join('?' * len(PROCESS_COLUMNS))})
+    ''', zip([device_name] * len(process['timestamp']), ['llama-server'] * len(process['timestamp']),
+             sqlite_timestamps(process['timestamp']), *[process[column].tolist() for column in PROCESS_COLUMNS]))
+    conn.commit()
+    conn.close()
+
+
+def to_records(columns: Dict[str, np.ndarray], column_names: List[str]) -> np.ndarray:
+    dtype = np.dtype([('timestamp', '<f8')] + [(column, '<f4') for column in column_names])
+    records = np.empty(len(columns['timestamp']), dtype=dtype)
+    for name in dtype.names:
+        records[name] = columns[name]
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic fleet history for the dashboard')
+    parser.add_argument('--devices', type=int, default=3, help='Number of devices')
+    parser.add_argument('--days', type=float, default=14, help='Days of history per device')
+    parser.add_argument('--interval', type=float, default=5, help='Seconds between samples')
+    parser.add_argument('--backend', choices=['sqlite', 'ringbuffer'], default='sqlite')
+    parser.add_argument('--db', default='bench_dashboard.db', help='SQLite database to fill')
+    parser.add_argument('--ring-path', default='bench_ringbuffer', help='Ring buffer directory to fill')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    samples = int(args.days * 86400 / args.interval)
+    slots = max(samples, 1)
+    configure_environment(args.backend, args.db, args.ring_path, slots, args.days)
+
+    # Importing the dashboard creates the schema / store exactly as the server would
+    import dashboard
+    store = dashboard.db_manager
+
+    rng = np.random.default_rng(args.seed)
+    now = time.time()
+    timestamps = now - args.days * 86400 + np.arange(samples) * args.interval
+    started = time.perf_counter()
+    for index in range(args.devices):
+        profile = DEVICE_PROFILES[index % len(DEVICE_PROFILES)]
+        device_name = f"{profile['prefix']}-{index + 1}"
+        jitter = rng.uniform(0, 0.5, samples)  # Agents never report on exact boundaries
+        data = generate_device(rng, profile, timestamps + jitter)
+
+        if args.backend == 'sqlite':
+            write_sqlite(args.db, device_name, data)
+        else:
+            store.load_records(device_name, to_records(data['metrics'], METRIC_COLUMNS))
+            store.load_records(device_name, to_records(data['process'], PROCESS_COLUMNS), 'llama-server')
+        print(f"{device_name}: {samples} samples, {len(data['process']['timestamp'])} process samples")
+
+    manifest = {
+        'backend': args.backend, 'db': args.db, 'ring_path': args.ring_path, 'slots': slots,
+        'devices': args.devices, 'days': args.days, 'interval': args.interval, 'seed': args.seed,
+        'generated_at': datetime.now(timezone.utc).isoformat()
+    }
+    with open(manifest_path(args), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"Generated {args.devices * samples} samples in {time.perf_counter() - started:.1f}s, "
+          f"store size {store.storage_size_bytes() / 1024 ** 2:.1f} MB")
+    print(f"Manifest written to {manifest_path(args)}")
+
+
+if __name__ == '__main__':
+    main()
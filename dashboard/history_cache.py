@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Home LLM Dashboard - History Cache
+Bounded LRU cache of history query results keyed by device, range and resolution.
+Windows are aligned to bucket boundaries so concurrent dashboards share entries,
+and entries are extended with only the newest buckets after an ingest.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from itertools import count
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+
+from aggregation import downsample
+from telemetry import Counter, render_gauge
+
+logger = logging.getLogger(__name__)
+
+Groups = Dict[str, Dict[str, np.ndarray]]
+
+
+def trim_columns(columns: Dict[str, np.ndarray], start: float, end: float = np.inf) -> Dict[str, np.ndarray]:
+    """Keep the rows whose timestamp falls in [start, end)."""
+    timestamps = columns['timestamp']
+    mask = (timestamps >= start) & (timestamps < end)
+    if mask.all():
+        return columns
+    return {name: values[mask] for name, values in columns.items()}
+
+
+def columns_nbytes(groups: Groups) -> int:
+    return sum(values.nbytes for columns in groups.values() for values in columns.values())
+
+
+class HistoryEntry:
+    """One cached window. Entries are replaced rather than mutated, so a reader
+    serializing an entry never sees it change underneath it."""
+
+    def __init__(self, groups: Groups, window_start: float, resolution: int, generation: int, etag: str):
+        self.groups = groups
+        self.window_start = window_start
+        self.resolution = resolution
+        self.generation = generation
+        self.etag = etag
+        self.created_at = time.time()
+        self.bodies: Dict[str, bytes] = {}
+        self.size = columns_nbytes(groups)
+
+    def tail_starts(self, step: int) -> Dict[str, float]:
+        """Start of the data that may still change per series: the bucket of its last sample.
+
+        It is never earlier than the bucket before the one open when the entry was
+        built, so a series that stopped reporting (a process group that exited days
+        ago) does not pin the refresh to its last sample.
+        """
+        open_start = np.floor(self.created_at / step) * step
+        return {name: max(float(np.floor(columns['timestamp'][-1] / step) * step), open_start - step,
+                          self.window_start)
+                for name, columns in self.groups.items() if len(columns['timestamp'])}
+
+    def body(self, name: str, render: Callable[[Groups], bytes]) -> Tuple[bytes, int]:
+        """Serialized response for one output format, rendered once per entry.
+
+        Returns the body and how many bytes were newly cached.
+        """
+        body = self.bodies.get(name)
+        if body is not None:
+            return body, 0
+        body = render(self.groups)
+        self.bodies[name] = body
+        self.size += len(body)
+        return body, len(body)
+
+
+class HistoryCache:
+    """LRU/TTL cache of history windows, invalidated per device on ingest.
+
+    The window for a request ends at the current time and starts on a bucket
+    boundary (`resolution`, or `raw_step` seconds for raw samples), so keys and
+    contents repeat between refreshes. An ingest only bumps the device's
+    generation; the next read re-queries from the start of the last cached bucket
+    of each series and splices the result onto that series' cached prefix. Late
+    samples older than that are picked up when the entry expires after `ttl` seconds.
+
+    Stores take a window length rather than a start time and measure it from their
+    own clock, so every fetch asks for one extra bucket and is trimmed back to the
+    exact start; otherwise the rows right at the splice point would be lost.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float = 300, raw_step: int = 5):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.raw_step = raw_step
+        self.entries: 'OrderedDict[Tuple, HistoryEntry]' = OrderedDict()
+        self.generations: Dict[str, int] = {}
+        self.size_bytes = 0
+        self.lock = threading.Lock()
+        self.versions = count(1)
+        # Distinguishes ETags across restarts, when version numbers start again
+        self.instance = os.urandom(4).hex()
+        self.lookups = Counter('hld_history_cache_lookups', 'History cache lookups by result', ('result',))
+        self.evictions = Counter('hld_history_cache_evictions', 'History cache entries evicted to stay within the size limit')
+        self.not_modified = Counter('hld_history_cache_not_modified', 'Conditional history requests answered with 304')
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def invalidate(self, device_name: str):
+        """Mark every cached window of a device as needing its newest buckets refreshed."""
+        with self.lock:
+            self.generations[device_name] = self.generations.get(device_name, 0) + 1
+
+    def clear(self):
+        """Drop every cached window."""
+        with self.lock:
+            self.entries.clear()
+            self.size_bytes = 0
+
+    def get(self, key: Tuple, device_name: str, hours: float, resolution: int,
+            fetch: Callable[[float], Groups]) -> HistoryEntry:
+        """Return the cached window for `key`, building or extending it with `fetch`.
+
+        `fetch(hours)` must return raw column arrays for the last `hours` hours,
+        keyed by series name (as get_metric_columns / get_process_columns do).
+        """
+        now = time.time()
+        step = resolution or self.raw_step
+        window_start = float(np.floor((now - hours * 3600) / step) * step)
+
+        with self.lock:
+            generation = self.generations.get(device_name, 0)
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+
+        if entry is not None and now - entry.created_at < self.ttl:
+            if entry.generation == generation and entry.window_start == window_start:
+                self.lookups.inc(1, 'hit')
+                return entry
+            groups = self._extend(entry, window_start, now, fetch)
+            self.lookups.inc(1, 'extend')
+        else:
+            groups = self._load(window_start, resolution, now, fetch)
+            self.lookups.inc(1, 'miss')
+
+        entry = HistoryEntry(groups, window_start, resolution, generation,
+                             f"{self.instance}-{next(self.versions):x}")
+        if self.enabled:
+            self._store(key, entry)
+        return entry
+
+    def _load(self, window_start: float, resolution: int, now: float, fetch: Callable[[float], Groups]) -> Groups:
+        groups = {}
+        margin = resolution or self.raw_step
+        for name, columns in fetch((now - window_start + margin) / 3600).items():
+            columns = trim_columns(columns, window_start)
+            columns = downsample(columns, resolution, [c for c in columns if c != 'timestamp'])
+            # The ring buffer store returns views into its memory map, which are overwritten when it wraps
+            groups[name] = {column: np.array(values, copy=True) if values.base is not None else values
+                            for column, values in columns.items()}
+        return groups
+
+    def _extend(self, entry: HistoryEntry, window_start: float, now: float,
+                fetch: Callable[[float], Groups]) -> Groups:
+        step = entry.resolution or self.raw_step
+        tail_starts = entry.tail_starts(step)
+        # Series new since the entry was built start after it was created
+        fetch_start = min([*tail_starts.values(), np.floor(entry.created_at / step) * step - step])
+        tail = self._load(max(fetch_start, window_start), entry.resolution, now, fetch)
+
+        groups = {}
+        for name in entry.groups.keys() | tail.keys():
+            tail_start = tail_starts.get(name, fetch_start)
+            parts = []
+            if name in entry.groups:
+                parts.append(trim_columns(entry.groups[name], window_start, tail_start))
+            if name in tail:
+                parts.append(trim_columns(tail[name], max(window_start, tail_start)))
+            columns = {column: np.concatenate([part[column] for part in parts]) for column in parts[0]}
+            if len(columns['timestamp']):
+                groups[name] = columns
+        return groups
+
+    def _store(self, key: Tuple, entry: HistoryEntry):
+        if entry.size > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= previous.size
+            self.entries[key] = entry
+            self.size_bytes += entry.size
+            self._evict()
+
+    def account(self, key: Tuple, entry: HistoryEntry, added_bytes: int):
+        """Count bytes added to a stored entry (a newly rendered body) against the limit."""
+        if not added_bytes:
+            return
+        with self.lock:
+            if self.entries.get(key) is entry:
+                self.size_bytes += added_bytes
+                self._evict()
+
+    def _evict(self):
+        while self.size_bytes > self.max_bytes and self.entries:
+            _, evicted = self.entries.popitem(last=False)
+            self.size_bytes -= evicted.size
+            self.evictions.inc()
+
+    def stats(self) -> Dict:
+        results = {result[0]: int(value) for result, value in self.lookups.values.items()}
+        lookups = sum(results.values())
+        return {
+            'enabled': self.enabled,
+            'entries': len(self.entries),
+            'size_bytes': self.size_bytes,
+            'max_bytes': self.max_bytes,
+            'lookups': results,
+            'hit_rate': round(results.get('hit', 0) / lookups, 4) if lookups else None,
+            'not_modified': int(self.not_modified.total()),
+            'evictions': int(self.evictions.total())
+        }
+
+    def render(self) -> str:
+        return ''.join([
+            self.lookups.render(),
+            self.evictions.render(),
+            self.not_modified.render(),
+            render_gauge('hld_history_cache_entries', 'Windows held in the history cache', len(self.entries)),
+            render_gauge('hld_history_cache_size', 'Memory used by the history cache', self.size_bytes, 'bytes')
+        ])
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Home LLM Dashboard - Model Placement Advisor
+Reads GGUF headers from a local model catalog and combines per-layer tensor sizes
+with the free memory reported by agents to compute llama.cpp -ngl / --tensor-split.
+"""
+
+import json
+import logging
+import os
+import re
+import struct
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+GGUF_MAGIC = b'GGUF'
+GIB = 1024 ** 3
+MIB = 1024 ** 2
+
+# ggml tensor types: (bytes per block, elements per block)
+GGML_TYPES = {
+    0: (4, 1), 1: (2, 1), 2: (18, 32), 3: (20, 32), 6: (22, 32), 7: (24, 32),
+    8: (34, 32), 9: (36, 32), 10: (84, 256), 11: (110, 256), 12: (144, 256),
+    13: (176, 256), 14: (210, 256), 15: (292, 256), 16: (66, 256), 17: (74, 256),
+    18: (98, 256), 19: (50, 256), 20: (18, 32), 21: (110, 256), 22: (82, 256),
+    23: (136, 256), 24: (1, 1), 25: (2, 1), 26: (4, 1), 27: (8, 1), 28: (8, 1),
+    29: (56, 256), 30: (2, 1), 34: (54, 256), 35: (66, 256)
+}
+
+# KV cache types accepted by llama.cpp -ctk / -ctv: bytes per element
+KV_CACHE_TYPES = {
+    'f32': 4.0, 'f16': 2.0, 'bf16': 2.0, 'q8_0': 34 / 32, 'q4_0': 18 / 32,
+    'q4_1': 20 / 32, 'iq4_nl': 18 / 32, 'q5_0': 22 / 32, 'q5_1': 24 / 32
+}
+
+# GGUF metadata value types: struct format for scalars
+GGUF_SCALARS = {0: 'B', 1: 'b', 2: 'H', 3: 'h', 4: 'I', 5: 'i', 6: 'f', 7: '?', 10: 'Q', 11: 'q', 12: 'd'}
+GGUF_STRING, GGUF_ARRAY = 8, 9
+GGUF_ARRAY_LIMIT = 4096  # longer arrays are token tables, shorter ones per-layer values
+
+LAYER_PATTERN = re.compile(r'^blk\.(\d+)\.')
+
+
+class GGUFReader:
+    """Sequential reader for the GGUF header; tensor data is never read."""
+
+    def __init__(self, f):
+        self.f = f
+
+    def read(self, fmt: str):
+        return self.read_array(fmt, 1)[0]
+
+    def read_array(self, fmt: str, count: int) -> list:
+        size = struct.calcsize(f'<{count}{fmt}')
+        data = self.f.read(size)
+        if len(data) != size:
+            raise ValueError('Truncated GGUF header')
+        return list(struct.unpack(f'<{count}{fmt}', data))
+
+    def string(self) -> str:
+        return self.f.read(self.read('Q')).decode('utf-8', errors='replace')
+
+    def value(self, value_type: int):
+        if value_type == GGUF_STRING:
+            return self.string()
+        if value_type == GGUF_ARRAY:
+            item_type, count = self.read('I'), self.read('Q')
+            if item_type == GGUF_STRING:
+                # Token lists and merges are skipped by their length prefixes, never decoded
+                for _ in range(count):
+                    self.f.seek(self.read('Q'), os.SEEK_CUR)
+                return None
+            if item_type not in GGUF_SCALARS:
+                return [self.value(item_type) for _ in range(count)]
+            if count > GGUF_ARRAY_LIMIT:
+                # Token scores and types are skipped rather than decoded
+                self.f.seek(count * struct.calcsize('<' + GGUF_SCALARS[item_type]), os.SEEK_CUR)
+                return None
+            return self.read_array(GGUF_SCALARS[item_type], count)
+        if value_type not in GGUF_SCALARS:
+            raise ValueError(f"Unknown GGUF metadata type {value_type}")
+        return self.read(GGUF_SCALARS[value_type])
+
+
+def read_gguf(path: str) -> Dict:
+    """Parse GGUF metadata and tensor infos into a model description.
+
+    Returns architecture facts plus weight bytes per repeating layer, for the
+    output layer and for tensors that always stay on the CPU (token embeddings).
+    """
+    with open(path, 'rb') as f:
+        if f.read(4) != GGUF_MAGIC:
+            raise ValueError(f"{path} is not a GGUF file")
+        reader = GGUFReader(f)
+        version = reader.read('I')
+        if version < 2:
+            raise ValueError(f"GGUF version {version} is not supported")
+        tensor_count, kv_count = reader.read('Q'), reader.read('Q')
+
+        metadata = {}
+        for _ in range(kv_count):
+            key = reader.string()
+            metadata[key] = reader.value(reader.read('I'))
+
+        tensors = []
+        for _ in range(tensor_count):
+            name = reader.string()
+            dims = [reader.read('Q') for _ in range(reader.read('I'))]
+            tensor_type = reader.read('I')
+            reader.read('Q')  # offset into the data section
+            tensors.append((name, dims, tensor_type))
+
+    arch = metadata.get('general.architecture', 'llama')
+    n_layer = int(metadata.get(f'{arch}.block_count', 0))
+    n_embd = int(metadata.get(f'{arch}.embedding_length', 0))
+    n_head = int(metadata.get(f'{arch}.attention.head_count', 1) or 1)
+    n_head_kv = metadata.get(f'{arch}.attention.head_count_kv', n_head)
+    if isinstance(n_head_kv, list):  # per-layer head counts; size for the largest
+        n_head_kv = max(n_head_kv)
+    head_dim = n_embd // n_head if n_head else 0
+
+    layers = [0] * n_layer
+    output_bytes = cpu_bytes = 0
+    for name, dims, tensor_type in tensors:
+        block_bytes, block_size = GGML_TYPES.get(tensor_type, (2, 1))
+        elements = 1
+        for dim in dims:
+            elements *= dim
+        size = elements * block_bytes // block_size
+        match = LAYER_PATTERN.match(name)
+        if match and int(match.group(1)) < n_layer:
+            layers[int(match.group(1))] += size
+        elif name.startswith('output'):
+            output_bytes += size
+        else:
+            cpu_bytes += size
+
+    return {
+        'name': os.path.basename(path),
+        'architecture': arch,
+        'n_layer': n_layer,
+        'context_length': int(metadata.get(f'{arch}.context_length', 0)),
+        'n_head_kv': int(n_head_kv or 0),
+        'key_length': int(metadata.get(f'{arch}.attention.key_length', head_dim)),
+        'value_length': int(metadata.get(f'{arch}.attention.value_length', head_dim)),
+        'layer_bytes': layers,
+        'output_bytes': output_bytes,
+        'cpu_bytes': cpu_bytes,
+        'total_bytes': sum(layers) + output_bytes + cpu_bytes
+    }
+
+
+def kv_bytes_per_layer(model: Dict, ctx_size: int, cache_type_k: str, cache_type_v: str) -> int:
+    per_token = model['n_head_kv'] * (model['key_length'] * KV_CACHE_TYPES[cache_type_k]
+                                      + model['value_length'] * KV_CACHE_TYPES[cache_type_v])
+    return int(per_token * ctx_size)
+
+
+def fill_devices(items: List[int], budgets: List[float]) -> Optional[List[int]]:
+    """Assign consecutive items to devices in order without exceeding budgets.
+
+    Returns the item count per device, or None if they do not all fit.
+    """
+    counts = [0] * len(budgets)
+    device, used = 0, 0
+    for size in items:
+        while device < len(budgets) and used + size > budgets[device]:
+            device, used = device + 1, 0
+        if device == len(budgets):
+            return None
+        counts[device] += 1
+        used += size
+    return counts
+
+
+def plan_placement(model: Dict, budgets: List[float], ctx_size: int,
+                   cache_type_k: str = 'f16', cache_type_v: str = 'f16') -> Dict:
+    """Find the largest -ngl that fits the device budgets and a balanced split.
+
+    llama.cpp offloads the last `ngl` repeating layers (plus the output layer once
+    ngl exceeds the layer count) and hands them to devices as contiguous ranges in
+    device order, so feasibility is a greedy in-order fill. The split is then
+    balanced by lowering a common utilisation cap until the fill fails, which
+    leaves every device the same fraction of headroom.
+    """
+    kv = kv_bytes_per_layer(model, ctx_size, cache_type_k, cache_type_v)
+    n_layer = model['n_layer']
+    offloadable = [size + kv for size in model['layer_bytes']] + [model['output_bytes']]
+
+    ngl, counts = 0, [0] * len(budgets)
+    for candidate in range(n_layer + 1, 0, -1):
+        fitted = fill_devices(offloadable[n_layer + 1 - candidate:], budgets)
+        if fitted is not None:
+            ngl, counts = candidate, fitted
+            break
+
+    items = offloadable[n_layer + 1 - ngl:] if ngl else []
+    low, high = 0.0, 1.0
+    for _ in range(30):
+        cap = (low + high) / 2
+        fitted = fill_devices(items, [budget * cap for budget in budgets])
+        if fitted is None:
+            low = cap
+        else:
+            high, counts = cap, fitted
+
+    assigned, start = [], 0
+    for count in counts:
+        assigned.append(sum(items[start:start + count]))
+        start += count
+
+    cpu_layers = offloadable[:n_layer + 1 - ngl]
+    return {
+        'ngl': ngl,
+        'n_layer': n_layer,
+        'fully_offloaded': ngl == n_layer + 1,
+        'layers_per_device': counts,
+        'assigned_bytes': assigned,
+        'cpu_bytes': model['cpu_bytes'] + sum(cpu_layers),
+        'kv_cache_bytes': kv * n_layer
+    }
+
+
+def placement_args(plan: Dict, ctx_size: int, cache_type_k: str, cache_type_v: str) -> List[str]:
+    """llama-server arguments for a plan."""
+    args = ['-ngl', str(plan['ngl']), '--ctx-size', str(ctx_size)]
+    if len(plan['layers_per_device']) > 1:
+        args += ['--tensor-split', ','.join(str(count) for count in plan['layers_per_device'])]
+    if cache_type_k != 'f16':
+        args += ['-ctk', cache_type_k]
+    if cache_type_v != 'f16':
+        # llama.cpp only supports a quantized V cache with flash attention
+        args += ['-ctv', cache_type_v, '-fa']
+    return args
+
+
+class ModelCatalog:
+    """GGUF files found in the configured directories, with headers parsed once per mtime."""
+
+    def __init__(self, directories: List[str]):
+        self.directories = directories
+        self.cache: Dict[str, Tuple[float, Dict]] = {}
+        self.lock = threading.Lock()
+
+    def paths(self) -> Dict[str, str]:
+        found = {}
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                continue
+            for name in sorted(os.listdir(directory)):
+                if '.gguf' in name.lower():
+                    found.setdefault(name, os.path.join(directory, name))
+        return found
+
+    def get(self, name: str) -> Optional[Dict]:
+        path = self.paths().get(name)
+        if path is None:
+            return None
+        mtime = os.path.getmtime(path)
+        with self.lock:
+            cached = self.cache.get(path)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        model = read_gguf(path)
+        with self.lock:
+            self.cache[path] = (mtime, model)
+        return model
+
+    def list(self) -> List[Dict]:
+        models = []
+        for name in self.paths():
+            try:
+                model = self.get(name)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping model {name}: {e}")
+                continue
+            models.append({key: model[key] for key in
+                           ('name', 'architecture', 'n_layer', 'context_length', 'total_bytes')})
+        return models
+
+
+class PlacementAdvisor:
+    """Computes placements for catalog models from the latest agent metrics.
+
+    Devices are listed in the order llama.cpp enumerates them (RPC servers first,
+    then local GPUs), each mapped to the agent that reports its memory:
+    `vram` devices use free VRAM, `unified` devices (Apple Metal) use free RAM
+    capped at `gpu_fraction` of total RAM.
+    """
+
+    def __init__(self, config_path: str, latest_metrics: Callable[[str], Optional[Dict]],
+                 last_seen: Callable[[str], Optional[float]], offline_threshold: float):
+        self.config_path = config_path
+        self.latest_metrics = latest_metrics
+        self.last_seen = last_seen
+        self.offline_threshold = offline_threshold
+        self.config = self.load_config()
+        self.catalog = ModelCatalog(self.config.get('model_dirs', []))
+
+    def load_config(self) -> Dict:
+        if not os.path.exists(self.config_path):
+            logger.info(f"Placement config {self.config_path} not found, placement advisor disabled")
+            return {}
+        try:
+            with open(self.config_path) as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Error loading placement config {self.config_path}: {e}")
+            return {}
+
+    def device_budgets(self) -> List[Dict]:
+        reserve = self.config.get('reserve_mb', 512) * MIB
+        now = time.time()
+        devices = []
+        for device in self.config.get('devices', []):
+            metrics = self.latest_metrics(device['agent']) or {}
+            last_seen = self.last_seen(device['agent'])
+            if device.get('memory', 'vram') == 'unified':
+                total, used = metrics.get('ram_total'), metrics.get('ram_usage')
+                free = None
+                if total is not None and used is not None:
+                    free = min(total - used, total * device.get('gpu_fraction', 0.75))
+            else:
+                total, used = metrics.get('vram_total'), metrics.get('vram_usage')
+                free = total - used if total is not None and used is not None else None
+
+            free_bytes = max(0.0, free * GIB) if free is not None else 0.0
+            devices.append({
+                'name': device['name'],
+                'agent': device['agent'],
+                'memory': device.get('memory', 'vram'),
+                'online': last_seen is not None and now - last_seen <= self.offline_threshold,
+                'free_bytes': free_bytes,
+                'budget_bytes': max(0.0, free_bytes - device.get('reserve_mb', reserve / MIB) * MIB)
+            })
+        return devices
+
+    def advise(self, model_name: str, ctx_size: int = 0, cache_type_k: str = 'f16',
+               cache_type_v: str = 'f16') -> Dict:
+        """Compute a placement; raises ValueError for unknown models or cache types."""
+        for cache_type in (cache_type_k, cache_type_v):
+            if cache_type not in KV_CACHE_TYPES:
+                raise ValueError(f"Unknown KV cache type '{cache_type}'")
+        model = self.catalog.get(model_name)
+        if model is None:
+            raise ValueError(f"Model '{model_name}' not found in the catalog")
+        ctx_size = ctx_size or model['context_length'] or 4096
+
+        devices = self.device_budgets()
+        # Offline devices keep their slot in the split but receive no layers
+        budgets = [device['budget_bytes'] if device['online'] else 0 for device in devices]
+        plan = plan_placement(model, budgets, ctx_size, cache_type_k, cache_type_v)
+        for device, layers, assigned in zip(devices, plan['layers_per_device'], plan['assigned_bytes']):
+            device.update({'layers': layers, 'assigned_bytes': assigned})
+
+        return {
+            'model': model['name'],
+            'ctx_size': ctx_size,
+            'cache_type_k': cache_type_k,
+            'cache_type_v': cache_type_v,
+            'plan': plan,
+            'devices': devices,
+            'args': placement_args(plan, ctx_size, cache_type_k, cache_type_v)
+        }
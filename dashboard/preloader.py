@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Home LLM Dashboard - Predictive Preloader
+Learns when each model deployment is used from script runs and gateway requests,
+and starts the deployment most likely to be needed shortly before that demand.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from gateway import InferenceGateway
+from telemetry import Counter
+
+logger = logging.getLogger(__name__)
+
+# Demand is recorded at most once per deployment per slot
+SLOT_SECONDS = 900
+
+
+class ModelPreloader:
+    """Per-weekday/hour usage profiles and preloading based on them.
+
+    Deployments are scripts from `scripts_config.json`, each with the gateway
+    models it serves. Starting one from the control panel, or a gateway request
+    for one of its models, counts as demand; demand is appended to a JSON lines
+    history. The chance that a deployment is used in a given weekday and hour is
+    the recency-weighted share of past days (half-life `half_life_weeks`) on which
+    it was used in that hour. `lead_minutes` before an hour whose most likely
+    deployment reaches `min_probability`, that deployment's script runs unless it
+    is already loaded or something else was used in the last `quiet_minutes`.
+    A preload is a hit if the deployment is used before the end of the predicted
+    hour and a miss otherwise; demand for a deployment that was not loaded and
+    not predicted is counted as unpredicted.
+    """
+
+    def __init__(self, config_path: str, history_path: str, gateway: InferenceGateway,
+                 run_script: Callable[[str], bool], paused: Callable[[], bool] = None,
+                 notify: Callable[[Dict], None] = None):
+        self.config_path = config_path
+        self.history_path = history_path
+        self.gateway = gateway
+        self.run_script = run_script
+        self.paused = paused
+        self.notify = notify
+        self.policy: Dict = {}
+        self.history: List[tuple] = []  # (timestamp, deployment, source)
+        self.last_slot: Dict[str, int] = {}
+        self.last_demand: Dict[str, float] = {}
+        self.current: Optional[str] = None  # Deployment started last, when the gateway cannot tell
+        self.loaded: set = set()  # Deployments loaded at the last check
+        self.preloaded: set = set()  # (deployment, hour start) already acted on
+        self.pending: List[Dict] = []
+        self.events = deque(maxlen=100)
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.outcomes = Counter('hld_preload_outcomes', 'Predictive preloads by outcome, and unpredicted cold starts',
+                                ('deployment', 'result'))
+        self.reload()
+        self.load_history()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.policy.get('deployments'))
+
+    def reload(self) -> bool:
+        if not os.path.exists(self.config_path):
+            logger.info(f"Preload policy {self.config_path} not found, predictive preloading disabled")
+            return False
+        try:
+            with open(self.config_path) as f:
+                self.policy = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Error loading preload policy {self.config_path}: {e}")
+            return False
+        logger.info(f"Loaded preload policy for {len(self.policy.get('deployments', {}))} deployments "
+                    f"from {self.config_path}")
+        return True
+
+    def load_history(self):
+        """Read the demand history, dropping entries older than `history_days`."""
+        if not self.history_path or not os.path.exists(self.history_path):
+            return
+        cutoff = time.time() - self.policy.get('history_days', 56) * 86400
+        dropped = 0
+        try:
+            with open(self.history_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if entry.get('timestamp', 0) >= cutoff:
+                        self.history.append((entry['timestamp'], entry['deployment'], entry.get('source')))
+                    else:
+                        dropped += 1
+            if dropped:
+                # Rewrite the file without the expired entries so it does not grow forever
+                with open(self.history_path, 'w') as f:
+                    for timestamp, deployment, source in self.history:
+                        f.write(json.dumps({'timestamp': timestamp, 'deployment': deployment, 'source': source}) + '\n')
+        except OSError as e:
+            logger.error(f"Error reading usage history {self.history_path}: {e}")
+            return
+        for timestamp, deployment, _ in self.history:
+            self.last_slot[deployment] = int(timestamp // SLOT_SECONDS)
+            self.last_demand[deployment] = timestamp
+        logger.info(f"Loaded {len(self.history)} usage records from {self.history_path}")
+
+    def start(self):
+        if self.thread is None and self.enabled:
+            self.thread = threading.Thread(target=self._loop, name='preloader')
+            self.thread.daemon = True
+            self.thread.start()
+
+    def _loop(self):
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Error in predictive preloader: {e}")
+            time.sleep(self.policy.get('check_interval', 60))
+
+    def deployment_for_model(self, model: str) -> Optional[str]:
+        for deployment, settings in self.policy.get('deployments', {}).items():
+            if model in settings.get('models', []):
+                return deployment
+        return None
+
+    def is_loaded(self, deployment: str) -> bool:
+        """Whether a ready gateway backend has one of the deployment's models loaded."""
+        models = set(self.policy.get('deployments', {}).get(deployment, {}).get('models', []))
+        backends = [backend for backend in self.gateway.backends if models & (backend.models | backend.configured_models)]
+        if not backends:
+            return self.current == deployment
+        return any(backend.state == 'ready' and models & backend.loaded for backend in backends)
+
+    def observe_request(self, request: Dict):
+        """Gateway listener: a request is demand for the deployment serving its model."""
+        deployment = self.deployment_for_model(request['model'])
+        if deployment is not None:
+            # The request has finished by now, so whether it found its model cold is judged by the last check
+            self.observe(deployment, request['started'], 'request', cold=deployment not in self.loaded)
+
+    def observe_script(self, script_id: str):
+        """A script started by hand is demand if it starts a deployment."""
+        if script_id in self.policy.get('deployments', {}):
+            self.observe(script_id, time.time(), 'script', cold=not self.is_loaded(script_id))
+            self.current = script_id
+            self.loaded.add(script_id)
+
+    def observe(self, deployment: str, timestamp: float, source: str, cold: bool):
+        slot = int(timestamp // SLOT_SECONDS)
+        with self.lock:
+            self.last_demand[deployment] = max(self.last_demand.get(deployment, 0.0), timestamp)
+            hit = next((prediction for prediction in self.pending if prediction['deployment'] == deployment
+                        and prediction['made_at'] <= timestamp < prediction['window_end']), None)
+            if hit is not None:
+                self.pending.remove(hit)
+            if self.last_slot.get(deployment) == slot:
+                new_slot = False
+            else:
+                new_slot = True
+                self.last_slot[deployment] = slot
+                self.history.append((timestamp, deployment, source))
+        if hit is not None:
+            self.outcomes.inc(1, deployment, 'hit')
+            self._event('hit', deployment, f"Preloaded {deployment} was used ({source})")
+        elif cold and new_slot:
+            self.outcomes.inc(1, deployment, 'unpredicted')
+            self._event('unpredicted', deployment, f"{deployment} was needed without a preload ({source})")
+        if new_slot and self.history_path:
+            try:
+                with open(self.history_path, 'a') as f:
+                    f.write(json.dumps({'timestamp': timestamp, 'deployment': deployment, 'source': source}) + '\n')
+            except OSError as e:
+                logger.error(f"Error writing usage history {self.history_path}: {e}")
+
+    def profiles(self, now: float = None) -> Dict[str, np.ndarray]:
+        """7 x 24 usage probabilities (Monday first, local time) per deployment.
+
+        Only whole days before today count, so hours that have not happened yet
+        today do not read as unused.
+        """
+        now = now or time.time()
+        today = datetime.fromtimestamp(now).date()
+        with self.lock:
+            history = list(self.history)
+        if not history:
+            return {}
+        first = min(datetime.fromtimestamp(timestamp).date() for timestamp, _, _ in history)
+        days = max(0, min((today - first).days, self.policy.get('history_days', 56)))
+        if days == 0:
+            return {}
+        start = today - timedelta(days=days)
+
+        deployments = list(self.policy.get('deployments', {}))
+        used = np.zeros((len(deployments), days, 24), dtype=bool)
+        for timestamp, deployment, _ in history:
+            moment = datetime.fromtimestamp(timestamp)
+            day = (moment.date() - start).days
+            if deployment in deployments and 0 <= day < days:
+                used[deployments.index(deployment), day, moment.hour] = True
+
+        ages = days - np.arange(days)
+        weights = 0.5 ** (ages / (7 * self.policy.get('half_life_weeks', 4)))
+        weekdays = np.array([(start + timedelta(days=day)).weekday() for day in range(days)])
+        min_days = self.policy.get('min_days', 2)
+        result = {}
+        for index, deployment in enumerate(deployments):
+            profile = np.zeros((7, 24))
+            for weekday in range(7):
+                mask = weekdays == weekday
+                if mask.sum() < min_days:
+                    continue
+                profile[weekday] = weights[mask] @ used[index, mask] / weights[mask].sum()
+            result[deployment] = profile
+        return result
+
+    def predict(self, target: float, profiles: Dict[str, np.ndarray] = None) -> Optional[tuple]:
+        """The most likely deployment for the hour containing `target`, with its probability."""
+        profiles = self.profiles() if profiles is None else profiles
+        moment = datetime.fromtimestamp(target)
+        scores = [(profile[moment.weekday(), moment.hour], deployment) for deployment, profile in profiles.items()]
+        if not scores:
+            return None
+        probability, deployment = max(scores)
+        if probability < self.policy.get('min_probability', 0.5):
+            return None
+        return deployment, float(probability)
+
+    def check(self, now: float = None):
+        """Settle expired predictions and preload the next hour's deployment if it is due."""
+        now = now or time.time()
+        self.loaded = {deployment for deployment in self.policy.get('deployments', {}) if self.is_loaded(deployment)}
+        with self.lock:
+            expired = [prediction for prediction in self.pending if prediction['window_end'] <= now]
+            self.pending = [prediction for prediction in self.pending if prediction['window_end'] > now]
+        for prediction in expired:
+            self.outcomes.inc(1, prediction['deployment'], 'miss')
+            self._event('miss', prediction['deployment'], f"Preloaded {prediction['deployment']} was not used")
+
+        target = now + self.policy.get('lead_minutes', 15) * 60
+        prediction = self.predict(target)
+        if prediction is None or (self.paused is not None and self.paused()):
+            return
+        deployment, probability = prediction
+        hour_start = datetime.fromtimestamp(target).replace(minute=0, second=0, microsecond=0).timestamp()
+        if (deployment, hour_start) in self.preloaded or deployment in self.loaded:
+            return
+        quiet = now - self.policy.get('quiet_minutes', 10) * 60
+        if self.gateway.active_requests() > 0 or any(
+                last >= quiet for other, last in self.last_demand.items() if other != deployment):
+            return  # Do not swap out a model that is in use
+
+        self.preloaded.add((deployment, hour_start))
+        if not self.run_script(deployment):
+            logger.warning(f"Preload of {deployment} deferred: script could not start")
+            self.preloaded.discard((deployment, hour_start))
+            return
+        self.current = deployment
+        self.loaded.add(deployment)
+        with self.lock:
+            self.pending.append({'deployment': deployment, 'made_at': now, 'window_end': hour_start + 3600,
+                                 'probability': round(probability, 3)})
+        self._event('preload', deployment,
+                    f"Preloading {deployment} ({probability:.0%} likely at {datetime.fromtimestamp(hour_start):%a %H:00})")
+
+    def _event(self, kind: str, deployment: str, message: str):
+        event = {'timestamp': time.time(), 'event': kind, 'deployment': deployment, 'message': message}
+        self.events.append(event)
+        logger.info(f"Preloader: {message}")
+        if self.notify is not None:
+            self.notify(event)
+
+    def status(self) -> Dict:
+        now = time.time()
+        profiles = self.profiles(now)
+        stats = {}
+        for (deployment, result), value in self.outcomes.values.items():
+            stats.setdefault(deployment, {'hit': 0, 'miss': 0, 'unpredicted': 0})[result] = int(value)
+        for counts in stats.values():
+            decided = counts['hit'] + counts['miss']
+            counts['hit_rate'] = round(counts['hit'] / decided, 3) if decided else None
+        # The most likely deployment for each of the next 24 hours
+        upcoming = []
+        for hours in range(24):
+            target = now + hours * 3600
+            prediction = self.predict(target, profiles)
+            upcoming.append({
+                'hour': datetime.fromtimestamp(target).replace(minute=0, second=0, microsecond=0).timestamp(),
+                'deployment': prediction[0] if prediction else None,
+                'probability': round(prediction[1], 3) if prediction else None
+            })
+        with self.lock:
+            pending = list(self.pending)
+            records = len(self.history)
+        return {
+            'enabled': self.enabled,
+            'policy': self.policy,
+            'history_records': records,
+            'outcomes': stats,
+            'pending': pending,
+            'upcoming': upcoming,
+            'profiles': {deployment: np.round(profile, 3).tolist() for deployment, profile in profiles.items()},
+            'events': list(self.events)
+        }
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Home LLM Dashboard - Sampling Profiler
+Low-overhead stack sampler that can be switched on and off at runtime.
+"""
+
+import os
+import sys
+import threading
+import time
+import logging
+from collections import Counter
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StackSampler:
+    """Periodically samples the stacks of all threads into collapsed stack counts.
+
+    Nothing runs while the sampler is stopped, so it is safe to leave in
+    production builds. Output uses the collapsed format understood by
+    flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, max_stacks: int = 10000):
+        self.max_stacks = max_stacks
+        self.counts = Counter()
+        self.samples = 0
+        self.interval = 0.01
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, interval: float = 0.01, duration: float = 30) -> bool:
+        """Start sampling every `interval` seconds for at most `duration` seconds."""
+        if self.running:
+            return False
+
+        with self.lock:
+            self.counts.clear()
+            self.samples = 0
+        self.interval = max(interval, 0.001)
+        self.started_at = time.time()
+        self.stopped_at = None
+        self.stop_event.clear()
+
+        self.thread = threading.Thread(target=self._run, args=(duration,), name='stack-sampler')
+        self.thread.daemon = True
+        self.thread.start()
+        logger.info(f"Stack sampler started (interval {self.interval}s, max {duration}s)")
+        return True
+
+    def stop(self) -> bool:
+        if not self.running:
+            return False
+        self.stop_event.set()
+        self.thread.join(timeout=5)
+        logger.info(f"Stack sampler stopped after {self.samples} samples")
+        return True
+
+    def _run(self, duration: float):
+        own_id = threading.get_ident()
+        deadline = time.time() + duration
+        while not self.stop_event.wait(self.interval) and time.time() < deadline:
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stacks.append(self._collapse(thread_names.get(thread_id, str(thread_id)), frame))
+
+            with self.lock:
+                self.samples += 1
+                for stack in stacks:
+                    if stack in self.counts or len(self.counts) < self.max_stacks:
+                        self.counts[stack] += 1
+        self.stopped_at = time.time()
+
+    @staticmethod
+    def _collapse(thread_name: str, frame) -> str:
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        parts.append(thread_name)
+        return ';'.join(reversed(parts))
+
+    def status(self) -> Dict:
+        return {
+            'running': self.running,
+            'interval': self.interval,
+            'samples': self.samples,
+            'unique_stacks': len(self.counts),
+            'started_at': self.started_at,
+            'stopped_at': self.stopped_at
+        }
+
+    def dump(self, limit: int = 0) -> str:
+        """Return collapsed stacks, most frequent first."""
+        with self.lock:
+            stacks = self.counts.most_common(limit or None)
+        return ''.join(f"{stack} {count}\n" for stack, count in stacks)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Home LLM Dashboard - Adaptive Sampling
+Decides how often each agent should sample: fast while something interesting is
+happening on the device, slow while it sits idle and nobody is looking at it.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Set
+
+# A device below these is idle (unless it is loading, viewed or busy serving)
+IDLE_CPU_PERCENT = 20
+IDLE_GPU_PERCENT = 10
+
+
+class SamplingController:
+    """Computes per-device sampling directives returned to agents.
+
+    A device samples every `active_interval` seconds while an inference server
+    on it is loading a model, while a script that targets it is running, or
+    while its chart is on screen in a dashboard. An idle device drops to
+    `idle_interval`; everything else uses `normal_interval`. Dashboards report
+    which device charts are visible; a report counts for `view_ttl` seconds.
+    """
+
+    def __init__(self, active_interval: float, normal_interval: float, idle_interval: float,
+                 view_ttl: float, running_script_devices: Callable[[], Optional[Set[str]]]):
+        self.active_interval = active_interval
+        self.normal_interval = normal_interval
+        self.idle_interval = idle_interval
+        self.view_ttl = view_ttl
+        self.running_script_devices = running_script_devices
+        self.views: Dict[str, tuple] = {}
+        self.sent: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+
+    def set_view(self, client_id: str, devices: Iterable[str]):
+        with self.lock:
+            self.views[client_id] = (set(devices), time.time())
+
+    def drop_view(self, client_id: str):
+        with self.lock:
+            self.views.pop(client_id, None)
+
+    def viewed(self) -> Set[str]:
+        cutoff = time.time() - self.view_ttl
+        with self.lock:
+            return set().union(*(devices for devices, seen in self.views.values() if seen >= cutoff))
+
+    def directive(self, device_name: str, metrics: Optional[Dict]) -> Dict:
+        metrics = metrics or {}
+        servers = (metrics.get('inference_servers') or {}).values()
+        script_devices = self.running_script_devices()
+
+        if any(server.get('loading') for server in servers):
+            reason = 'loading'
+        elif script_devices is not None and (not script_devices or device_name in script_devices):
+            reason = 'script'
+        elif device_name in self.viewed():
+            reason = 'viewed'
+        elif (any(server.get('slots_busy') for server in servers)
+              or (metrics.get('cpu_usage') or 0) >= IDLE_CPU_PERCENT
+              or (metrics.get('gpu_usage') or 0) >= IDLE_GPU_PERCENT):
+            reason = 'normal'
+        else:
+            reason = 'idle'
+
+        interval = {'normal': self.normal_interval, 'idle': self.idle_interval}.get(reason, self.active_interval)
+        return {'interval': interval, 'reason': reason}
+
+    def changed(self, device_name: str, directive: Dict) -> bool:
+        """Whether a directive differs from the last one sent to the device (and remember it)."""
+        with self.lock:
+            previous = self.sent.get(device_name)
+            self.sent[device_name] = directive
+        return previous is None or previous['interval'] != directive['interval']
+
+    def status(self) -> Dict:
+        with self.lock:
+            sent = dict(self.sent)
+        return {
+            'intervals': {'active': self.active_interval, 'normal': self.normal_interval, 'idle': self.idle_interval},
+            'viewed': sorted(self.viewed()),
+            'devices': sent
+        }
@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""
+Home LLM Dashboard - Metrics Storage
+Storage backend interface and the memory-mapped ring buffer backend.
+"""
+
+import os
+import re
+import threading
+import time
+import zlib
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from itertools import repeat
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Numeric columns stored for every sample, in storage order
+METRIC_COLUMNS = [
+    'cpu_usage', 'ram_usage', 'ram_total',
+    'gpu_usage', 'vram_usage', 'vram_total',
+    'network_tx', 'network_rx'
+]
+
+# Numeric columns stored per tracked process group (CPU %, RSS in GB, threads,
+# open connections and matching process count)
+PROCESS_COLUMNS = ['cpu_percent', 'rss', 'threads', 'connections', 'count']
+
+
+def format_timestamp(timestamp_obj: datetime) -> str:
+    """Format a datetime as an ISO timestamp for JavaScript compatibility."""
+    return timestamp_obj.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def parse_timestamp(iso_timestamp: str) -> Optional[float]:
+    """Parse an API ISO timestamp back into epoch seconds."""
+    try:
+        return datetime.fromisoformat(iso_timestamp.replace('Z', '+00:00')).timestamp()
+    except (ValueError, AttributeError):
+        return None
+
+
+def format_timestamps(timestamps: np.ndarray) -> List[str]:
+    """Vectorized format_timestamp for an array of epoch seconds."""
+    as_datetime = (timestamps * 1000).astype('datetime64[ms]')
+    return np.char.add(np.datetime_as_string(as_datetime, unit='ms'), 'Z').tolist()
+
+
+def column_values(values: np.ndarray) -> list:
+    """Convert a float column to a JSON-ready list with None for missing values.
+
+    float64 columns are passed through unchanged. float32 columns (ring buffers)
+    are cut to the 7 significant digits they hold, so a stored 0.1 is sent as
+    0.1 rather than 0.10000000149011612.
+    """
+    exact = values.astype(np.float64)
+    if values.dtype == np.float32:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale = 10.0 ** (6 - np.floor(np.log10(np.abs(exact))))
+            exact = np.where(np.isfinite(scale), np.round(exact * scale) / scale, exact)
+    result = exact.astype(object)
+    result[np.isnan(exact)] = None
+    return result.tolist()
+
+
+def empty_columns(column_names: List[str] = METRIC_COLUMNS) -> Dict[str, np.ndarray]:
+    """Return a column set with no samples."""
+    columns = {'timestamp': np.empty(0, dtype=np.float64)}
+    for column in column_names:
+        columns[column] = np.empty(0, dtype=np.float64)
+    return columns
+
+
+def columns_to_rows(device_name: str, columns: Dict[str, np.ndarray]) -> List[Dict]:
+    """Convert chronological column arrays into API row dicts, newest first."""
+    if len(columns['timestamp']) == 0:
+        return []
+
+    keys = ['device_name', 'timestamp'] + METRIC_COLUMNS
+    timestamps = format_timestamps(columns['timestamp'][::-1])
+    values = [column_values(columns[column][::-1]) for column in METRIC_COLUMNS]
+    return [dict(zip(keys, row)) for row in zip(repeat(device_name), timestamps, *values)]
+
+
+class MetricsStore(ABC):
+    """Interface implemented by every metrics storage backend."""
+
+    @abstractmethod
+    def insert_metrics(self, device_name: str, metrics: Dict, timestamp: float = None):
+        """Store one sample of device metrics, taken at `timestamp` (epoch seconds, default now)."""
+
+    @abstractmethod
+    def get_metric_columns(self, device_name: str = None, hours: int = 24) -> Dict[str, Dict[str, np.ndarray]]:
+        """Return chronological column arrays per device for the last `hours`.
+
+        Each column set has a float64 `timestamp` array of epoch seconds and one
+        array per entry in METRIC_COLUMNS, with NaN for missing values. Devices
+        without samples in the window are omitted.
+        """
+
+    def get_metrics(self, device_name: str = None, hours: int = 24) -> List[Dict]:
+        """Return samples newer than `hours`, newest first per device."""
+        results = []
+        for name, columns in sorted(self.get_metric_columns(device_name, hours).items()):
+            results.extend(columns_to_rows(name, columns))
+        return results
+
+    @abstractmethod
+    def insert_process_metrics(self, device_name: str, processes: Dict[str, Dict], timestamp: float = None):
+        """Store one sample of per-process-group metrics for a device."""
+
+    @abstractmethod
+    def get_process_columns(self, device_name: str, hours: int = 24) -> Dict[str, Dict[str, np.ndarray]]:
+        """Return chronological column arrays per process group of a device.
+
+        Column sets hold `timestamp` plus one array per entry in PROCESS_COLUMNS.
+        """
+
+    @abstractmethod
+    def get_latest_metrics(self) -> Dict[str, Dict]:
+        """Return the most recent sample for each device."""
+
+    @abstractmethod
+    def cleanup_old_data(self):
+        """Remove samples older than the retention period."""
+
+    @abstractmethod
+    def storage_size_bytes(self) -> int:
+        """Return the on-disk size of the store."""
+
+
+class RingBuffer:
+    """Fixed-size, memory-mapped ring of samples for a single device.
+
+    The file starts with a 256 byte header followed by `capacity` fixed-width
+    slots holding a float64 timestamp and one float32 per column. Missing
+    values are stored as NaN.
+    """
+
+    MAGIC = b'HLDRING1'
+    HEADER_SIZE = 256
+    NAME_BYTES = 216
+    HEADER_DTYPE = np.dtype([
+        ('magic', 'S8'),
+        ('capacity', '<u8'),
+        ('layout', '<u8'),
+        ('head', '<u8'),
+        ('count', '<u8'),
+        ('device_name', f'S{NAME_BYTES}')
+    ])
+
+    def __init__(self, path: str, device_name: str, columns: List[str], capacity: int):
+        self.path = path
+        self.device_name = device_name
+        self.columns = columns
+        self.capacity = capacity
+        self.layout = zlib.crc32(','.join(columns).encode())
+        self.record_dtype = np.dtype([('timestamp', '<f8')] + [(column, '<f4') for column in columns])
+
+        if not self._is_compatible():
+            self._create()
+
+        self.header = np.memmap(path, dtype=self.HEADER_DTYPE, mode='r+', shape=(1,))
+        self.records = np.memmap(path, dtype=self.record_dtype, mode='r+',
+                                 offset=self.HEADER_SIZE, shape=(capacity,))
+
+    @classmethod
+    def stored_name(cls, name: str) -> str:
+        """The name as kept in the header: cut to NAME_BYTES on a character boundary."""
+        return name.encode('utf-8')[:cls.NAME_BYTES].decode('utf-8', errors='ignore')
+
+    @classmethod
+    def read_device_name(cls, path: str) -> Optional[str]:
+        """Read the device name stored in a ring file header."""
+        try:
+            header = np.fromfile(path, dtype=cls.HEADER_DTYPE, count=1)
+            if len(header) == 1 and header[0]['magic'] == cls.MAGIC:
+                # Older files may have a character split at the end of the field
+                return header[0]['device_name'].decode('utf-8', errors='ignore')
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read ring buffer header {path}: {e}")
+        return None
+
+    def _is_compatible(self) -> bool:
+        """Check that an existing file matches the configured layout."""
+        if not os.path.exists(self.path):
+            return False
+
+        header = np.fromfile(self.path, dtype=self.HEADER_DTYPE, count=1)
+        expected_size = self.HEADER_SIZE + self.capacity * self.record_dtype.itemsize
+        if (len(header) != 1 or header[0]['magic'] != self.MAGIC
+                or header[0]['capacity'] != self.capacity
+                or header[0]['layout'] != self.layout
+                or os.path.getsize(self.path) != expected_size):
+            logger.warning(f"Ring buffer {self.path} has a different layout, recreating it")
+            return False
+        return True
+
+    def _create(self):
+        """Preallocate the ring file and write an empty header."""
+        with open(self.path, 'wb') as f:
+            f.truncate(self.HEADER_SIZE + self.capacity * self.record_dtype.itemsize)
+
+        header = np.memmap(self.path, dtype=self.HEADER_DTYPE, mode='r+', shape=(1,))
+        header[0] = (self.MAGIC, self.capacity, self.layout, 0, 0,
+                     self.stored_name(self.device_name).encode('utf-8'))
+        header.flush()
+        del header
+
+    @property
+    def head(self) -> int:
+        return int(self.header[0]['head'])
+
+    @property
+    def count(self) -> int:
+        return int(self.header[0]['count'])
+
+    def append(self, timestamp: float, metrics: Dict):
+        """Write one sample into the next slot, overwriting the oldest if full."""
+        head = self.head
+        count = self.count
+
+        # Keep timestamps monotonic so range lookups can binary search
+        if count:
+            timestamp = max(timestamp, float(self.records[(head - 1) % self.capacity]['timestamp']))
+
+        values = [metrics.get(column) for column in self.columns]
+        self.records[head % self.capacity] = (
+            timestamp, *[np.nan if value is None else value for value in values]
+        )
+        self.header[0]['head'] = head + 1
+        self.header[0]['count'] = min(count + 1, self.capacity)
+
+    def extend(self, records: np.ndarray):
+        """Bulk-append chronological records (structured array of record_dtype)."""
+        if len(records) == 0:
+            return
+        records = records[-self.capacity:]
+        head = self.head
+        start = head % self.capacity
+        first = min(len(records), self.capacity - start)
+        self.records[start:start + first] = records[:first]
+        self.records[:len(records) - first] = records[first:]
+        self.header[0]['head'] = head + len(records)
+        self.header[0]['count'] = min(self.count + len(records), self.capacity)
+
+    def segments(self) -> List[np.ndarray]:
+        """Return the stored samples as at most two chronological views."""
+        head = self.head
+        count = self.count
+        if count == 0:
+            return []
+
+        start = (head - count) % self.capacity
+        end = head % self.capacity
+        if start < end:
+            return [self.records[start:end]]
+        return [self.records[start:], self.records[:end]]
+
+    def window(self, since: float) -> List[np.ndarray]:
+        """Return zero-copy views of all samples with timestamp >= since."""
+        views = []
+        for segment in self.segments():
+            index = int(np.searchsorted(segment['timestamp'], since, side='left'))
+            if index < len(segment):
+                views.append(segment[index:])
+        return views
+
+    def latest(self) -> Optional[np.void]:
+        """Return the most recent sample, if any."""
+        if self.count == 0:
+            return None
+        return self.records[(self.head - 1) % self.capacity]
+
+    def drop_older_than(self, cutoff: float) -> int:
+        """Forget samples older than cutoff without touching the slots."""
+        dropped = 0
+        for segment in self.segments():
+            index = int(np.searchsorted(segment['timestamp'], cutoff, side='left'))
+            dropped += index
+            if index < len(segment):
+                break
+
+        if dropped:
+            self.header[0]['count'] = self.count - dropped
+        return dropped
+
+    def flush(self):
+        self.header.flush()
+        self.records.flush()
+
+
+class RingBufferStore(MetricsStore):
+    """Metrics store backed by one memory-mapped ring buffer per device.
+
+    Storage size is fixed by `slots`; recent-window reads are served straight
+    from the mapped files without SQL.
+    """
+
+    def __init__(self, directory: str, slots: int, retention_days: int):
+        self.directory = directory
+        self.slots = slots
+        self.retention_days = retention_days
+        self.lock = threading.Lock()
+        self.rings: Dict[str, RingBuffer] = {}
+        # Process group rings live in a subdirectory, named "<device>\t<group>"
+        self.process_directory = os.path.join(directory, 'processes')
+        self.process_rings: Dict[tuple, RingBuffer] = {}
+
+        os.makedirs(self.process_directory, exist_ok=True)
+        for name, path in self._existing_rings(directory):
+            self.rings[name] = RingBuffer(path, name, METRIC_COLUMNS, slots)
+        for name, path in self._existing_rings(self.process_directory):
+            device_name, _, group = name.partition('\t')
+            self.process_rings[(device_name, group)] = RingBuffer(path, name, PROCESS_COLUMNS, slots)
+
+        logger.info(f"Ring buffer store initialized with {len(self.rings)} devices "
+                    f"({slots} slots per device)")
+
+    @staticmethod
+    def _existing_rings(directory: str) -> List[tuple]:
+        rings = []
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith('.ring'):
+                path = os.path.join(directory, filename)
+                name = RingBuffer.read_device_name(path)
+                if name:
+                    rings.append((name, path))
+        return rings
+
+    @staticmethod
+    def _ring_path(directory: str, name: str) -> str:
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]', '_', name)
+        path = os.path.join(directory, f"{safe_name}.ring")
+        suffix = 1
+        while os.path.exists(path) and RingBuffer.read_device_name(path) != RingBuffer.stored_name(name):
+            path = os.path.join(directory, f"{safe_name}-{suffix}.ring")
+            suffix += 1
+        return path
+
+    def _get_ring(self, device_name: str) -> RingBuffer:
+        ring = self.rings.get(device_name)
+        if ring is None:
+            # A name too long for the header was loaded at startup under its stored form
+            self.rings.pop(RingBuffer.stored_name(device_name), None)
+            ring = RingBuffer(self._ring_path(self.directory, device_name),
+                              device_name, METRIC_COLUMNS, self.slots)
+            self.rings[device_name] = ring
+        return ring
+
+    def _get_process_ring(self, device_name: str, group: str) -> RingBuffer:
+        ring = self.process_rings.get((device_name, group))
+        if ring is None:
+            name = f"{device_name}\t{group}"
+            stored_device, _, stored_group = RingBuffer.stored_name(name).partition('\t')
+            self.process_rings.pop((stored_device, stored_group), None)
+            ring = RingBuffer(self._ring_path(self.process_directory, name),
+                              name, PROCESS_COLUMNS, self.slots)
+            self.process_rings[(device_name, group)] = ring
+        return ring
+
+    def insert_metrics(self, device_name: str, metrics: Dict, timestamp: float = None):
+        with self.lock:
+            self._get_ring(device_name).append(timestamp or time.time(), metrics)
+
+    def insert_process_metrics(self, device_name: str, processes: Dict[str, Dict], timestamp: float = None):
+        timestamp = timestamp or time.time()
+        with self.lock:
+            for group, values in processes.items():
+                self._get_process_ring(device_name, group).append(timestamp, values)
+
+    def get_process_columns(self, device_name: str, hours: int = 24) -> Dict[str, Dict[str, np.ndarray]]:
+        since = time.time() - hours * 3600
+        with self.lock:
+            windows = {group: ring.window(since)
+                       for (name, group), ring in self.process_rings.items() if name == device_name}
+
+        results = {}
+        for group, views in sorted(windows.items()):
+            if not views:
+                continue
+            records = views[0] if len(views) == 1 else np.concatenate(views)
+            columns = {'timestamp': records['timestamp']}
+            for column in PROCESS_COLUMNS:
+                columns[column] = records[column]
+            results[group] = columns
+        return results
+
+    def load_records(self, device_name: str, records: np.ndarray, process_name: str = None):
+        """Bulk-load chronological records, e.g. generated or migrated history."""
+        with self.lock:
+            if process_name is None:
+                ring = self._get_ring(device_name)
+            else:
+                ring = self._get_process_ring(device_name, process_name)
+            ring.extend(records)
+            ring.flush()
+
+    def get_window(self, device_name: str, hours: float) -> List[np.ndarray]:
+        """Return zero-copy record views for a device's recent window."""
+        since = time.time() - hours * 3600
+        with self.lock:
+            ring = self.rings.get(device_name)
+            return ring.window(since) if ring else []
+
+    def get_metric_columns(self, device_name: str = None, hours: int = 24) -> Dict[str, Dict[str, np.ndarray]]:
+        device_names = [device_name] if device_name else sorted(self.rings)
+        results = {}
+        for name in device_names:
+            views = self.get_window(name, hours)
+            if not views:
+                continue
+            # Only a window that wraps around the end of the ring needs a copy
+            records = views[0] if len(views) == 1 else np.concatenate(views)
+            columns = {'timestamp': records['timestamp']}
+            for column in METRIC_COLUMNS:
+                columns[column] = records[column]
+            results[name] = columns
+        return results
+
+    def get_latest_metrics(self) -> Dict[str, Dict]:
+        results = {}
+        with self.lock:
+            for device_name, ring in self.rings.items():
+                record = ring.latest()
+                if record is None:
+                    continue
+                row = {
+                    'timestamp': format_timestamp(
+                        datetime.fromtimestamp(float(record['timestamp']), timezone.utc))
+                }
+                for column in METRIC_COLUMNS:
+                    value = float(record[column])
+                    row[column] = None if value != value else round(value, 4)
+                results[device_name] = row
+        return results
+
+    def storage_size_bytes(self) -> int:
+        # Ring files are preallocated, so their size is known without touching disk
+        record_size = np.dtype([('timestamp', '<f8')] + [(c, '<f4') for c in METRIC_COLUMNS]).itemsize
+        process_record_size = np.dtype([('timestamp', '<f8')] + [(c, '<f4') for c in PROCESS_COLUMNS]).itemsize
+        return (len(self.rings) * (RingBuffer.HEADER_SIZE + self.slots * record_size)
+                + len(self.process_rings) * (RingBuffer.HEADER_SIZE + self.slots * process_record_size))
+
+    def cleanup_old_data(self):
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=self.retention_days)).timestamp()
+        deleted_rows = 0
+        with self.lock:
+            for ring in list(self.rings.values()) + list(self.process_rings.values()):
+                deleted_rows += ring.drop_older_than(cutoff)
+                ring.flush()
+
+        if deleted_rows > 0:
+            logger.info(f"Cleaned up {deleted_rows} old metric records")
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Home LLM Dashboard - Idle Swap Scheduler
+Runs the configured teardown script (e.g. switch to Ollama only) once the watched
+devices and the inference gateway have been idle for long enough, and the startup
+script again when requests for the big models arrive.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from gateway import InferenceGateway
+from telemetry import Counter
+
+logger = logging.getLogger(__name__)
+
+
+class SwapScheduler:
+    """Idle/active policy with hysteresis, a cooldown and a manual hold.
+
+    A device counts as busy once its GPU goes above `gpu_busy_percent` or an
+    inference server on it has a busy slot, and stays busy until the GPU drops
+    below `gpu_idle_percent`, so utilisation hovering around one threshold does
+    not flap. After `idle_minutes` without busy devices or gateway traffic the
+    `idle_script` runs. While idle, a gateway request for one of `wake_models`
+    runs `active_script`; the gateway queues that request until the model is up.
+    The mode is not persisted, so waiting requests for a wake model that no ready
+    backend serves also run it in active mode (after a restart while torn down).
+    Scripts in `startup_scripts` run by hand also put the policy back in active mode.
+    No two swaps happen within `cooldown_minutes` of each other.
+    """
+
+    def __init__(self, config_path: str, latest_metrics: Callable[[str], Optional[Dict]],
+                 gateway: InferenceGateway, run_script: Callable[[str], bool],
+                 notify: Callable[[Dict], None] = None):
+        self.config_path = config_path
+        self.latest_metrics = latest_metrics
+        self.gateway = gateway
+        self.run_script = run_script
+        self.notify = notify
+        self.policy: Dict = {}
+        self.mode = 'active'
+        self.busy_devices: Dict[str, bool] = {}
+        self.last_activity = time.time()
+        self.last_switch = 0.0
+        self.hold_until: Optional[float] = None
+        self.events = deque(maxlen=100)
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.switches = Counter('hld_swap_switches', 'Model swaps run by the scheduler or by hand',
+                                ('script', 'reason'))
+        self.reload()
+        gateway.expected.append(self.wakes)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.policy.get('idle_script'))
+
+    def reload(self) -> bool:
+        if not os.path.exists(self.config_path):
+            logger.info(f"Swap policy {self.config_path} not found, idle swapping disabled")
+            return False
+        try:
+            with open(self.config_path) as f:
+                self.policy = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Error loading swap policy {self.config_path}: {e}")
+            return False
+        logger.info(f"Loaded swap policy from {self.config_path}")
+        return True
+
+    def wakes(self, model: str) -> bool:
+        """Whether a request for `model` would run the active script."""
+        return bool(self.policy.get('active_script')) and model in self.policy.get('wake_models', [])
+
+    def start(self):
+        if self.thread is None and self.enabled:
+            self.thread = threading.Thread(target=self._loop, name='swap-scheduler')
+            self.thread.daemon = True
+            self.thread.start()
+
+    def _loop(self):
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Error in swap scheduler: {e}")
+            time.sleep(self.policy.get('check_interval', 10))
+
+    def device_busy(self, device_name: str) -> bool:
+        """Busy state of a device with hysteresis between the GPU thresholds."""
+        metrics = self.latest_metrics(device_name) or {}
+        was_busy = self.busy_devices.get(device_name, False)
+        gpu = metrics.get('gpu_usage')
+        slots_busy = any((server.get('slots_busy') or 0) > 0
+                         for server in (metrics.get('inference_servers') or {}).values())
+        if slots_busy:
+            busy = True
+        elif gpu is None:
+            busy = False
+        elif was_busy:
+            busy = gpu >= self.policy.get('gpu_idle_percent', 10)
+        else:
+            busy = gpu > self.policy.get('gpu_busy_percent', 40)
+        self.busy_devices[device_name] = busy
+        return busy
+
+    def check(self, now: float = None):
+        """Evaluate the policy once and start a swap if one is due."""
+        now = now or time.time()
+        busy = [device for device in self.policy.get('watch_devices', []) if self.device_busy(device)]
+        gateway_active = self.gateway.active_requests() > 0
+        if busy or gateway_active:
+            self.last_activity = now
+        if self.gateway.last_request_at:
+            self.last_activity = max(self.last_activity, self.gateway.last_request_at)
+
+        if self.hold_until is not None:
+            if now < self.hold_until:
+                return
+            self.hold_until = None
+            self._event('hold_expired', None, 'Manual hold expired, automatic swapping resumed')
+        if now - self.last_switch < self.policy.get('cooldown_minutes', 10) * 60:
+            return
+
+        if self.mode == 'active':
+            idle_for = now - self.last_activity
+            if idle_for >= self.policy.get('idle_minutes', 20) * 60:
+                self._switch('idle', self.policy['idle_script'], now,
+                             f"Idle for {idle_for / 60:.0f} minutes")
+                return
+        if self.policy.get('active_script'):
+            waiting = [model for model, count in self.gateway.waiting.items()
+                       if count and self.wakes(model) and (self.mode == 'idle' or not self.gateway.available(model))]
+            if waiting:
+                self._switch('active', self.policy['active_script'], now,
+                             f"Requests waiting for {', '.join(sorted(waiting))}")
+
+    def _switch(self, mode: str, script_id: str, now: float, reason: str):
+        if not self.run_script(script_id):
+            logger.warning(f"Swap to {mode} deferred: {script_id} could not start")
+            return
+        with self.lock:
+            self.mode = mode
+            self.last_switch = now
+            self.last_activity = now
+        self.switches.inc(1, script_id, 'auto')
+        self._event(mode, script_id, reason)
+
+    def record_manual(self, script_id: str, reason: str = 'manual',
+                      message: str = 'Started from the control panel'):
+        """Account for a script started outside the scheduler (by hand or by the preloader)."""
+        with self.lock:
+            if script_id == self.policy.get('idle_script'):
+                self.mode = 'idle'
+            elif script_id in (self.policy.get('active_script'), *self.policy.get('startup_scripts', [])):
+                self.mode = 'active'
+            else:
+                return
+            self.last_switch = self.last_activity = time.time()
+        self.switches.inc(1, script_id, reason)
+        self._event(self.mode, script_id, message)
+
+    def hold(self, minutes: Optional[float]):
+        """Pause automatic swaps for `minutes` (indefinitely if None); 0 resumes them."""
+        if minutes == 0:
+            self.hold_until = None
+            self._event('hold_cleared', None, 'Automatic swapping resumed')
+            return
+        self.hold_until = time.time() + minutes * 60 if minutes else float('inf')
+        self._event('hold', None, f"Automatic swapping paused {f'for {minutes:g} minutes' if minutes else 'until resumed'}")
+
+    def _event(self, kind: str, script_id: Optional[str], message: str):
+        event = {'timestamp': time.time(), 'event': kind, 'script': script_id, 'message': message}
+        self.events.append(event)
+        logger.info(f"Swap scheduler: {message}" + (f" ({script_id})" if script_id else ''))
+        if self.notify is not None:
+            self.notify(event)
+
+    def status(self) -> Dict:
+        now = time.time()
+        cooldown = self.policy.get('cooldown_minutes', 10) * 60
+        return {
+            'enabled': self.enabled,
+            'mode': self.mode,
+            'policy': self.policy,
+            'idle_seconds': round(now - self.last_activity, 1),
+            'busy_devices': sorted(device for device, busy in self.busy_devices.items() if busy),
+            'cooldown_remaining': max(0.0, round(self.last_switch + cooldown - now, 1)),
+            'hold_until': None if self.hold_until in (None, float('inf')) else self.hold_until,
+            'held': self.hold_until is not None,
+            'events': list(self.events)
+        }
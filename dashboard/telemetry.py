@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Home LLM Dashboard - Telemetry
+In-memory counters, histograms and latest device state, rendered in the
+OpenMetrics text format for the /metrics endpoint.
+"""
+
+import bisect
+import functools
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from storage import parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# Latency buckets in seconds, from 100 microseconds up to a few seconds
+LATENCY_BUCKETS = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+
+# Gauge name, unit and help text for each device metric column
+DEVICE_GAUGES = {
+    'cpu_usage': ('hld_device_cpu_usage', 'percent', 'CPU usage'),
+    'ram_usage': ('hld_device_ram_used', 'gigabytes', 'RAM in use'),
+    'ram_total': ('hld_device_ram_total', 'gigabytes', 'Total RAM'),
+    'gpu_usage': ('hld_device_gpu_usage', 'percent', 'GPU usage'),
+    'vram_usage': ('hld_device_vram_used', 'gigabytes', 'VRAM in use'),
+    'vram_total': ('hld_device_vram_total', 'gigabytes', 'Total VRAM'),
+    'network_tx': ('hld_device_network_tx', 'megabits_per_second', 'Network transmit rate'),
+    'network_rx': ('hld_device_network_rx', 'megabits_per_second', 'Network receive rate'),
+    'disk_read': ('hld_device_disk_read', 'megabytes_per_second', 'Disk read throughput'),
+    'disk_write': ('hld_device_disk_write', 'megabytes_per_second', 'Disk write throughput'),
+    'power_total': ('hld_device_power', 'watts', 'Power draw reported by the agent'),
+    'power_cpu': ('hld_device_cpu_power', 'watts', 'CPU power draw'),
+    'power_gpu': ('hld_device_gpu_power', 'watts', 'GPU power draw'),
+    'power_ane': ('hld_device_ane_power', 'watts', 'Apple Neural Engine power draw'),
+    'collection_time': ('hld_agent_collection', 'seconds', 'Wall time the agent spent collecting the last sample'),
+    'collection_cpu_time': ('hld_agent_collection_cpu', 'seconds', 'CPU time the agent spent collecting the last sample')
+}
+
+# Gauges for each tracked process group column
+PROCESS_GAUGES = {
+    'cpu_percent': ('hld_process_cpu_usage', 'percent', 'CPU usage of the process group'),
+    'rss': ('hld_process_rss', 'gigabytes', 'Resident memory of the process group'),
+    'threads': ('hld_process_threads', '', 'Threads in the process group'),
+    'connections': ('hld_process_connections', '', 'Open network connections of the process group'),
+    'count': ('hld_process_count', '', 'Running processes matching the group'),
+    'disk_read': ('hld_process_disk_read', 'megabytes_per_second', 'Disk read throughput of the process group')
+}
+
+# Nested metrics reported as {name: {field: value}}, mapped to a label and gauges per field
+GROUP_GAUGES = {
+    'processes': ('process', PROCESS_GAUGES),
+    'collectors': ('collector', {
+        'cost': ('hld_agent_collector_cost', 'seconds', 'Average run time of the agent collector'),
+        'interval': ('hld_agent_collector_interval', 'seconds', 'Minimum time between collector runs'),
+        'errors': ('hld_agent_collector_errors', '', 'Collector runs that raised an error'),
+        'timeouts': ('hld_agent_collector_timeouts', '', 'Collector runs that exceeded their timeout')
+    }),
+    'temperatures': ('sensor', {
+        'current': ('hld_device_temperature', 'celsius', 'Hottest reading of the sensor')
+    }),
+    'inference_servers': ('endpoint', {
+        'up': ('hld_inference_up', '', 'Whether the inference server answered its health check'),
+        'loading': ('hld_inference_loading', '', 'Whether the inference server is loading a model'),
+        'latency': ('hld_inference_health_latency', 'seconds', 'Health check round trip time'),
+        'slots_total': ('hld_inference_slots', '', 'Inference slots configured on the server'),
+        'slots_busy': ('hld_inference_slots_busy', '', 'Inference slots currently processing'),
+        'models_loaded': ('hld_inference_models_loaded', '', 'Models loaded by the server')
+    }),
+    'model_files': ('file', {
+        'resident': ('hld_model_file_resident', 'ratio', 'Fraction of the model file in the page cache'),
+        'size': ('hld_model_file_size', 'gigabytes', 'Size of the model file'),
+        'prewarming': ('hld_model_file_prewarming', '', 'Whether the agent is reading the file into memory')
+    })
+}
+
+
+def gauge_name(name: str, unit: str) -> str:
+    return f"{name}_{unit}" if unit else name
+
+
+def escape_label(value: str) -> str:
+    """Escape a label value for the OpenMetrics text format."""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{escape_label(str(value))}"' for key, value in labels.items()) + '}'
+
+
+def format_value(value: float) -> str:
+    if value != value:
+        return 'NaN'
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def family_header(name: str, metric_type: str, help_text: str, unit: str = '') -> str:
+    header = f"# TYPE {name} {metric_type}\n"
+    if unit:
+        header += f"# UNIT {name} {unit}\n"
+    return header + f"# HELP {name} {help_text}\n"
+
+
+class Counter:
+    """Monotonic counter, optionally split by label values."""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.values: Dict[Tuple, float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *label_values):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def total(self) -> float:
+        return sum(self.values.values())
+
+    def render(self) -> str:
+        lines = [family_header(self.name, 'counter', self.help_text)]
+        for label_values, value in list(self.values.items()):
+            labels = format_labels(dict(zip(self.label_names, label_values)))
+            lines.append(f"{self.name}_total{labels} {format_value(value)}\n")
+        return ''.join(lines)
+
+
+class Histogram:
+    """Fixed-bucket histogram, optionally split by label values."""
+
+    def __init__(self, name: str, help_text: str, buckets: List[float] = None,
+                 label_names: Tuple[str, ...] = (), unit: str = 'seconds'):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = sorted(buckets or LATENCY_BUCKETS)
+        self.label_names = label_names
+        self.unit = unit
+        self.series: Dict[Tuple, Dict] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = {
+                    'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0, 'max': 0.0
+                }
+            series['counts'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+            series['max'] = max(series['max'], value)
+
+    def quantile(self, q: float, *label_values) -> Optional[float]:
+        """Estimate a quantile from bucket counts (upper bound of the matching bucket)."""
+        series = self.series.get(label_values)
+        if not series or not series['count']:
+            return None
+        target = q * series['count']
+        cumulative = 0
+        for index, count in enumerate(series['counts']):
+            cumulative += count
+            if cumulative >= target:
+                return self.buckets[index] if index < len(self.buckets) else series['max']
+        return series['max']
+
+    def summary(self) -> Dict[str, Dict]:
+        """Summarise each series as count, mean, estimated quantiles and max."""
+        result = {}
+        for label_values, series in self.snapshot().items():
+            key = ','.join(f"{name}={value}" for name, value in zip(self.label_names, label_values)) or 'all'
+            result[key] = {
+                'count': series['count'],
+                'mean': series['sum'] / series['count'] if series['count'] else None,
+                'p50': self.quantile(0.5, *label_values),
+                'p95': self.quantile(0.95, *label_values),
+                'p99': self.quantile(0.99, *label_values),
+                'max': series['max']
+            }
+        return result
+
+    def snapshot(self) -> Dict[Tuple, Dict]:
+        with self.lock:
+            return {key: {'counts': list(series['counts']), 'sum': series['sum'],
+                          'count': series['count'], 'max': series['max']}
+                    for key, series in self.series.items()}
+
+    def render(self) -> str:
+        lines = [family_header(self.name, 'histogram', self.help_text, self.unit)]
+        for label_values, series in self.snapshot().items():
+            labels = dict(zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + [float('inf')], series['counts']):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(f"{self.name}_bucket{format_labels({**labels, 'le': le})} {cumulative}\n")
+            lines.append(f"{self.name}_count{format_labels(labels)} {series['count']}\n")
+            lines.append(f"{self.name}_sum{format_labels(labels)} {format_value(series['sum'])}\n")
+        return ''.join(lines)
+
+
+class RateMeter:
+    """Events per second over a sliding window of one-second buckets."""
+
+    def __init__(self, window_seconds: int = 60):
+        self.window_seconds = window_seconds
+        self.buckets = [0] * window_seconds
+        self.bucket_times = [0] * window_seconds
+        self.lock = threading.Lock()
+
+    def mark(self, count: int = 1):
+        second = int(time.time())
+        index = second % self.window_seconds
+        with self.lock:
+            if self.bucket_times[index] != second:
+                self.bucket_times[index] = second
+                self.buckets[index] = 0
+            self.buckets[index] += count
+
+    def rate(self) -> float:
+        now = int(time.time())
+        total = sum(count for count, second in zip(self.buckets, self.bucket_times)
+                    if now - second < self.window_seconds)
+        return total / self.window_seconds
+
+
+class FleetState:
+    """Latest metrics per device, kept in memory for cheap exposition.
+
+    Gauge lines are rendered once when a sample arrives so a scrape only has
+    to join pre-built strings.
+    """
+
+    def __init__(self):
+        self.latest: Dict[str, Dict] = {}
+        self.last_seen: Dict[str, float] = {}
+        self.rendered: Dict[str, Dict[str, str]] = {column: {} for column in DEVICE_GAUGES}
+        self.rendered_groups: Dict[tuple, Dict[str, str]] = {
+            (key, field): {} for key, (_, gauges) in GROUP_GAUGES.items() for field in gauges
+        }
+        self.lock = threading.Lock()
+
+    def update(self, device_name: str, metrics: Dict, timestamp: float):
+        labels = format_labels({'device': device_name})
+        lines = {}
+        for column, (name, unit, _) in DEVICE_GAUGES.items():
+            value = metrics.get(column)
+            lines[column] = f"{name}_{unit}{labels} {format_value(value)}\n" if value is not None else ''
+
+        group_lines = {family: [] for family in self.rendered_groups}
+        for key, (label, gauges) in GROUP_GAUGES.items():
+            for member, values in (metrics.get(key) or {}).items():
+                member_labels = format_labels({'device': device_name, label: member})
+                for field, (name, unit, _) in gauges.items():
+                    value = values.get(field)
+                    if value is not None:
+                        group_lines[(key, field)].append(
+                            f"{gauge_name(name, unit)}{member_labels} {format_value(value)}\n")
+
+        with self.lock:
+            self.latest[device_name] = metrics
+            self.last_seen[device_name] = timestamp
+            for column, line in lines.items():
+                self.rendered[column][device_name] = line
+            for family, family_lines in group_lines.items():
+                self.rendered_groups[family][device_name] = ''.join(family_lines)
+
+    def seed(self, latest_metrics: Dict[str, Dict]):
+        """Seed state from the stored latest samples when the dashboard starts."""
+        for device_name, metrics in latest_metrics.items():
+            timestamp = parse_timestamp(metrics.get('timestamp'))
+            if timestamp is not None:
+                self.update(device_name, metrics, timestamp)
+
+    def get(self, device_name: str) -> Optional[Dict]:
+        return self.latest.get(device_name)
+
+    def devices(self) -> List[str]:
+        return list(self.latest)
+
+    def render(self, offline_threshold: float) -> str:
+        now = time.time()
+        with self.lock:
+            parts = []
+            for column, (name, unit, help_text) in DEVICE_GAUGES.items():
+                parts.append(family_header(f"{name}_{unit}", 'gauge', help_text, unit))
+                parts.extend(self.rendered[column].values())
+            for key, (_, gauges) in GROUP_GAUGES.items():
+                for field, (name, unit, help_text) in gauges.items():
+                    parts.append(family_header(gauge_name(name, unit), 'gauge', help_text, unit))
+                    parts.extend(self.rendered_groups[(key, field)].values())
+
+            up_lines = [family_header('hld_device_up', 'gauge',
+                                      'Whether the device reported within the offline threshold')]
+            seen_lines = [family_header('hld_device_last_seen_timestamp_seconds', 'gauge',
+                                        'Time the device last reported', 'seconds')]
+            for device_name, last_seen in self.last_seen.items():
+                labels = format_labels({'device': device_name})
+                up_lines.append(f"hld_device_up{labels} {int(now - last_seen <= offline_threshold)}\n")
+                seen_lines.append(f"hld_device_last_seen_timestamp_seconds{labels} {format_value(last_seen)}\n")
+
+        return ''.join(parts + up_lines + seen_lines)
+
+
+@contextmanager
+def timed(histogram: Histogram, *label_values):
+    """Record the elapsed time of a block into a histogram."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started, *label_values)
+
+
+def instrument_methods(target, histogram: Histogram, method_names: Iterable[str]):
+    """Wrap methods of an object so each call is timed under its method name."""
+    for name in method_names:
+        method = getattr(target, name)
+
+        @functools.wraps(method)
+        def wrapper(*args, _method=method, _name=name, **kwargs):
+            started = time.perf_counter()
+            try:
+                return _method(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started, _name)
+
+        setattr(target, name, wrapper)
+    return target
+
+
+def render_gauge(name: str, help_text: str, value: float, unit: str = '') -> str:
+    full_name = gauge_name(name, unit)
+    return family_header(full_name, 'gauge', help_text, unit) + f"{full_name} {format_value(value)}\n"
+
+
+def render_openmetrics(sections: Iterable[str]) -> str:
+    """Join rendered metric families and terminate the exposition."""
+    return ''.join(sections) + '# EOF\n'
@@ -0,0 +1,8 @@
+"""Make the dashboard and agent modules importable the way their scripts import them."""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ('agent', 'dashboard'):
+    sys.path.insert(0, os.path.join(ROOT, directory))
@@ -0,0 +1,110 @@
+import json
+import zlib
+
+import pytest
+
+from agent import StreamTransport
+from agent_stream import AgentStreamSession
+
+
+class FakeDashboard:
+    """Stands in for the socket.io client, handing frames to an AgentStreamSession as the dashboard does."""
+
+    def __init__(self):
+        self.connected = True
+        self.transport = None
+        self.session = None
+        self.hellos = []
+        self.frames = []
+        self.decoded = []
+        self.inflate = None
+
+    def call(self, event, data, namespace=None, timeout=None):
+        assert event == 'hello'
+        self.hellos.append(data)
+        self.session = AgentStreamSession(data)
+        self.inflate = zlib.decompressobj()
+        return self.session.handshake_reply()
+
+    def emit(self, event, payload, namespace=None):
+        assert event == 'sample'
+        # Keep a readable copy of each frame to check what was sent
+        raw = self.inflate.decompress(payload) if isinstance(payload, bytes) else json.dumps(payload)
+        self.frames.append(json.loads(raw))
+        metrics = self.session.decode(payload) if self.session is not None else None
+        self.decoded.append(metrics)
+        if metrics is None:
+            self.session = None
+            self.transport._on_resync({'reason': 'handshake required'})
+
+
+@pytest.fixture(params=[True, False], ids=['zlib', 'plain'])
+def stream(request):
+    dashboard = FakeDashboard()
+    transport = StreamTransport('http://dashboard', 'mac', compression=request.param, lazy=True)
+    transport.client = dashboard
+    dashboard.transport = transport
+    return transport, dashboard
+
+
+def test_round_trip_sends_only_changed_fields(stream):
+    transport, dashboard = stream
+    sample = {'cpu_usage': 12.5, 'gpu_usage': 40.0, 'ram_total': 64.0, 'ram_usage': 20.25}
+
+    assert transport.send(sample)
+    assert dashboard.hellos[0]['static'] == {'ram_total': 64.0}
+    assert dashboard.session.compression == ('zlib' if transport.compression else 'none')
+    assert dashboard.decoded[-1] == sample
+
+    assert transport.send({**sample, 'cpu_usage': 13.0})
+    fields = dashboard.hellos[0]['fields']
+    assert dashboard.frames[-1] == [2, fields.index('cpu_usage'), 13.0]
+    assert dashboard.decoded[-1] == {**sample, 'cpu_usage': 13.0}
+
+    # Floats are compacted to 3 decimals, so tiny changes are not sent at all
+    assert transport.send({**sample, 'cpu_usage': 13.0001})
+    assert dashboard.frames[-1] == [3]
+    assert len(dashboard.hellos) == 1
+
+
+def test_missing_field_becomes_none(stream):
+    transport, dashboard = stream
+    transport.send({'cpu_usage': 10.0, 'gpu_usage': 30.0})
+    transport.send({'cpu_usage': 10.0})
+    assert dashboard.decoded[-1] == {'cpu_usage': 10.0, 'gpu_usage': None}
+    transport.send({'cpu_usage': 10.0, 'gpu_usage': 31.0})
+    assert dashboard.decoded[-1] == {'cpu_usage': 10.0, 'gpu_usage': 31.0}
+    assert len(dashboard.hellos) == 1
+
+
+def test_new_field_forces_a_new_handshake(stream):
+    transport, dashboard = stream
+    transport.send({'cpu_usage': 10.0})
+    transport.send({'cpu_usage': 11.0, 'power_watts': 95.0})
+    assert len(dashboard.hellos) == 2
+    assert dashboard.hellos[1]['fields'] == ['cpu_usage', 'power_watts']
+    assert dashboard.frames[-1][0] == 1
+    assert dashboard.decoded[-1] == {'cpu_usage': 11.0, 'power_watts': 95.0}
+
+
+def test_resync_after_the_dashboard_loses_the_session(stream):
+    transport, dashboard = stream
+    transport.send({'cpu_usage': 10.0, 'ram_total': 64.0})
+    transport.send({'cpu_usage': 11.0, 'ram_total': 64.0})
+
+    # A restarted dashboard has no session: the frame is dropped and a resync requested
+    dashboard.session = None
+    transport.send({'cpu_usage': 12.0, 'ram_total': 64.0})
+    assert dashboard.decoded[-1] is None
+    assert transport.needs_handshake
+
+    transport.send({'cpu_usage': 13.0, 'ram_total': 64.0})
+    assert len(dashboard.hellos) == 2
+    assert dashboard.decoded[-1] == {'cpu_usage': 13.0, 'ram_total': 64.0}
+
+
+def test_session_rejects_a_gap_in_the_sequence():
+    session = AgentStreamSession({'device_name': 'mac', 'fields': ['cpu_usage'], 'compression': []})
+    assert session.decode([1, 0, 5.0]) == {'cpu_usage': 5.0}
+    assert session.decode([3, 0, 6.0]) is None
+    assert session.last_seq == 1
@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+from alerting import AlertEngine
+
+RULES = [
+    {'id': 'device_offline', 'type': 'absence', 'severity': 'critical'},
+    {'id': 'vram_full', 'type': 'threshold', 'metric': 'vram_usage', 'ratio_of': 'vram_total',
+     'op': '>', 'value': 0.9, 'for_samples': 2, 'severity': 'critical'},
+    {'id': 'ram_surge', 'type': 'rate_of_change', 'metric': 'ram_usage', 'value': 0.5, 'window_seconds': 30,
+     'devices': ['mac']},
+    {'id': 'cpu_anomaly', 'type': 'zscore', 'metric': 'cpu_usage', 'value': 4.0, 'window': 50, 'min_samples': 20}
+]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    path = tmp_path / 'alert_rules.json'
+    path.write_text(json.dumps({'rules': RULES}))
+    alerts = []
+    engine = AlertEngine(str(path), 60, [alerts.append])
+    return engine, alerts
+
+
+def transitions(alerts, rule):
+    return [(alert['device_name'], alert['state']) for alert in alerts if alert['rule'] == rule]
+
+
+def test_threshold_fires_after_for_samples_and_resolves(engine):
+    engine, alerts = engine
+    for index, used in enumerate([7.0, 7.5, 7.6, 7.8, 6.0, 7.5]):
+        engine.observe('pc', {'vram_usage': used, 'vram_total': 8.0}, 1000.0 + index)
+
+    assert transitions(alerts, 'vram_full') == [('pc', 'firing'), ('pc', 'resolved')]
+    firing = alerts[0]
+    assert firing['severity'] == 'critical'
+    assert firing['value'] == pytest.approx(7.6 / 8)
+    assert engine.get_alerts()['active'] == []
+
+    # A sample without the data neither resolves nor resets the breach count
+    engine.observe('pc', {'vram_usage': 7.9}, 1010.0)
+    engine.observe('pc', {'vram_usage': 7.9, 'vram_total': 8.0}, 1011.0)
+    assert transitions(alerts, 'vram_full')[-1] == ('pc', 'firing')
+    assert len(engine.get_alerts()['active']) == 1
+
+
+def test_rate_of_change_only_applies_to_listed_devices(engine):
+    engine, alerts = engine
+    for device in ('mac', 'pc'):
+        engine.observe(device, {'ram_usage': 10.0}, 1000.0)
+        engine.observe(device, {'ram_usage': 30.0}, 1010.0)
+
+    assert transitions(alerts, 'ram_surge') == [('mac', 'firing')]
+    assert alerts[0]['value'] == pytest.approx(2.0)
+
+    # The surge leaves the window once the memory stops moving
+    for timestamp in (1020.0, 1030.0, 1040.0, 1050.0):
+        engine.observe('mac', {'ram_usage': 30.0}, timestamp)
+    assert transitions(alerts, 'ram_surge') == [('mac', 'firing'), ('mac', 'resolved')]
+
+
+def test_zscore_waits_for_min_samples_then_flags_spikes(engine):
+    engine, alerts = engine
+    for index in range(30):
+        engine.observe('pc', {'cpu_usage': 10.0 + index % 3}, 1000.0 + index)
+    assert transitions(alerts, 'cpu_anomaly') == []
+
+    engine.observe('pc', {'cpu_usage': 99.0}, 1100.0)
+    assert transitions(alerts, 'cpu_anomaly') == [('pc', 'firing')]
+    engine.observe('pc', {'cpu_usage': 11.0}, 1101.0)
+    assert transitions(alerts, 'cpu_anomaly') == [('pc', 'firing'), ('pc', 'resolved')]
+
+
+def test_absence_fires_and_resolves_when_the_device_returns(engine):
+    engine, alerts = engine
+    engine.observe('mac', {}, 1000.0)
+    engine.observe('pc', {}, 1050.0)
+
+    engine.check_absence(1055.0)
+    assert transitions(alerts, 'device_offline') == []
+    engine.check_absence(1070.0)
+    assert transitions(alerts, 'device_offline') == [('mac', 'firing')]
+    engine.check_absence(1080.0)
+    assert len(transitions(alerts, 'device_offline')) == 1
+
+    engine.observe('mac', {}, 1090.0)
+    assert transitions(alerts, 'device_offline') == [('mac', 'firing'), ('mac', 'resolved')]
+    assert engine.get_alerts()['history'][0]['state'] == 'resolved'
+
+
+def test_failing_sinks_do_not_stop_the_others(tmp_path):
+    path = tmp_path / 'alert_rules.json'
+    path.write_text(json.dumps({'rules': RULES[:1]}))
+    delivered = []
+
+    def broken(alert):
+        raise RuntimeError('sink down')
+
+    engine = AlertEngine(str(path), 60, [broken, delivered.append])
+    engine.observe('mac', {}, 1000.0)
+    engine.check_absence(1100.0)
+    assert [alert['state'] for alert in delivered] == ['firing']
@@ -0,0 +1,60 @@
+import numpy as np
+
+from aggregation import carry_forward, cluster_aggregate
+
+
+def device(timestamps, **values) -> dict:
+    columns = {'timestamp': np.asarray(timestamps, dtype=np.float64)}
+    for column in ('vram_usage', 'vram_total', 'ram_usage', 'ram_total', 'network_tx', 'network_rx', 'gpu_usage'):
+        columns[column] = np.full(len(timestamps), values.get(column, np.nan))
+    return columns
+
+
+def fleet() -> dict:
+    return {
+        # A GPU box sampling every 30 seconds
+        'gpu': device(np.arange(0, 360, 30), vram_usage=10, vram_total=24, ram_usage=4, ram_total=32,
+                      network_tx=1, network_rx=2, gpu_usage=50),
+        # A unified memory Mac sampling every 2 minutes, so it misses every other bucket
+        'mac': device(np.arange(0, 360, 120), ram_usage=20, ram_total=64, network_tx=3, network_rx=4,
+                      gpu_usage=80)
+    }
+
+
+def test_slow_devices_carry_forward_within_the_gap():
+    result = cluster_aggregate(fleet(), 60, 90)
+
+    assert result['timestamp'].tolist() == [0, 60, 120, 180, 240, 300]
+    assert result['vram_used'].tolist() == [30] * 6
+    assert result['vram_free'].tolist() == [(24 - 10) + (64 - 20)] * 6
+    assert result['network_tx'].tolist() == [4] * 6
+    assert result['network_rx'].tolist() == [6] * 6
+    assert result['gpu_usage_max'].tolist() == [80] * 6
+    assert result['devices'].tolist() == [2] * 6
+
+
+def test_devices_drop_out_after_the_gap():
+    result = cluster_aggregate(fleet(), 60, 30)
+
+    assert result['vram_used'].tolist() == [30, 10, 30, 10, 30, 10]
+    assert result['gpu_usage_max'].tolist() == [80, 50, 80, 50, 80, 50]
+    assert result['devices'].tolist() == [2, 1, 2, 1, 2, 1]
+
+
+def test_empty_groups_give_empty_columns():
+    result = cluster_aggregate({'gpu': device([])}, 60, 90)
+    assert len(result['timestamp']) == 0
+    assert len(result['devices']) == 0
+
+
+def test_carry_forward_respects_max_gap():
+    times = np.array([0.0, 60.0, 120.0, 180.0])
+    matrix = np.array([[np.nan, 1.0], [2.0, np.nan], [np.nan, np.nan], [np.nan, np.nan]])
+
+    filled = carry_forward(matrix, times, 60)
+
+    assert np.isnan(filled[0, 0])
+    assert filled[1:3, 0].tolist() == [2.0, 2.0]
+    assert np.isnan(filled[3, 0])
+    assert filled[1, 1] == 1.0
+    assert np.isnan(filled[2:, 1]).all()
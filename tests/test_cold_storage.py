@@ -0,0 +1,32 @@
+import numpy as np
+
+from cold_storage import decode_block, encode_block
+
+
+def test_block_round_trip_is_bit_exact():
+    rng = np.random.default_rng(7)
+    count = 720
+    timestamps = 1700000000 + np.cumsum(rng.integers(4000, 6000, count)) / 1000.0
+    special = np.array([np.nan, np.inf, -np.inf, -0.0, 0.0, 5e-324, np.finfo(np.float64).max])
+    columns = {
+        'timestamp': timestamps,
+        'cpu_usage': rng.uniform(0, 100, count),
+        'vram_used': np.full(count, 8.5),
+        'special': np.resize(special, count),
+        'missing': np.full(count, np.nan)
+    }
+    names = ['cpu_usage', 'vram_used', 'special', 'missing']
+
+    decoded = decode_block(encode_block(columns, names), names)
+
+    assert np.array_equal(decoded['timestamp'], np.round(timestamps * 1000) / 1000.0)
+    for name in names:
+        # Compare bit patterns so NaN, inf and the sign of -0.0 must all survive
+        assert decoded[name].view(np.uint64).tolist() == columns[name].view(np.uint64).tolist(), name
+
+
+def test_single_sample_block():
+    columns = {'timestamp': np.array([1700000000.25]), 'cpu_usage': np.array([-0.0])}
+    decoded = decode_block(encode_block(columns, ['cpu_usage']), ['cpu_usage'])
+    assert decoded['timestamp'].tolist() == [1700000000.25]
+    assert np.signbit(decoded['cpu_usage'][0])
@@ -0,0 +1,81 @@
+import pytest
+
+from energy import MAX_GAP_SECONDS, DeviceEnergy, EnergyTracker
+
+START = 472_222 * 3600.0  # on an hour boundary
+
+
+def test_trapezoid_integration_and_hourly_buckets():
+    device = DeviceEnergy()
+    device.add(START - 20, 100.0)
+    device.add(START - 10, 100.0)
+    device.add(START, 200.0)
+    device.add(START + 10, 200.0)
+
+    assert device.joules == pytest.approx(1000 + 1500 + 2000)
+    # Each interval is booked to the hour it ends in
+    assert [list(bucket) for bucket in device.hourly] == [[START - 3600, 1000.0], [START, 3500.0]]
+
+
+def test_gaps_and_late_samples_are_not_integrated():
+    device = DeviceEnergy()
+    device.add(START, 100.0)
+    device.add(START + MAX_GAP_SECONDS + 1, 100.0)
+    assert device.joules == 0
+
+    device.add(START + MAX_GAP_SECONDS + 11, 300.0)
+    device.add(START + 5, 1000.0)  # a late relay sample
+    assert device.joules == pytest.approx(2000)
+    assert device.last_power == 300.0
+
+
+def test_window_lookups_interpolate_and_extrapolate():
+    device = DeviceEnergy()
+    device.add(START, 100.0)
+    device.add(START + 10, 100.0)
+
+    assert device.total_at(START - 1) is None
+    assert device.between(START + 2, START + 7) == pytest.approx(500)
+    # Past the newest sample the latest power is charged, for at most MAX_GAP_SECONDS
+    assert device.between(START + 5, START + 15) == pytest.approx(1000)
+    assert device.total_at(START + 10 + 10 * MAX_GAP_SECONDS) == pytest.approx(1000 + 100 * MAX_GAP_SECONDS)
+
+
+def request(started: float, finished: float, tokens: int, concurrency: int = 1, **fields) -> dict:
+    return {'model': 'qwen', 'backend': 'mac-llama', 'devices': ['mac'], 'result': 'success',
+            'started': started, 'timestamp': finished, 'duration': finished - started,
+            'completion_tokens': tokens, 'concurrency': concurrency, **fields}
+
+
+def test_requests_share_the_energy_of_their_backend():
+    tracker = EnergyTracker()
+    for offset in range(0, 21, 5):
+        tracker.observe('mac', {'power_total': 60.0}, START + offset)
+    tracker.observe('mac', {'cpu_usage': 5}, START + 21)  # no power reading
+
+    # Two requests ran at the same time for 10 seconds each: 600 J between them
+    tracker.observe_request(request(START, START + 10, 150, concurrency=2))
+    tracker.observe_request(request(START, START + 10, 150, concurrency=2))
+    tracker.observe_request(request(START, START + 10, 999, result='error'))
+    tracker.observe_request(request(START, START + 10, 999, devices=['unknown']))
+
+    [model] = tracker.status()['models']
+    assert model['requests'] == 2
+    assert model['tokens'] == 300
+    assert model['joules'] == pytest.approx(600)
+    assert model['joules_per_token'] == pytest.approx(2.0)
+    assert model['tokens_per_joule'] == pytest.approx(0.5)
+    assert model['average_watts'] == pytest.approx(30)
+
+
+def test_split_backends_charge_every_device():
+    tracker = EnergyTracker()
+    for device, watts in (('mac', 40.0), ('pc', 200.0)):
+        tracker.observe(device, {'power_total': watts}, START)
+        tracker.observe(device, {'power_total': watts}, START + 10)
+
+    tracker.observe_request(request(START, START + 10, 60, devices=['mac', 'pc'], backend='rpc'))
+    [model] = tracker.status()['models']
+    assert model['joules'] == pytest.approx(2400)
+    assert model['joules_per_token'] == pytest.approx(40)
+    assert 'hld_inference_energy_joules_total{model="qwen",backend="rpc"} 2400.0\n' in tracker.render()
@@ -0,0 +1,92 @@
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from gateway import GatewayError, InferenceGateway
+from gateway_stub import StubState, make_handler
+
+
+@pytest.fixture
+def stubs():
+    """Start stub llama-servers on ephemeral ports; yields a factory returning their URLs."""
+    servers = []
+
+    def start(model: str, slots: int = 1, load_seconds: float = 0, tokens: int = 10) -> str:
+        state = StubState(model, slots, load_seconds, 50, tokens)
+        server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(state))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def make_gateway(tmp_path, backends, poll: bool = True) -> InferenceGateway:
+    path = tmp_path / 'gateway_config.json'
+    path.write_text(json.dumps({'poll_interval': 0.1, 'queue_timeout': 5, 'backends': backends}))
+    gateway = InferenceGateway(str(path))
+    if poll:
+        for backend in gateway.backends:
+            gateway.poll(backend)
+    return gateway
+
+
+def complete(gateway: InferenceGateway, model: str, stream: bool = False):
+    payload = {'model': model, 'messages': [{'role': 'user', 'content': 'hi'}], 'stream': stream}
+    return gateway.forward('/v1/chat/completions', payload, {})
+
+
+def test_routes_by_model_and_rejects_unknown_models(tmp_path, stubs):
+    gateway = make_gateway(tmp_path, [{'name': 'a', 'url': stubs('alpha')}, {'name': 'b', 'url': stubs('beta')}])
+
+    status, headers, body = complete(gateway, 'beta')
+    body.close()
+    assert status == 200
+    assert headers['X-Gateway-Backend'] == 'b'
+
+    with pytest.raises(GatewayError) as error:
+        complete(gateway, 'gamma')
+    assert error.value.status == 404
+
+
+def test_queues_for_a_model_while_its_backend_loads(tmp_path, stubs):
+    gateway = make_gateway(tmp_path, [{'name': 'swap', 'url': stubs('test', load_seconds=1)}])
+    assert gateway.backends[0].state == 'loading'
+    gateway.start()
+
+    started = time.time()
+    status, headers, body = complete(gateway, 'test')
+    list(body)
+    body.close()
+    assert status == 200
+    assert time.time() - started >= 0.5
+    assert gateway.waiting['test'] == 0
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_closing_the_relay_frees_the_slot_and_records_speed(tmp_path, stubs, stream):
+    gateway = make_gateway(tmp_path, [{'name': 'a', 'url': stubs('alpha', tokens=10)}])
+    backend = gateway.backends[0]
+
+    status, _, body = complete(gateway, 'alpha', stream)
+    assert backend.inflight == 1
+    list(body)
+    body.close()
+    body.close()
+    assert backend.inflight == 0
+
+    entry = gateway.recent[-1]
+    assert (entry['result'], entry['completion_tokens']) == ('success', 10)
+    assert 40 <= entry['tokens_per_second'] <= 60
+
+    # A client that goes away before reading anything still releases the slot
+    _, _, body = complete(gateway, 'alpha', stream)
+    body.close()
+    assert backend.inflight == 0
+    assert gateway.recent[-1]['result'] == 'cancelled'
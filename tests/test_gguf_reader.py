@@ -0,0 +1,48 @@
+import struct
+
+from placement import GGUF_ARRAY, GGUF_STRING, read_gguf
+
+
+def gguf_string(text: str) -> bytes:
+    data = text.encode('utf-8')
+    return struct.pack('<Q', len(data)) + data
+
+
+def write_gguf(path, metadata: list, tensors: list):
+    """Write a GGUF v3 header; metadata items are (key, type, payload bytes)."""
+    with open(path, 'wb') as f:
+        f.write(b'GGUF' + struct.pack('<IQQ', 3, len(tensors), len(metadata)))
+        for key, value_type, payload in metadata:
+            f.write(gguf_string(key) + struct.pack('<I', value_type) + payload)
+        for name, dims, tensor_type in tensors:
+            f.write(gguf_string(name) + struct.pack('<I', len(dims)))
+            f.write(struct.pack(f'<{len(dims)}Q', *dims) + struct.pack('<IQ', tensor_type, 0))
+
+
+def test_token_tables_are_skipped_and_per_layer_arrays_decoded(tmp_path):
+    tokens = [f"token{index}" for index in range(5000)]
+    path = tmp_path / 'model.gguf'
+    write_gguf(path, [
+        ('general.architecture', GGUF_STRING, gguf_string('llama')),
+        ('tokenizer.ggml.tokens', GGUF_ARRAY,
+         struct.pack('<IQ', GGUF_STRING, len(tokens)) + b''.join(gguf_string(token) for token in tokens)),
+        ('tokenizer.ggml.scores', GGUF_ARRAY, struct.pack('<IQ', 6, 5000) + struct.pack('<5000f', *[0.0] * 5000)),
+        ('llama.block_count', 4, struct.pack('<I', 2)),
+        ('llama.embedding_length', 4, struct.pack('<I', 64)),
+        ('llama.attention.head_count', 4, struct.pack('<I', 8)),
+        ('llama.attention.head_count_kv', GGUF_ARRAY, struct.pack('<IQ2i', 5, 2, 2, 4)),
+        ('llama.context_length', 4, struct.pack('<I', 4096))
+    ], [
+        ('blk.0.attn_q.weight', [64, 64], 0),
+        ('blk.1.attn_q.weight', [64, 64], 0),
+        ('output.weight', [64, 100], 1)
+    ])
+
+    model = read_gguf(str(path))
+
+    assert model['n_layer'] == 2
+    assert model['n_head_kv'] == 4
+    assert model['context_length'] == 4096
+    assert model['key_length'] == 8
+    assert model['layer_bytes'] == [64 * 64 * 4] * 2
+    assert model['output_bytes'] == 64 * 100 * 2
@@ -0,0 +1,94 @@
+import time
+
+import numpy as np
+
+from history_cache import HistoryCache
+
+
+class FakeStore:
+    """Rows per series; like the real stores, fetch measures its window from its own (later) clock."""
+
+    def __init__(self):
+        self.series = {}
+        self.requested = []
+
+    def add(self, timestamp: float, value: float, name: str = 'dev1'):
+        timestamps, values = self.series.setdefault(name, ([], []))
+        timestamps.append(timestamp)
+        values.append(value)
+
+    def fetch(self, hours: float):
+        self.requested.append(hours)
+        since = time.time() + 0.001 - hours * 3600
+        groups = {}
+        for name, (timestamps, values) in self.series.items():
+            timestamps = np.array(timestamps)
+            mask = timestamps >= since
+            if mask.any():
+                groups[name] = {'timestamp': timestamps[mask], 'cpu_usage': np.array(values)[mask]}
+        return groups
+
+
+def test_extend_keeps_every_raw_row():
+    cache = HistoryCache(1024 * 1024)
+    store = FakeStore()
+    for index in range(8):
+        store.add(time.time(), float(index))
+        cache.invalidate('dev1')
+        entry = cache.get(('metrics', 'dev1', 1, 0), 'dev1', 1, 0, store.fetch)
+    assert entry.groups['dev1']['cpu_usage'].tolist() == [float(index) for index in range(8)]
+    assert cache.lookups.values[('extend',)] == 7
+
+
+def test_extend_matches_fresh_downsample():
+    cache = HistoryCache(1024 * 1024)
+    store = FakeStore()
+    now = time.time()
+    for index in range(20):
+        store.add(now - 300 + index * 15, float(index))
+    cache.get(('metrics', 'dev1', 1, 60), 'dev1', 1, 60, store.fetch)
+    store.add(time.time(), 100.0)
+    cache.invalidate('dev1')
+    extended = cache.get(('metrics', 'dev1', 1, 60), 'dev1', 1, 60, store.fetch)
+    fresh = HistoryCache(1024 * 1024).get(('metrics', 'dev1', 1, 60), 'dev1', 1, 60, store.fetch)
+    np.testing.assert_array_equal(extended.groups['dev1']['timestamp'], fresh.groups['dev1']['timestamp'])
+    np.testing.assert_allclose(extended.groups['dev1']['cpu_usage'], fresh.groups['dev1']['cpu_usage'])
+
+
+def test_cached_windows_do_not_share_memory_with_the_store():
+    cache = HistoryCache(1024 * 1024)
+    records = np.zeros(4, dtype=[('timestamp', 'f8'), ('cpu_usage', 'f8')])
+    records['timestamp'] = time.time() - np.arange(4)[::-1]
+    records['cpu_usage'] = [1, 2, 3, 4]
+
+    def fetch(hours):
+        # Field views of a structured array, as RingBufferStore returns from its memory map
+        return {'dev1': {'timestamp': records['timestamp'], 'cpu_usage': records['cpu_usage']}}
+
+    entry = cache.get(('metrics', 'dev1', 1, 0), 'dev1', 1, 0, fetch)
+    records['cpu_usage'] = 0  # The ring wraps and overwrites the slots
+    assert entry.groups['dev1']['cpu_usage'].tolist() == [1, 2, 3, 4]
+
+
+def test_stopped_series_do_not_widen_the_refresh():
+    cache = HistoryCache(1024 * 1024)
+    store = FakeStore()
+    now = time.time()
+    for index in range(100):
+        store.add(now - 20 * 3600 + index * 60, float(index), 'ollama')
+    for index in range(20):
+        store.add(now - 300 + index * 15, float(index), 'llama-server')
+    key = ('processes', 'dev1', 24, 60)
+    cache.get(key, 'dev1', 24, 60, store.fetch)
+
+    store.add(time.time(), 100.0, 'llama-server')
+    store.add(time.time(), 1.0, 'vllm')
+    cache.invalidate('dev1')
+    extended = cache.get(key, 'dev1', 24, 60, store.fetch)
+
+    assert store.requested[-1] * 3600 <= 4 * 60
+    fresh = HistoryCache(1024 * 1024).get(key, 'dev1', 24, 60, store.fetch)
+    assert extended.groups.keys() == fresh.groups.keys() == {'ollama', 'llama-server', 'vllm'}
+    for name in fresh.groups:
+        np.testing.assert_array_equal(extended.groups[name]['timestamp'], fresh.groups[name]['timestamp'])
+        np.testing.assert_allclose(extended.groups[name]['cpu_usage'], fresh.groups[name]['cpu_usage'])
@@ -0,0 +1,105 @@
+import json
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from gateway import InferenceGateway
+from preloader import ModelPreloader
+
+POLICY = {
+    'deployments': {'coder': {'models': ['qwen-coder']}, 'chat': {'models': ['llama']}},
+    'min_probability': 0.5,
+    'min_days': 2,
+    'half_life_weeks': 4,
+    'lead_minutes': 15,
+    'quiet_minutes': 10
+}
+
+# The next Monday, so the history below is always within `history_days` of the clock
+MONDAY = date.today() + timedelta(days=7 - date.today().weekday())
+
+
+def at(day: date, hour: int, minute: int = 0) -> float:
+    return datetime.combine(day, time(hour, minute)).timestamp()
+
+
+@pytest.fixture
+def setup(tmp_path):
+    path = tmp_path / 'preload_policy.json'
+    path.write_text(json.dumps(POLICY))
+    history = tmp_path / 'usage_history.jsonl'
+    scripts, events = [], []
+
+    def run_script(script_id: str) -> bool:
+        scripts.append(script_id)
+        return True
+
+    def create() -> ModelPreloader:
+        gateway = InferenceGateway(str(tmp_path / 'missing.json'))
+        return ModelPreloader(str(path), str(history), gateway, run_script, notify=events.append)
+
+    preloader = create()
+    # The coder is used at nine on each of the last three Mondays, chat only on the first
+    for weeks in (3, 2, 1):
+        preloader.observe('coder', at(MONDAY - timedelta(weeks=weeks), 9, 10), 'request', cold=False)
+    preloader.observe('chat', at(MONDAY - timedelta(weeks=3), 9, 40), 'request', cold=False)
+    return preloader, create, scripts, events
+
+
+def test_profiles_weight_recent_weeks(setup):
+    preloader, create, _, _ = setup
+    profiles = preloader.profiles(at(MONDAY, 8))
+
+    assert profiles['coder'][0, 9] == pytest.approx(1.0)
+    assert profiles['coder'][0, 10] == 0
+    assert profiles['coder'][1].sum() == 0
+    weights = [0.5 ** (age / 28) for age in (21, 14, 7)]
+    assert profiles['chat'][0, 9] == pytest.approx(weights[0] / sum(weights))
+
+    assert preloader.predict(at(MONDAY, 9, 5), profiles) == ('coder', pytest.approx(1.0))
+    assert preloader.predict(at(MONDAY, 10, 5), profiles) is None
+
+    # The history survives a restart
+    assert create().profiles(at(MONDAY, 8))['coder'][0, 9] == pytest.approx(1.0)
+
+
+def test_preload_used_in_its_hour_is_a_hit(setup):
+    preloader, _, scripts, events = setup
+    preloader.check(at(MONDAY, 8, 40))
+    assert scripts == []  # Not within the lead time yet
+
+    preloader.check(at(MONDAY, 8, 50))
+    preloader.check(at(MONDAY, 8, 51))
+    assert scripts == ['coder']
+    assert preloader.pending[0]['window_end'] == at(MONDAY, 10)
+
+    preloader.observe_request({'model': 'qwen-coder', 'started': at(MONDAY, 9, 20)})
+    assert preloader.outcomes.values == {('coder', 'hit'): 1}
+    assert preloader.status()['outcomes']['coder']['hit_rate'] == 1.0
+    assert [event['event'] for event in events] == ['preload', 'hit']
+
+
+def test_unused_preload_is_a_miss_once_its_hour_ends(setup):
+    preloader, _, scripts, _ = setup
+    preloader.check(at(MONDAY, 8, 50))
+    preloader.check(at(MONDAY, 9, 59))
+    assert preloader.outcomes.values == {}
+
+    preloader.check(at(MONDAY, 10, 1))
+    assert scripts == ['coder']
+    assert preloader.outcomes.values == {('coder', 'miss'): 1}
+    assert preloader.status()['outcomes']['coder']['hit_rate'] == 0.0
+
+
+def test_recent_use_of_another_deployment_blocks_the_preload(setup):
+    preloader, _, scripts, _ = setup
+    preloader.observe_request({'model': 'llama', 'started': at(MONDAY, 8, 45)})
+    preloader.observe_request({'model': 'llama', 'started': at(MONDAY, 8, 46)})
+    # Cold demand nobody predicted counts once per slot
+    assert preloader.outcomes.values == {('chat', 'unpredicted'): 1}
+    assert len(preloader.history) == 5
+
+    preloader.check(at(MONDAY, 8, 50))
+    assert scripts == []
+    preloader.check(at(MONDAY, 8, 57))
+    assert scripts == ['coder']
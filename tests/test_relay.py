@@ -0,0 +1,96 @@
+import json
+import zlib
+
+import pytest
+import requests
+
+from agent import RelayBuffer, RelayServer
+
+
+def test_samples_pass_through_without_aggregation():
+    buffer = RelayBuffer()
+    buffer.add('mac', {'cpu_usage': 10}, 100.0)
+    buffer.add('pc', {'cpu_usage': 20}, 101.0)
+    assert buffer.drain(102.0) == [
+        {'device_name': 'mac', 'timestamp': 100.0, 'metrics': {'cpu_usage': 10}},
+        {'device_name': 'pc', 'timestamp': 101.0, 'metrics': {'cpu_usage': 20}}
+    ]
+    assert buffer.drain(103.0) == []
+
+
+def test_windows_average_numbers_and_keep_the_latest_nested_values():
+    buffer = RelayBuffer(aggregate_seconds=10)
+    buffer.add('mac', {'cpu_usage': 10, 'gpu_usage': None, 'processes': {'llama': 1}}, 100.0)
+    buffer.add('mac', {'cpu_usage': 30, 'ram_usage': 4, 'processes': {'llama': 2}}, 105.0)
+    buffer.add('pc', {'cpu_usage': 50}, 106.0)
+    assert buffer.drain(108.0) == []
+
+    # A sample in the next window closes the previous one
+    buffer.add('mac', {'cpu_usage': 90}, 111.0)
+    samples = buffer.drain(112.0)
+    assert samples == [
+        {'device_name': 'mac', 'timestamp': 105.0,
+         'metrics': {'cpu_usage': 20.0, 'ram_usage': 4.0, 'gpu_usage': None, 'processes': {'llama': 2}}},
+        # Windows that have ended are closed on drain
+        {'device_name': 'pc', 'timestamp': 106.0, 'metrics': {'cpu_usage': 50.0}}
+    ]
+    assert buffer.drain(121.0) == [{'device_name': 'mac', 'timestamp': 111.0, 'metrics': {'cpu_usage': 90.0}}]
+
+
+def test_requeued_samples_go_before_newer_ones():
+    buffer = RelayBuffer()
+    buffer.add('mac', {'cpu_usage': 1}, 100.0)
+    failed = buffer.drain(101.0)
+    buffer.add('mac', {'cpu_usage': 2}, 102.0)
+    buffer.requeue(failed)
+    assert [sample['timestamp'] for sample in buffer.drain(103.0)] == [100.0, 102.0]
+
+
+def test_full_buffer_drops_the_oldest_samples():
+    buffer = RelayBuffer(max_samples=3)
+    for index in range(5):
+        buffer.add('mac', {'cpu_usage': index}, 100.0 + index)
+    assert buffer.stats() == {'received': 5, 'pending': 3, 'dropped': 2}
+
+    failed = buffer.drain(110.0)
+    buffer.add('mac', {'cpu_usage': 5}, 105.0)
+    buffer.requeue(failed)
+    assert [sample['metrics']['cpu_usage'] for sample in buffer.drain(111.0)] == [3, 4, 5]
+    assert buffer.stats()['dropped'] == 3
+
+
+@pytest.fixture
+def relay():
+    server = RelayServer('127.0.0.1:0', RelayBuffer())
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.mark.parametrize('path, body', [
+    ('/api/metrics', b'[1, 2]'),
+    ('/api/metrics', b'{"metrics": {}}'),
+    ('/api/metrics', b'{"device_name": "mac", "metrics": [1]}'),
+    ('/api/metrics/batch', b'{"samples": {"device_name": "mac"}}'),
+    ('/api/metrics/batch', b'{"samples": ["mac"]}'),
+    ('/api/metrics/batch', b'{"samples": [{"device_name": "mac", "timestamp": "soon"}]}'),
+    ('/api/metrics/batch', b'{"samples": [{"device_name": "mac", "timestamp": NaN}]}'),
+    ('/api/metrics/batch', b'{"samples": [{"device_name": "mac"}, {"device_name": "pc", "timestamp": [1]}]}'),
+    ('/api/metrics', b'not json')
+])
+def test_malformed_requests_get_400_and_store_nothing(relay, path, body):
+    response = requests.post(f"http://{relay.address}{path}", data=body, timeout=5)
+    assert response.status_code == 400
+    assert relay.buffer.stats()['received'] == 0
+
+
+def test_batches_keep_their_timestamps_up_to_now(relay):
+    batch = {'samples': [{'device_name': 'mac', 'timestamp': 100.5, 'metrics': {'cpu_usage': 1}},
+                         {'device_name': 'pc', 'timestamp': 4e12, 'metrics': {}}]}
+    response = requests.post(f"http://{relay.address}/api/metrics/batch",
+                             data=zlib.compress(json.dumps(batch).encode()),
+                             headers={'Content-Encoding': 'deflate'}, timeout=5)
+    assert response.status_code == 200
+    samples = relay.buffer.drain(0)
+    assert samples[0]['timestamp'] == 100.5
+    assert samples[1]['timestamp'] < 4e12
@@ -0,0 +1,85 @@
+import numpy as np
+
+from storage import METRIC_COLUMNS, RingBuffer, RingBufferStore, columns_to_rows
+
+
+def timestamps(ring: RingBuffer) -> list:
+    return [float(value) for segment in ring.segments() for value in segment['timestamp']]
+
+
+def test_append_wraps_and_keeps_the_newest_samples(tmp_path):
+    ring = RingBuffer(str(tmp_path / 'dev1.ring'), 'dev1', ['cpu_usage'], 4)
+    for index in range(10):
+        ring.append(1000.0 + index, {'cpu_usage': index})
+
+    assert ring.count == 4
+    assert timestamps(ring) == [1006.0, 1007.0, 1008.0, 1009.0]
+    assert len(ring.segments()) == 2
+    assert [float(value) for view in ring.window(1007.5) for value in view['cpu_usage']] == [8.0, 9.0]
+    assert float(ring.latest()['timestamp']) == 1009.0
+
+
+def test_extend_wraps_across_the_end_of_the_file(tmp_path):
+    ring = RingBuffer(str(tmp_path / 'dev1.ring'), 'dev1', ['cpu_usage'], 5)
+    for index in range(3):
+        ring.append(1000.0 + index, {'cpu_usage': index})
+
+    records = np.zeros(4, dtype=ring.record_dtype)
+    records['timestamp'] = 1003.0 + np.arange(4)
+    records['cpu_usage'] = 3 + np.arange(4)
+    ring.extend(records)
+
+    assert timestamps(ring) == [1002.0, 1003.0, 1004.0, 1005.0, 1006.0]
+    assert [float(value) for segment in ring.segments() for value in segment['cpu_usage']] == [2, 3, 4, 5, 6]
+
+
+def test_wrapped_ring_survives_reopening(tmp_path):
+    path = str(tmp_path / 'dev1.ring')
+    ring = RingBuffer(path, 'dev1', ['cpu_usage'], 3)
+    for index in range(7):
+        ring.append(1000.0 + index, {'cpu_usage': None if index == 5 else index})
+    ring.flush()
+    del ring
+
+    reopened = RingBuffer(path, 'dev1', ['cpu_usage'], 3)
+    assert timestamps(reopened) == [1004.0, 1005.0, 1006.0]
+    assert np.isnan(reopened.window(1005.0)[0]['cpu_usage'][0])
+    assert RingBuffer.read_device_name(path) == 'dev1'
+
+
+def test_rows_keep_the_stored_precision(tmp_path):
+    ring = RingBuffer(str(tmp_path / 'dev1.ring'), 'dev1', METRIC_COLUMNS, 4)
+    ring.append(1000.0, {'cpu_usage': 0.1, 'ram_usage': 12.34567})
+    ring.append(1001.5, {'cpu_usage': 1234567.0})
+    [records] = ring.segments()
+    columns = {column: records[column] for column in ['timestamp'] + METRIC_COLUMNS}
+
+    rows = columns_to_rows('dev1', columns)
+    assert rows[0]['timestamp'] == '1970-01-01T00:16:41.500Z'
+    assert (rows[0]['cpu_usage'], rows[0]['ram_usage']) == (1234567.0, None)
+    assert (rows[1]['cpu_usage'], rows[1]['ram_usage']) == (0.1, 12.34567)
+
+    # float64 columns (SQLite) are not rounded at all
+    rows = columns_to_rows('dev1', {**columns, 'gpu_usage': np.array([0.123456789, 2 / 3])})
+    assert rows[1]['gpu_usage'] == 0.123456789
+    assert rows[0]['gpu_usage'] == 2 / 3
+
+
+def test_long_names_keep_their_history_across_restarts(tmp_path):
+    # The two byte character straddles the end of the header field
+    name = 'a' * (RingBuffer.NAME_BYTES - 1) + '\u00e9-gpu'
+    store = RingBufferStore(str(tmp_path), 10, 7)
+    store.insert_metrics(name, {'cpu_usage': 1.0})
+    store.insert_process_metrics(name, {'llama': {'count': 1}})
+    del store
+
+    path = next(tmp_path.glob('*.ring'))
+    assert RingBuffer.read_device_name(str(path)) == 'a' * (RingBuffer.NAME_BYTES - 1)
+
+    store = RingBufferStore(str(tmp_path), 10, 7)
+    store.insert_metrics(name, {'cpu_usage': 2.0})
+    store.insert_process_metrics(name, {'llama': {'count': 2}})
+    assert list(store.rings) == [name]
+    assert store.get_metric_columns()[name]['cpu_usage'].tolist() == [1.0, 2.0]
+    assert len(list(tmp_path.glob('*.ring'))) == 1
+    assert store.get_process_columns(name)['llama']['count'].tolist() == [1.0, 2.0]
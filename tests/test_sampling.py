@@ -0,0 +1,75 @@
+import json
+
+import pytest
+import requests
+
+from agent import RelayBuffer, RelayServer
+from sampling import SamplingController
+
+
+@pytest.fixture
+def controller():
+    script = {'devices': None}
+    sampling = SamplingController(1, 5, 20, 30, lambda: script['devices'])
+    return sampling, script
+
+
+def test_directive_reasons(controller):
+    sampling, script = controller
+    idle = {'cpu_usage': 3, 'gpu_usage': 0}
+
+    assert sampling.directive('mac', idle) == {'interval': 20, 'reason': 'idle'}
+    assert sampling.directive('mac', None)['reason'] == 'idle'
+    assert sampling.directive('mac', {'cpu_usage': 45})['reason'] == 'normal'
+    assert sampling.directive('mac', {**idle, 'inference_servers': {'llama': {'slots_busy': 1}}}) == \
+        {'interval': 5, 'reason': 'normal'}
+
+    sampling.set_view('browser-1', ['mac'])
+    assert sampling.directive('mac', idle) == {'interval': 1, 'reason': 'viewed'}
+    assert sampling.directive('pc', idle)['reason'] == 'idle'
+    sampling.drop_view('browser-1')
+
+    script['devices'] = {'pc'}
+    assert sampling.directive('mac', idle)['reason'] == 'idle'
+    assert sampling.directive('pc', idle)['reason'] == 'script'
+    script['devices'] = set()  # a script without a device list counts for every device
+    assert sampling.directive('mac', idle)['reason'] == 'script'
+
+    loading = {**idle, 'inference_servers': {'llama': {'loading': True}}}
+    assert sampling.directive('mac', loading) == {'interval': 1, 'reason': 'loading'}
+
+
+def test_views_expire(controller):
+    sampling, _ = controller
+    sampling.set_view('browser-1', ['mac'])
+    sampling.views['browser-1'] = ({'mac'}, 0)  # reported long before view_ttl
+    assert sampling.directive('mac', {})['reason'] == 'idle'
+
+
+def test_changed_only_reports_new_intervals(controller):
+    sampling, _ = controller
+    assert sampling.changed('mac', {'interval': 5, 'reason': 'normal'})
+    assert not sampling.changed('mac', {'interval': 5, 'reason': 'normal'})
+    assert sampling.changed('mac', {'interval': 1, 'reason': 'viewed'})
+
+
+def test_relay_hands_directives_to_its_agents():
+    relay = RelayServer('127.0.0.1:0', RelayBuffer())
+    relay.start()
+    try:
+        relay.store_directives({'mac': {'sampling': {'interval': 1, 'reason': 'viewed'},
+                                        'prewarm': {'files': ['/models/a.gguf']}}})
+        url = f"http://{relay.address}/api/metrics"
+        first = requests.post(url, json={'device_name': 'mac', 'metrics': {'cpu_usage': 1}}, timeout=5).json()
+        second = requests.post(url, json={'device_name': 'mac', 'metrics': {'cpu_usage': 1}}, timeout=5).json()
+        other = requests.post(url, json={'device_name': 'pc', 'metrics': {}}, timeout=5).json()
+        batch = requests.post(f"{url}/batch", data=json.dumps({'samples': [{'device_name': 'mac', 'metrics': {}}]}),
+                              timeout=5).json()
+    finally:
+        relay.stop()
+
+    assert first == {'status': 'success', 'sampling': {'interval': 1, 'reason': 'viewed'},
+                     'prewarm': {'files': ['/models/a.gguf']}}
+    assert second == {'status': 'success', 'sampling': {'interval': 1, 'reason': 'viewed'}}
+    assert other == {'status': 'success'}
+    assert batch['devices'] == {'mac': {'sampling': {'interval': 1, 'reason': 'viewed'}}}
@@ -0,0 +1,136 @@
+import json
+import time
+
+import pytest
+
+from gateway import InferenceGateway
+from swap_scheduler import SwapScheduler
+
+POLICY = {
+    'watch_devices': ['gpu-box'],
+    'idle_minutes': 20,
+    'cooldown_minutes': 10,
+    'gpu_busy_percent': 40,
+    'gpu_idle_percent': 10,
+    'idle_script': 'ollama_only',
+    'active_script': 'big',
+    'wake_models': ['big-model']
+}
+
+
+class FakeGateway:
+    def __init__(self):
+        self.waiting = {}
+        self.last_request_at = None
+        self.expected = []
+        self.served = set()
+
+    def active_requests(self) -> int:
+        return sum(self.waiting.values())
+
+    def available(self, model: str) -> bool:
+        return model in self.served
+
+
+@pytest.fixture
+def setup(tmp_path):
+    path = tmp_path / 'swap_policy.json'
+    path.write_text(json.dumps(POLICY))
+    metrics = {'gpu-box': {'gpu_usage': 0}}
+    gateway = FakeGateway()
+    scripts = []
+
+    def run_script(script_id: str) -> bool:
+        scripts.append(script_id)
+        return True
+
+    scheduler = SwapScheduler(str(path), metrics.get, gateway, run_script)
+    return scheduler, metrics, gateway, scripts
+
+
+def test_gpu_busy_state_has_hysteresis(setup):
+    scheduler, metrics, _, _ = setup
+    states = []
+    for gpu in (30, 50, 20, 10, 5, 30):
+        metrics['gpu-box'] = {'gpu_usage': gpu}
+        states.append(scheduler.device_busy('gpu-box'))
+    assert states == [False, True, True, True, False, False]
+
+    metrics['gpu-box'] = {'gpu_usage': 0, 'inference_servers': {'llama': {'slots_busy': 1}}}
+    assert scheduler.device_busy('gpu-box')
+
+
+def test_idle_swap_then_wake_respects_the_cooldown(setup):
+    scheduler, metrics, gateway, scripts = setup
+    start = time.time()
+
+    scheduler.check(start + 19 * 60)
+    assert scripts == []
+    scheduler.check(start + 21 * 60)
+    assert (scheduler.mode, scripts) == ('idle', ['ollama_only'])
+
+    gateway.waiting['big-model'] = 1
+    scheduler.check(start + 25 * 60)
+    assert scripts == ['ollama_only']
+    scheduler.check(start + 32 * 60)
+    assert (scheduler.mode, scripts) == ('active', ['ollama_only', 'big'])
+
+
+def test_busy_devices_keep_the_policy_active(setup):
+    scheduler, metrics, _, scripts = setup
+    start = time.time()
+    metrics['gpu-box'] = {'gpu_usage': 80}
+    scheduler.check(start + 30 * 60)
+    metrics['gpu-box'] = {'gpu_usage': 0}
+    scheduler.check(start + 45 * 60)
+    assert scripts == []
+    scheduler.check(start + 51 * 60)
+    assert scripts == ['ollama_only']
+
+
+def test_hold_pauses_swaps_until_cleared(setup):
+    scheduler, _, _, scripts = setup
+    start = time.time()
+    scheduler.hold(None)
+    scheduler.check(start + 60 * 60)
+    assert scripts == []
+
+    scheduler.hold(0)
+    scheduler.check(start + 60 * 60)
+    assert scripts == ['ollama_only']
+
+
+def test_timed_hold_expires(setup):
+    scheduler, _, _, scripts = setup
+    start = time.time()
+    scheduler.hold(30)
+    scheduler.check(start + 25 * 60)
+    assert scripts == []
+    scheduler.check(start + 31 * 60)
+    assert scripts == ['ollama_only']
+    assert scheduler.hold_until is None
+
+
+def test_wakes_after_a_restart_while_torn_down(setup):
+    scheduler, _, gateway, scripts = setup
+    assert scheduler.mode == 'active'
+
+    # Requests queue behind a busy but running backend: nothing to start
+    gateway.served.add('big-model')
+    gateway.waiting['big-model'] = 2
+    scheduler.check()
+    assert scripts == []
+
+    gateway.served.clear()
+    scheduler.check()
+    assert scripts == ['big']
+
+
+def test_gateway_queues_wake_models_no_backend_lists(tmp_path):
+    gateway = InferenceGateway(str(tmp_path / 'missing.json'))
+    path = tmp_path / 'swap_policy.json'
+    path.write_text(json.dumps(POLICY))
+    SwapScheduler(str(path), {}.get, gateway, lambda script_id: True)
+
+    assert gateway._pick('big-model') == (None, True)
+    assert gateway._pick('other-model') == (None, False)